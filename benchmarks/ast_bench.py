@@ -0,0 +1,52 @@
+import tracemalloc
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+
+    while stack:
+        node = stack.pop()
+        count += 1
+        for value in (getattr(node, field) for field in type(node).fields):
+            if isinstance(value, list):
+                stack.extend(value)
+            elif hasattr(type(value), 'fields'):
+                stack.append(value)
+
+    return count
+
+
+def main():
+    tokens = Lexer(engine='regex').lex(generate_program(statement_count))
+    parser = Parser(backend='pratt')
+
+    def parse():
+        tokens.rewind()
+        return parser.parse(tokens)
+
+    tracemalloc.start()
+    tree = parse()
+    (tree_bytes, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    other = parse()
+    nodes = count_nodes(tree)
+    (eq_time, equal) = best_of(lambda: tree == other, repeat=3)
+    (repr_time, _) = best_of(lambda: repr(tree), repeat=3)
+    assert equal
+
+    rows = [(nodes, '%.1f' % (tree_bytes / nodes), '%.3f' % eq_time, '%.3f' % repr_time)]
+    report('AST nodes', ('nodes', 'bytes/node', 'eq seconds', 'repr seconds'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import random
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.vm.batch import BatchEvaluator
+from compiler.vm.bytecode import BytecodeCompiler
+from compiler.vm.vm import VM
+from benchmarks.generate import float_names, generate_program, int_names
+from benchmarks.utils import best_of, report
+
+
+statement_count = 200
+batch_sizes = [1, 10, 100, 1000, 10000]
+
+
+def main():
+    tree = Parser(backend='pratt').parse(Lexer(engine='regex').lex(generate_program(statement_count, runnable=True)))
+    program = BytecodeCompiler().compile(tree)
+    vm = VM()
+    evaluator = BatchEvaluator()
+    rng = random.Random(0)
+
+    rows = []
+    for size in batch_sizes:
+        inputs = {name: [rng.randint(-1000, 1000) for _ in range(size)] for name in int_names}
+        inputs.update({name: [rng.uniform(-100, 100) for _ in range(size)] for name in float_names})
+        per_input = [{name: values[row] for (name, values) in inputs.items()} for row in range(size)]
+
+        (vm_time, _) = best_of(lambda: [vm.run(program, values) for values in per_input], repeat=3)
+        (batch_time, _) = best_of(lambda: evaluator.run(tree, inputs), repeat=3)
+        rows.append((size, '%.0f' % (size / vm_time), '%.0f' % (size / batch_time), '%.1fx' % (vm_time / batch_time)))
+
+    report('Inputs per second running a %d statement program' % statement_count,
+           ('inputs', 'VM per input', 'batch', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
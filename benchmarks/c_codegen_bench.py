@@ -0,0 +1,52 @@
+import os
+import tempfile
+import time
+
+from compiler.codegen.c_codegen import CCodegen, build_executable, find_c_compiler, run_executable
+from compiler.codegen.python_codegen import PythonCodegen, run_code
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.vm.bytecode import BytecodeCompiler
+from compiler.vm.vm import VM
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 20000
+
+
+def main():
+    if find_c_compiler() is None:
+        print('No C compiler, set CC or install cc')
+        return
+
+    tree = Parser(backend='pratt').parse(Lexer(engine='regex').lex(generate_program(statement_count, runnable=True)))
+
+    program = BytecodeCompiler().compile(tree)
+    (vm_time, vm_result) = best_of(lambda: VM().run(program), repeat=3)
+    code = compile(PythonCodegen().generate(tree), '<minic>', 'exec')
+    (python_time, _) = best_of(lambda: run_code(code), repeat=3)
+
+    codegen = CCodegen()
+    (generate_time, c_source) = best_of(lambda: codegen.generate(tree), repeat=3)
+    with tempfile.TemporaryDirectory() as path:
+        executable = os.path.join(path, 'program')
+        start = time.perf_counter()
+        build_executable(c_source, executable)
+        build_time = time.perf_counter() - start
+        (c_time, c_result) = best_of(lambda: run_executable(executable, codegen.variables), repeat=3)
+    assert repr(c_result) == repr(vm_result)
+
+    report('Running %d statements' % statement_count, ('backend', 'seconds'), [
+        ('vm', '%.4f' % vm_time),
+        ('python code object', '%.4f' % python_time),
+        ('c executable, with process start', '%.4f' % c_time),
+    ])
+    report('C backend', ('stage', 'seconds'), [
+        ('generate c', '%.3f' % generate_time),
+        ('cc -O2', '%.3f' % build_time),
+    ])
+
+
+if __name__ == '__main__':
+    main()
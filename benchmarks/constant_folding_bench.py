@@ -0,0 +1,36 @@
+from compiler.lexer.lexer import Lexer
+from compiler.optimizer.constant_folding import ConstantFolder
+from compiler.parser.parser import Parser
+from compiler.typechecker.typechecker import Typechecker
+from compiler.vm.bytecode import BytecodeCompiler
+from compiler.vm.vm import VM
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+
+def main():
+    tree = Parser(backend='pratt').parse(Lexer(engine='regex').lex(generate_program(statement_count, runnable=True)))
+
+    folder = ConstantFolder()
+    (fold_time, folded) = best_of(lambda: folder.fold(tree), repeat=3)
+
+    rows = []
+    for (name, stage_tree) in [('parsed', tree), ('folded', folded)]:
+        (typecheck_time, _) = best_of(lambda: Typechecker().typecheck(stage_tree), repeat=3)
+        (compile_time, program) = best_of(lambda: BytecodeCompiler().compile(stage_tree), repeat=3)
+        vm = VM(counting=True)
+        (run_time, _) = best_of(lambda: vm.run(program), repeat=3)
+        rows.append((name, '%.3f' % typecheck_time, '%.3f' % compile_time, len(program.code) // 2, vm.executed,
+                     '%.3f' % run_time))
+
+    print('Folding %d statements took %.3f s and eliminated %d nodes\n' % (
+        statement_count, fold_time, folder.eliminated))
+    report('Later stages on the parsed and the folded tree',
+           ('tree', 'typecheck s', 'bytecode s', 'instructions', 'executed', 'run s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import sys
+
+import compiler.parser.ast as ast
+from compiler.typechecker.typechecker import SymbolTable, type_codes
+from benchmarks.utils import best_of, report
+
+
+term_count = 100000
+
+type_names = {code: name for (name, code) in type_codes.items()}
+
+
+def list_expression_type(symbol_table, ast_expr):
+    '''The previous implementation, collecting every leaf type in a list'''
+    def get_expression_type_rec(node, types):
+        if node.node_class is ast.Float:
+            return ['float'] + types[:]
+        elif node.node_class is ast.Integer:
+            return ['int'] + types[:]
+        elif node.node_class is ast.ID:
+            return [type_names[symbol_table.get_id_type(node)]] + types[:]
+        elif node.node_class is ast.BinOp:
+            return (get_expression_type_rec(node.left, types) +
+                    get_expression_type_rec(node.right, types))
+        elif node.node_class is ast.UnaryOp:
+            return get_expression_type_rec(node.expr, types)
+        else:
+            return types
+
+    expr_types = get_expression_type_rec(ast_expr, [])
+    if all(t == 'int' for t in expr_types):
+        return 'int'
+    elif all(t == 'float' for t in expr_types):
+        return 'float'
+    else:
+        return None
+
+
+def leaf(i):
+    return ast.ID('ducks') if i % 2 else ast.Integer(i)
+
+
+def balanced(start, stop):
+    if stop - start == 1:
+        return leaf(start)
+
+    middle = (start + stop) // 2
+    return ast.BinOp('+', balanced(start, middle), balanced(middle, stop))
+
+
+def chain(count):
+    expr = leaf(0)
+    for i in range(1, count):
+        expr = ast.BinOp('+', expr, leaf(i))
+
+    return expr
+
+
+def main():
+    # the previous implementation recurses once per term of a chain
+    sys.setrecursionlimit(term_count * 2)
+    symbol_table = SymbolTable()
+    symbol_table.add_declaration(ast.Declaration('int', [ast.ID('ducks')]))
+
+    def infer(expr):
+        # a fresh memo each run, so every run infers the whole expression
+        symbol_table.expression_types.clear()
+        return symbol_table.get_expression_type(expr)
+
+    rows = []
+    for (shape, expr) in [('balanced', balanced(0, term_count)), ('chain', chain(term_count))]:
+        (new_time, new_type) = best_of(lambda: infer(expr), repeat=3)
+        (old_time, old_type) = best_of(lambda: list_expression_type(symbol_table, expr), repeat=1)
+        assert old_type == new_type
+
+        rows.append((shape, term_count, '%.3f' % old_time, '%.3f' % new_time))
+
+    report('Inferring the type of an expression', ('shape', 'terms', 'list seconds', 'bottom-up seconds'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import gc
+import tracemalloc
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.flat_ast import FlatAst
+from compiler.parser.parser import Parser
+from compiler.typechecker.typechecker import Typechecker
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+
+def traced_bytes(build):
+    tracemalloc.start()
+    result = build()
+    (size, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (size, result)
+
+
+def measure(name, nodes, size, root):
+    typechecker = Typechecker()
+    (gc_time, _) = best_of(gc.collect, repeat=3)
+    (typecheck_time, _) = best_of(lambda: typechecker.typecheck(root), repeat=3)
+    return (name, nodes, '%.1f' % (size / nodes), '%.4f' % gc_time, '%.3f' % typecheck_time)
+
+
+def main():
+    tokens = Lexer(engine='regex').lex(generate_program(statement_count))
+    (tree_bytes, tree) = traced_bytes(lambda: Parser(backend='pratt').parse(tokens))
+    (flat_bytes, flat) = traced_bytes(lambda: FlatAst.from_tree(tree))
+    nodes = len(flat)
+
+    rows = [measure('objects', nodes, tree_bytes, tree)]
+    # the object tree has to be gone for the collector to only see the flat form
+    del tree
+    rows.append(measure('flat', nodes, flat_bytes, flat.node()))
+
+    report('AST representations', ('form', 'nodes', 'bytes/node', 'gc seconds', 'typecheck seconds'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import random
+
+
+int_names = ['wildcat', 'ducks', 'geese', 'count', 'total']
+float_names = ['duck', 'goose', 'weight', 'ratio', 'speed']
+array_name = 'birds'
+array_size = 16
+
+int_ops = ['+', '-', '*', '/', '%']
+float_ops = ['+', '-', '*', '/']
+
+
+def int_expr(rng, depth, runnable=False):
+    if depth <= 0 or rng.random() < 0.3:
+        return rng.choice([
+            str(rng.randint(0, 1000)),
+            rng.choice(int_names),
+            '{}[{}]'.format(array_name, rng.randint(0, array_size - 1)),
+        ])
+
+    left = int_expr(rng, depth - 1, runnable)
+    op = rng.choice(int_ops)
+    if runnable and op in ('/', '%'):
+        # int division by zero is an error at run time
+        return '{} {} {}'.format(left, op, rng.randint(1, 1000))
+
+    return '{} {} {}'.format(left, op, int_expr(rng, depth - 1, runnable))
+
+
+def float_expr(rng, depth):
+    if depth <= 0 or rng.random() < 0.3:
+        return rng.choice(['{:.2f}'.format(rng.uniform(0, 100)), rng.choice(float_names)])
+
+    return '({} {} {})'.format(float_expr(rng, depth - 1), rng.choice(float_ops), float_expr(rng, depth - 1))
+
+
+def statement(rng, depth, runnable=False):
+    roll = rng.random()
+    if roll < 0.4:
+        return '{} = {};'.format(rng.choice(int_names), int_expr(rng, 3, runnable))
+    elif roll < 0.7:
+        return '{} = {};'.format(rng.choice(float_names), float_expr(rng, 3))
+    elif roll < 0.85 or depth <= 0:
+        return '{}[{}] = {};'.format(array_name, rng.randint(0, array_size - 1), int_expr(rng, 2, runnable))
+    else:
+        return 'if ({}) {{\n  {}\n}} else {{\n  {}\n}}'.format(
+            int_expr(rng, 2, runnable), statement(rng, depth - 1, runnable), statement(rng, depth - 1, runnable))
+
+
+def declarations():
+    return [
+        'int {}, {}[{}];'.format(', '.join(int_names), array_name, array_size),
+        'float {};'.format(', '.join(float_names)),
+    ]
+
+
+def generate_program(statements, seed=0, runnable=False):
+    '''Returns a well-typed minic program with `statements` top-level statements.
+
+    Runnable programs only divide ints by nonzero literals, so they run
+    without errors.'''
+    rng = random.Random(seed)
+    lines = declarations() + [statement(rng, 2, runnable) for _ in range(statements)]
+    return '\n'.join(lines) + '\n'
+
+
+def generate_program_of_size(megabytes, seed=0):
+    '''Returns a generated program that is at least `megabytes` long.'''
+    target = int(megabytes * 1024 * 1024)
+    rng = random.Random(seed)
+    lines = declarations()
+    size = sum(len(line) + 1 for line in lines)
+
+    while size < target:
+        line = statement(rng, 2)
+        lines.append(line)
+        size += len(line) + 1
+
+    return '\n'.join(lines) + '\n'
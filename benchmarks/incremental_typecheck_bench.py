@@ -0,0 +1,47 @@
+import compiler.parser.ast as ast
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.typechecker.incremental import IncrementalTypechecker
+from compiler.typechecker.typechecker import Typechecker
+from benchmarks.generate import float_names, generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+
+def main():
+    tokens = Lexer(engine='regex').lex(generate_program(statement_count))
+    tree = Parser(backend='pratt').parse(tokens)
+    middle = len(tree.statements) // 2
+
+    edits = [
+        ('one assignment', middle, [ast.Assignment(ast.ID('wildcat'), ast.Float(1.0))]),
+        # `float duck, goose, weight, ratio, speed;` -> `float duck, goose, weight, speed; int ratio;`
+        ('declaration', 1, [
+            ast.Declaration('float', [ast.ID(name) for name in float_names if name != 'ratio']),
+            ast.Declaration('int', [ast.ID('ratio')]),
+        ]),
+    ]
+
+    (full_time, _) = best_of(lambda: Typechecker().typecheck(tree), repeat=3)
+    (index_time, _) = best_of(lambda: IncrementalTypechecker().typecheck(tree), repeat=1)
+    rows = [('full check', '-', '%.3f' % full_time), ('first incremental check', '-', '%.3f' % index_time)]
+
+    for (name, position, statements) in edits:
+        edited = ast.Block(tree.statements[:position] + statements + tree.statements[position + 1:])
+        typechecker = IncrementalTypechecker()
+        typechecker.typecheck(tree)
+
+        def update():
+            return typechecker.update(edited, position, position + 1, position + len(statements))
+
+        (update_time, result) = best_of(update, repeat=1)
+        assert result.get_errors() == Typechecker().typecheck(edited).get_errors()
+        rows.append(('edit ' + name, '%d' % len(result.get_errors()), '%.3f' % update_time))
+
+    report('Incremental typechecking of %d statements' % statement_count, ('check', 'errors', 'seconds'), rows)
+
+
+if __name__ == '__main__':
+    main()
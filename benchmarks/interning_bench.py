@@ -0,0 +1,64 @@
+import gc
+import tracemalloc
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+
+def count_objects(tree):
+    seen = set()
+    stack = [tree]
+
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+
+        seen.add(id(node))
+        for value in (getattr(node, field) for field in type(node).fields):
+            if isinstance(value, list):
+                stack.extend(value)
+            elif hasattr(type(value), 'fields'):
+                stack.append(value)
+
+    return len(seen)
+
+
+def main():
+    tokens = Lexer(engine='regex').lex(generate_program(statement_count))
+
+    rows = []
+    for intern in [False, True]:
+        def parse(parser):
+            tokens.rewind()
+            return parser.parse(tokens)
+
+        # a new parser for each timed run, so interning starts from an empty table
+        (parse_time, _) = best_of(lambda: parse(Parser(backend='pratt', intern=intern)), repeat=3)
+
+        parser = Parser(backend='pratt', intern=intern)
+        gc.collect()
+        tracemalloc.start()
+        tree = parse(parser)
+        (tree_bytes, _) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # parsed with the same parser, so with interning the trees share all expressions
+        other = parse(parser)
+        (eq_time, equal) = best_of(lambda: tree == other, repeat=3)
+        assert equal
+
+        rows.append(('on' if intern else 'off', count_objects(tree), '%.1f' % (tree_bytes / 2 ** 20),
+                     '%.3f' % parse_time, '%.4f' % eq_time))
+        del tree, other
+
+    report('AST interning', ('interning', 'node objects', 'MiB', 'parse seconds', 'eq seconds'), rows)
+
+
+if __name__ == '__main__':
+    main()
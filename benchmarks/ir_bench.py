@@ -0,0 +1,47 @@
+import time
+import tracemalloc
+
+from compiler.ir.builder import IrBuilder
+from compiler.ir.passes import default_passes
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from benchmarks.generate import generate_program
+from benchmarks.utils import report
+
+
+statement_count = 100000
+
+
+def main():
+    tree = Parser(backend='pratt').parse(Lexer(engine='regex').lex(generate_program(statement_count)))
+
+    start = time.perf_counter()
+    function = IrBuilder().build(tree)
+    build_time = time.perf_counter() - start
+
+    # traced separately, tracing slows building down
+    tracemalloc.start()
+    ir_memory = -tracemalloc.get_traced_memory()[0]
+    traced = IrBuilder().build(tree)
+    ir_memory += tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    count = function.instruction_count()
+    rows = [('build', '-', count, '-', '%.3f' % build_time)]
+    for optimization in default_passes:
+        before = function.instruction_count()
+        start = time.perf_counter()
+        rewritten = optimization(function)
+        elapsed = time.perf_counter() - start
+        after = function.instruction_count()
+        rows.append((optimization.__name__, before, after, '%+d (%d rewritten)' % (after - before, rewritten),
+                     '%.3f' % elapsed))
+
+    report('IR of %d statements, %d blocks, %.0f bytes per built instruction' % (
+        statement_count, len(function.blocks), ir_memory / count),
+        ('pass', 'before', 'after', 'delta', 'seconds'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+from collections.abc import Sequence
+
+from compiler.lexer.lexer import Lexer
+from benchmarks.generate import generate_program_of_size
+from benchmarks.utils import best_of, report
+
+
+sizes_mb = [1, 4]
+engines = ['rply', 'regex']
+
+
+def count_tokens(lexer, source):
+    tokens = lexer.lex(source)
+    return len(tokens) if isinstance(tokens, Sequence) else sum(1 for _ in tokens)
+
+
+def main():
+    rows = []
+
+    for size in sizes_mb:
+        source = generate_program_of_size(size)
+
+        for engine in engines:
+            lexer = Lexer(engine=engine).lexer
+            (elapsed, tokens) = best_of(lambda: count_tokens(lexer, source), repeat=1)
+            rows.append((size, engine, tokens, '%.3f' % elapsed, '%.0f' % (tokens / elapsed)))
+
+    report('Lexer throughput', ('MB', 'engine', 'tokens', 'seconds', 'tokens/sec'), rows)
+
+
+if __name__ == '__main__':
+    main()
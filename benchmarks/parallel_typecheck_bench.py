@@ -0,0 +1,32 @@
+import os
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.typechecker.typechecker import Typechecker
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 200000
+worker_counts = [1, 2, 4, 8]
+
+
+def main():
+    tokens = Lexer(engine='regex').lex(generate_program(statement_count))
+    tree = Parser(backend='pratt').parse(tokens)
+    typechecker = Typechecker()
+
+    (sequential_time, expected) = best_of(lambda: typechecker.typecheck(tree), repeat=3)
+    rows = [('sequential', '%.3f' % sequential_time, '1.00')]
+
+    for workers in worker_counts:
+        (parallel_time, result) = best_of(lambda: typechecker.typecheck(tree, workers=workers), repeat=3)
+        assert result.get_errors() == expected.get_errors()
+        rows.append(('%d workers' % workers, '%.3f' % parallel_time, '%.2f' % (sequential_time / parallel_time)))
+
+    report('Typechecking %d statements on %d cpus' % (statement_count, os.cpu_count()),
+           ('mode', 'seconds', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import warnings
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_counts = [10000, 100000]
+backends = ['rply', 'pratt']
+
+
+def main():
+    warnings.simplefilter('ignore')
+    lexer = Lexer(engine='regex')
+    rows = []
+
+    for count in statement_counts:
+        tokens = lexer.lex(generate_program(count))
+        trees = []
+
+        for backend in backends:
+            parser = Parser(backend=backend)
+
+            def parse():
+                tokens.rewind()
+                return parser.parse(tokens)
+
+            (elapsed, tree) = best_of(parse, repeat=3)
+            trees.append(tree)
+            rows.append((count, backend, len(tokens), '%.3f' % elapsed, '%.0f' % (len(tokens) / elapsed)))
+
+        assert trees[0] == trees[1]
+
+    report('Parser backends', ('statements', 'backend', 'tokens', 'seconds', 'tokens/sec'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import warnings
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from benchmarks.utils import best_of, report
+
+
+statement_counts = [10000, 100000, 1000000]
+
+
+def main():
+    warnings.simplefilter('ignore')
+    lexer = Lexer(engine='regex')
+    parser = Parser()
+    rows = []
+
+    for count in statement_counts:
+        tokens = lexer.lex('wildcat = 1;\n' * count)
+
+        def parse():
+            tokens.rewind()
+            return parser.parse(tokens)
+
+        (elapsed, tree) = best_of(parse, repeat=1)
+        assert len(tree.statements) == count
+        rows.append((count, '%.3f' % elapsed, '%.2f' % (elapsed / count * 1e6)))
+
+    report('Parsing N statements', ('statements', 'seconds', 'us/statement'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import tempfile
+import warnings
+
+from compiler.parser.parser import Parser
+from benchmarks.utils import best_of, report
+
+
+cold_start = '''
+import time
+start = time.perf_counter()
+from compiler.parser.parser import Parser
+Parser(tables_path={!r})
+print(time.perf_counter() - start)
+'''
+
+
+def cold_start_time(tables_path):
+    '''Imports and builds a parser in a fresh interpreter'''
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', cold_start.format(tables_path)])
+    return float(output)
+
+
+def main():
+    warnings.simplefilter('ignore')
+    rows = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        tables_path = os.path.join(directory, 'parsetab.json')
+        Parser(tables_path=tables_path)
+
+        (generated, _) = best_of(lambda: Parser(tables_path=None), repeat=5)
+        (loaded, _) = best_of(lambda: Parser(tables_path=tables_path), repeat=5)
+        rows.append(('Parser()', '%.1f' % (generated * 1000), '%.1f' % (loaded * 1000)))
+
+        cold_generated = min(cold_start_time(None) for _ in range(3))
+        cold_loaded = min(cold_start_time(tables_path) for _ in range(3))
+        rows.append(('import + Parser()', '%.1f' % (cold_generated * 1000), '%.1f' % (cold_loaded * 1000)))
+
+    report('Parser startup', ('', 'generated ms', 'stored tables ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import tempfile
+
+from compiler.codegen.python_codegen import PythonCodegen, run_code
+from compiler.compiler import create_compiler
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.utils import Logger
+from compiler.vm.bytecode import BytecodeCompiler
+from compiler.vm.vm import VM
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+quiet = Logger(write_fn=lambda output: None)
+
+
+def main():
+    source = generate_program(statement_count, runnable=True)
+    tree = Parser(backend='pratt').parse(Lexer(engine='regex').lex(source))
+
+    program = BytecodeCompiler().compile(tree)
+    (vm_time, vm_result) = best_of(lambda: VM().run(program), repeat=3)
+    (generate_time, python_source) = best_of(lambda: PythonCodegen().generate(tree), repeat=3)
+    (compile_time, code) = best_of(lambda: compile(python_source, '<minic>', 'exec'), repeat=3)
+    (python_time, python_result) = best_of(lambda: run_code(code), repeat=3)
+    assert repr(vm_result) == repr(python_result)
+
+    with tempfile.TemporaryDirectory() as path:
+        compiler = create_compiler(quiet, backend='python', code_cache_path=path)
+        (miss_time, _) = best_of(lambda: compiler.run(source), repeat=1)
+        (memory_time, _) = best_of(lambda: compiler.run(source), repeat=3)
+        (disk_time, _) = best_of(lambda: create_compiler(quiet, backend='python', code_cache_path=path).run(source),
+                                 repeat=3)
+
+    report('Running %d statements' % statement_count, ('backend', 'seconds'), [
+        ('vm', '%.3f' % vm_time),
+        ('python code object', '%.3f' % python_time),
+    ])
+    report('Python backend, source to result', ('stage', 'seconds'), [
+        ('generate python source', '%.3f' % generate_time),
+        ('compile to code object', '%.3f' % compile_time),
+        ('compiler.run, cache miss', '%.3f' % miss_time),
+        ('compiler.run, in memory', '%.3f' % memory_time),
+        ('compiler.run, from disk', '%.3f' % disk_time),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import random
+
+from compiler.lexer.regex_lexer import RegexLexer
+from benchmarks.generate import generate_program_of_size
+from benchmarks.utils import best_of, report
+
+
+sizes_mb = [1, 4]
+edits = 20
+
+
+def random_edits(source, count):
+    '''One-character replacements of digits, which keep the source valid.'''
+    rng = random.Random(0)
+    digits = [idx for (idx, char) in enumerate(source) if char.isdigit()]
+    return [(idx, 1, str(rng.randrange(10))) for idx in rng.sample(digits, count)]
+
+
+def main():
+    lexer = RegexLexer()
+    rows = []
+
+    for size in sizes_mb:
+        source = generate_program_of_size(size)
+        store = lexer.lex(source)
+        changes = random_edits(source, edits)
+
+        (full, _) = best_of(lambda: [lexer.lex(source[:o] + i + source[o + d:]) for (o, d, i) in changes], repeat=1)
+        (incremental, _) = best_of(lambda: [lexer.relex(store, o, d, i) for (o, d, i) in changes], repeat=1)
+
+        rows.append((size, len(store), '%.2f' % (full / edits * 1000), '%.2f' % (incremental / edits * 1000),
+                     '%.0fx' % (full / incremental)))
+
+    report('Re-lexing after a one-character edit', ('MB', 'tokens', 'full ms', 'incremental ms', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
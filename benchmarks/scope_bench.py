@@ -0,0 +1,89 @@
+import tracemalloc
+from array import array
+
+import compiler.parser.ast as ast
+from compiler.typechecker.typechecker import SymbolTable, Typechecker
+from benchmarks.utils import best_of, report
+
+
+scope_count = 2000
+global_counts = [10, 1000, 50000]
+
+
+class CopyingTable(SymbolTable):
+    '''Scopes by copying the whole table on entering a block'''
+    def __init__(self):
+        super().__init__()
+        self.outer = []
+
+    def enter_scope(self):
+        self.outer.append(self.declarations)
+        self.declarations = array('B', self.declarations)
+
+    def leave_scope(self):
+        self.declarations = self.outer.pop()
+        self.expression_types.clear()
+
+
+def block(global_count, i, statements):
+    '''`{ float local_i; local_i = global_j + 1.0; int global_j; global_j = 2; ... }`'''
+    name = 'global_%d' % (i % global_count)
+    return ast.Block([
+        ast.Declaration('float', [ast.ID('local_%d' % i)]),
+        ast.Assignment(ast.ID('local_%d' % i), ast.BinOp('+', ast.ID(name), ast.Float(1.0))),
+        ast.Declaration('int', [ast.ID(name)]),
+        ast.Assignment(ast.ID(name), ast.Integer(2)),
+    ] + statements)
+
+
+def declarations(global_count):
+    return [ast.Declaration('float', [ast.ID('global_%d' % i) for i in range(global_count)])]
+
+
+def nested_program(global_count):
+    '''`scope_count` blocks, each in the one before'''
+    inner = []
+    for i in reversed(range(scope_count)):
+        inner = [ast.IfStatement(ast.Integer(1), block(global_count, i, inner), ast.Block([]))]
+
+    return ast.Block(declarations(global_count) + inner)
+
+
+def sibling_program(global_count):
+    '''`scope_count` blocks one after the other'''
+    return ast.Block(declarations(global_count) + [
+        ast.IfStatement(ast.Integer(1), block(global_count, i, []), ast.Block([])) for i in range(scope_count)
+    ])
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    rows = []
+    for (shape, make_program) in [('nested', nested_program), ('sibling', sibling_program)]:
+        for global_count in global_counts:
+            tree = make_program(global_count)
+            typechecker = Typechecker()
+            (copy_time, copy_report) = best_of(lambda: typechecker.typecheck(tree, CopyingTable()), repeat=3)
+            (scope_time, scope_report) = best_of(lambda: typechecker.typecheck(tree, SymbolTable()), repeat=3)
+            assert copy_report.get_errors() == scope_report.get_errors()
+
+            copy_peak = peak_memory(lambda: typechecker.typecheck(tree, CopyingTable()))
+            scope_peak = peak_memory(lambda: typechecker.typecheck(tree, SymbolTable()))
+
+            rows.append((shape, global_count, '%.3f' % copy_time, '%.3f' % scope_time,
+                         '%.1f' % (copy_peak / 2 ** 20), '%.1f' % (scope_peak / 2 ** 20)))
+
+    report('Typechecking %d blocks (each if statement has two)' % (2 * scope_count),
+           ('program', 'visible ids', 'copying s', 'scoped s', 'copying peak MiB', 'scoped peak MiB'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+from compiler.compiler import create_compiler
+from compiler.utils import Logger
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 10000
+
+
+def main():
+    source = generate_program(statement_count)
+    logger = Logger(write_fn=lambda output: None)
+
+    rows = []
+    for (name, options) in [('off', {}), ('stats', {'collect_stats': True}),
+                            ('memory', {'collect_stats': True, 'trace_memory': True})]:
+        compiler = create_compiler(logger, lexer_engine='regex', parser_backend='pratt', **options)
+        (typecheck_time, _) = best_of(lambda: compiler.typecheck(source), repeat=3)
+        stages = compiler.stats.stages if compiler.stats else {}
+        rows.append((name, '%.3f' % typecheck_time,
+                     *('%.3f' % stages[stage].wall if stages else '-' for stage in ('LEXER', 'PARSER', 'TYPECHECKER'))))
+
+    print('Stages of typechecking %d statements with memory tracing:\n%r\n' % (statement_count, compiler.stats))
+    report('Typecheck time without stats, with stats and with memory tracing, and the own time of each stage',
+           ('stats', 'typecheck s', 'lexer s', 'parser s', 'typechecker s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import random
+import sys
+
+import compiler.parser.ast as ast
+from compiler.typechecker.typechecker import SymbolTable
+from benchmarks.utils import best_of, report
+
+
+name_count = 1000
+lookup_count = 1000000
+
+
+class NameTable:
+    '''The previous symbol table, a dict from names to type names'''
+    def __init__(self):
+        self.declarations = {}
+
+    @staticmethod
+    def extract_id_name(ast_variable):
+        if ast_variable.node_class is ast.ID:
+            return ast_variable.name
+        elif ast_variable.node_class is ast.ArrayRef:
+            return ast_variable.id.name
+
+    def add_declaration(self, ast_declaration):
+        for ast_variable in ast_declaration.ids:
+            self.declarations[NameTable.extract_id_name(ast_variable)] = ast_declaration.type
+
+    def get_id_type(self, ast_variable):
+        return self.declarations[NameTable.extract_id_name(ast_variable)]
+
+
+def main():
+    rng = random.Random(0)
+    names = ['variable_%d' % i for i in range(name_count)]
+    declarations = [ast.Declaration(rng.choice(['int', 'float']), [ast.ID(name)]) for name in names]
+    lookups = [rng.choice([ast.ID(name), ast.ArrayRef(ast.ID(name), ast.Integer(0))])
+               for name in rng.choices(names, k=lookup_count)]
+
+    name_table = NameTable()
+    symbol_table = SymbolTable()
+    for declaration in declarations:
+        name_table.add_declaration(declaration)
+        symbol_table.add_declaration(declaration)
+
+    def lookup_by_name():
+        return [name_table.get_id_type(variable) for variable in lookups]
+
+    def lookup_by_symbol():
+        return [symbol_table.get_id_type(variable) for variable in lookups]
+
+    (name_time, _) = best_of(lookup_by_name, repeat=3)
+    (symbol_time, _) = best_of(lookup_by_symbol, repeat=3)
+
+    rows = [
+        ('dict by name', sys.getsizeof(name_table.declarations), '%.0f' % (name_time / lookup_count * 1e9)),
+        ('array by symbol id', sys.getsizeof(symbol_table.declarations), '%.0f' % (symbol_time / lookup_count * 1e9)),
+    ]
+    report('Looking up the type of %d ids' % lookup_count, ('table', 'table bytes', 'ns/lookup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import tracemalloc
+from rply import Token
+
+from compiler.lexer.regex_lexer import RegexLexer
+from benchmarks.generate import generate_program
+from benchmarks.utils import report
+
+
+token_count = 1000000
+
+
+def traced(fn):
+    '''Returns the memory held by the result of `fn` and the result itself.'''
+    tracemalloc.start()
+    result = fn()
+    (current, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current, result)
+
+
+def generate_source(tokens):
+    sample = 1000
+    tokens_per_statement = len(RegexLexer().lex(generate_program(sample))) / sample
+    return generate_program(int(tokens / tokens_per_statement) + 1)
+
+
+def main():
+    source = generate_source(token_count)
+    lexer = RegexLexer()
+
+    (store_bytes, store) = traced(lambda: lexer.lex(source))
+    # the same objects the rply lexer allocates: a Token, its value and its SourcePosition
+    (token_bytes, tokens) = traced(lambda: [Token(t.name, t.value, t.source_pos) for t in store])
+
+    rows = [
+        ('rply.Token list', len(tokens), token_bytes, '%.1f' % (token_bytes / len(tokens))),
+        ('TokenStore', len(store), store_bytes, '%.1f' % (store_bytes / len(store))),
+    ]
+
+    report('Token memory', ('representation', 'tokens', 'bytes', 'bytes/token'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+import time
+
+
+def best_of(fn, repeat=3):
+    '''Runs `fn` `repeat` times, returns the best wall time and the last result.'''
+    best = None
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return (best, result)
+
+
+def report(title, header, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+    line = '  '.join('{:>%d}' % width for width in widths)
+
+    print(title)
+    print(line.format(*header))
+    for row in rows:
+        print(line.format(*row))
+    print()
@@ -0,0 +1,82 @@
+import compiler.parser.ast as ast
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.parser.visitor import Visitor, child_nodes
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+
+def count_with_ladder(tree):
+    '''Counts the nodes of each class dispatching with a chain of type tests'''
+    counts = dict.fromkeys(ast.node_classes, 0)
+    stack = [tree]
+
+    while stack:
+        node = stack.pop()
+        cls = type(node)
+
+        if cls is ast.Block:
+            counts[ast.Block] += 1
+        elif cls is ast.Statement:
+            counts[ast.Statement] += 1
+        elif cls is ast.Assignment:
+            counts[ast.Assignment] += 1
+        elif cls is ast.Declaration:
+            counts[ast.Declaration] += 1
+        elif cls is ast.IfStatement:
+            counts[ast.IfStatement] += 1
+        elif cls is ast.ArrayRef:
+            counts[ast.ArrayRef] += 1
+        elif cls is ast.UnaryOp:
+            counts[ast.UnaryOp] += 1
+        elif cls is ast.BinOp:
+            counts[ast.BinOp] += 1
+        elif cls is ast.ID:
+            counts[ast.ID] += 1
+        elif cls is ast.Float:
+            counts[ast.Float] += 1
+        elif cls is ast.Integer:
+            counts[ast.Integer] += 1
+
+        stack.extend(reversed(child_nodes(node)))
+
+    return counts
+
+
+class Counter(Visitor):
+    '''Counts the nodes of each class through the dispatch table'''
+    def __init__(self):
+        self.counts = dict.fromkeys(ast.node_classes, 0)
+
+    def generic_visit(self, node):
+        self.counts[node.node_class] += 1
+        return child_nodes(node)
+
+
+def count_with_visitor(tree):
+    counter = Counter()
+    counter.visit(tree)
+    return counter.counts
+
+
+def main():
+    tokens = Lexer(engine='regex').lex(generate_program(statement_count))
+    tree = Parser(backend='pratt').parse(tokens)
+
+    (ladder_time, ladder_counts) = best_of(lambda: count_with_ladder(tree), repeat=3)
+    (visitor_time, visitor_counts) = best_of(lambda: count_with_visitor(tree), repeat=3)
+    assert ladder_counts == visitor_counts
+
+    nodes = sum(visitor_counts.values())
+    rows = [
+        ('if/elif ladder', nodes, '%.3f' % ladder_time, '%.0f' % (ladder_time / nodes * 1e9)),
+        ('dispatch table', nodes, '%.3f' % visitor_time, '%.0f' % (visitor_time / nodes * 1e9)),
+    ]
+    report('Visiting every node', ('dispatch', 'nodes', 'seconds', 'ns/node'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.vm.bytecode import BytecodeCompiler
+from compiler.vm.vm import VM
+from benchmarks.generate import generate_program
+from benchmarks.utils import best_of, report
+
+
+statement_count = 100000
+
+
+def main():
+    tokens = Lexer(engine='regex').lex(generate_program(statement_count, runnable=True))
+    tree = Parser(backend='pratt').parse(tokens)
+
+    (compile_time, program) = best_of(lambda: BytecodeCompiler().compile(tree), repeat=3)
+    counting_vm = VM(counting=True)
+    counting_vm.run(program)
+    (run_time, _) = best_of(lambda: VM().run(program), repeat=3)
+
+    rows = [
+        ('compile', len(program.code) // 2, '%.3f' % compile_time, '-'),
+        ('run', counting_vm.executed, '%.3f' % run_time, '%.2f' % (counting_vm.executed / run_time / 1e6)),
+    ]
+    report('Bytecode for %d statements' % statement_count, ('stage', 'instructions', 'seconds', 'Mops/s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+
+import compiler.parser.ast as ast
+from compiler.codegen.python_codegen import RightOperand, expression_height, max_inline_height
+from compiler.parser.visitor import Leave
+from compiler.typechecker.typechecker import Operands, float_type, int_type
+from compiler.vm.arithmetic import int_min, wrap
+from compiler.vm.bytecode import comparison_ops, short_circuit_ops
+from compiler.vm.scopes import VariableScopes
+
+
+c_types = {int_type: 'int64_t', float_type: 'double'}
+
+# top-level statements per generated function, so compile time grows linearly with the program
+part_size = 2000
+
+# C flags keeping floats IEEE 754: no contraction into fused multiply-adds, no fast math
+default_flags = ['-std=c99', '-O2', '-ffp-contract=off', '-fno-fast-math']
+
+failure_status = 3
+
+errors = {error.__name__: error for error in (ZeroDivisionError, IndexError, ValueError, OverflowError)}
+
+# helpers with the VM's semantics, which C leaves undefined or implementation-defined
+prelude = r'''#include <inttypes.h>
+#include <math.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+
+static void fail(const char *error) {
+    fflush(stdout);
+    fputs(error, stderr);
+    exit(%(failure_status)d);
+}
+
+static inline int64_t add_int(int64_t a, int64_t b) { return (int64_t)((uint64_t)a + (uint64_t)b); }
+static inline int64_t sub_int(int64_t a, int64_t b) { return (int64_t)((uint64_t)a - (uint64_t)b); }
+static inline int64_t mul_int(int64_t a, int64_t b) { return (int64_t)((uint64_t)a * (uint64_t)b); }
+static inline int64_t neg_int(int64_t a) { return (int64_t)(0 - (uint64_t)a); }
+
+static inline int64_t div_int(int64_t a, int64_t b) {
+    if (b == 0) fail("ZeroDivisionError");
+    return b == -1 ? neg_int(a) : a / b;
+}
+
+static inline int64_t mod_int(int64_t a, int64_t b) {
+    if (b == 0) fail("ZeroDivisionError");
+    return b == -1 ? 0 : a %% b;
+}
+
+/* truncates, and wraps values outside of int64_t around like the VM */
+static inline int64_t to_int(double v) {
+    if (isnan(v)) fail("ValueError");
+    if (isinf(v)) fail("OverflowError");
+    if (v >= -9223372036854775808.0 && v < 9223372036854775808.0) return (int64_t)v;
+
+    double r = fmod(trunc(v), 18446744073709551616.0);
+    return (int64_t)(uint64_t)(r < 0 ? r + 18446744073709551616.0 : r);
+}
+
+/* compares exactly, like Python, and not after converting the int: -1, 0 or 1, 2 if d is NaN */
+static inline int compare_int_float(int64_t i, double d) {
+    if (isnan(d)) return 2;
+    if (d >= 9223372036854775808.0) return -1;
+    if (d < -9223372036854775808.0) return 1;
+
+    double t = trunc(d);
+    int64_t ti = (int64_t)t;
+    if (i != ti) return i < ti ? -1 : 1;
+    return t < d ? -1 : (t > d ? 1 : 0);
+}
+
+static inline int compare_float_int(double d, int64_t i) {
+    int c = compare_int_float(i, d);
+    return c == 2 ? 2 : -c;
+}
+
+static inline int64_t compared_eq(int c) { return c == 0; }
+static inline int64_t compared_ne(int c) { return c != 0; }
+static inline int64_t compared_lt(int c) { return c == -1; }
+static inline int64_t compared_le(int c) { return c == -1 || c == 0; }
+static inline int64_t compared_gt(int c) { return c == 1; }
+static inline int64_t compared_ge(int c) { return c == 1 || c == 0; }
+
+static inline int64_t check_index(int64_t index, int64_t size) {
+    if (index < 0 || index >= size) fail("IndexError");
+    return index;
+}
+''' % {'failure_status': failure_status}
+
+compared = {'==': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+
+int_helpers = {'+': 'add_int', '-': 'sub_int', '*': 'mul_int', '/': 'div_int', '%': 'mod_int'}
+
+
+def converted(fragment, type_code):
+    '''The text of `fragment` converted to `type_code`'''
+    if fragment[1] == type_code:
+        return fragment[0]
+    elif type_code == int_type:
+        return 'to_int({})'.format(fragment[0])
+
+    return '(double)({})'.format(fragment[0])
+
+
+class CCodegen(VariableScopes):
+    '''Translates an AST to a C program, which runs the program and prints
+    the values of its top-level variables, one per line.
+
+    Every variable gets static storage, `int64_t` or `double`, arrays
+    fixed-size ones. Int arithmetic wraps around and division by zero,
+    indexing outside an array and converting NaN or infinities to ints
+    exit with the name of the Python error the VM raises. Floats are C
+    doubles, printed in hex so they read back exactly.
+
+    Statements aren't nested: if statements jump over the branch they
+    don't take, and top-level statements are split across functions of
+    `part_size` statements. Expressions deeper than `max_inline_height`
+    are split into temporaries.'''
+    def generate(self, tree):
+        self.start()
+        self.parts = []
+        self.start_part()
+        self.label_count = 0
+        self.labels = []  # of the if statements being visited
+        self.visit(tree)
+        self.end_part()
+
+        lines = [prelude]
+        for variable in self.scalars:
+            lines.append('static {} {};'.format(c_types[variable.type], self.local(variable)))
+        for variable in self.arrays:
+            lines.append('static {} {}[{}];'.format(c_types[variable.type], self.local(variable), variable.size))
+
+        for (i, part) in enumerate(self.parts):
+            lines.append('\nstatic void part_{}(void) {{'.format(i))
+            lines += ['    ' + line for line in part]
+            lines.append('}')
+
+        lines.append('\nint main(void) {')
+        lines += ['    part_{}();'.format(i) for i in range(len(self.parts))]
+        for variable in self.variables.values():
+            print_format = '"%" PRId64 "\\n"' if variable.type == int_type else '"%a\\n"'
+            if variable.size is None:
+                lines.append('    printf({}, {});'.format(print_format, self.local(variable)))
+            else:
+                lines.append('    for (int i = 0; i < {}; i++) printf({}, {}[i]);'.format(
+                    variable.size, print_format, self.local(variable)))
+        lines += ['    return 0;', '}']
+
+        return '\n'.join(lines) + '\n'
+
+    def local(self, variable):
+        return '{}_{}{}'.format(variable.name, 'v' if variable.size is None else 'a', variable.index)
+
+    def start_part(self):
+        self.lines = []
+        self.temps = []
+        self.statement_count = 0
+
+    def end_part(self):
+        temps = ['{} {};'.format(c_types[type_code], name) for (name, type_code) in self.temps]
+        self.parts.append(temps + self.lines)
+
+    def statement_done(self):
+        '''Starts a new function after `part_size` top-level statements'''
+        if len(self.scopes) == 1:
+            self.statement_count += 1
+            if self.statement_count == part_size:
+                self.end_part()
+                self.start_part()
+
+    def new_label(self):
+        self.label_count += 1
+        return self.label_count
+
+    def new_temp(self, type_code):
+        name = 't{}'.format(len(self.temps))
+        self.temps.append((name, type_code))
+        return name
+
+    def index(self, ast_variable):
+        variable = self.variable(ast_variable)
+        index = converted(self.expression(ast_variable.idx), int_type)
+        return '{}[check_index({}, {})]'.format(self.local(variable), index, variable.size)
+
+    def visit_Assignment(self, node):
+        variable = self.variable(node.id)
+        target = self.local(variable) if variable.size is None else self.index(node.id)
+        self.lines.append('{} = {};'.format(target, converted(self.expression(node.expr), variable.type)))
+        self.statement_done()
+
+    def visit_Statement(self, node):
+        self.lines.append('(void)({});'.format(self.expression(node.expr)[0]))
+        self.statement_done()
+
+    def visit_IfStatement(self, node):
+        label = self.new_label()
+        self.labels.append(label)
+        self.lines.append('if (!({})) goto else_{};'.format(self.expression(node.cond)[0], label))
+        return (node.then, Leave(CCodegen.else_branch, node), node.otherwise)
+
+    def else_branch(self, node):
+        label = self.labels[-1]
+        if node.otherwise.statements:
+            self.lines.append('goto end_{};'.format(label))
+        self.lines.append('else_{}:;'.format(label))
+
+    def leave_IfStatement(self, node):
+        label = self.labels.pop()
+        if node.otherwise.statements:
+            self.lines.append('end_{}:;'.format(label))
+        self.statement_done()
+
+    def expression(self, root):
+        '''Returns the fragment computing `root`, a (text, type code) pair,
+           after emitting the temporaries it needs'''
+        split = expression_height(root) > max_inline_height
+        fragments = []
+        skips = []  # (label, result temporary) of the `&&` and `||` being split
+        stack = [root]
+
+        while stack:
+            node = stack.pop()
+
+            if type(node) is Operands:
+                node = node.node
+                if node.node_class is ast.BinOp and node.op in short_circuit_ops and split:
+                    (label, temp) = skips.pop()
+                    self.lines.append('{} = {} != 0;'.format(temp, fragments.pop()[0]))
+                    self.lines.append('skip_{}:;'.format(label))
+                    fragments.append((temp, int_type))
+                    continue
+
+                fragment = self.operation(node, fragments)
+                if split:
+                    temp = self.new_temp(fragment[1])
+                    self.lines.append('{} = {};'.format(temp, fragment[0]))
+                    fragment = (temp, fragment[1])
+                fragments.append(fragment)
+            elif type(node) is RightOperand:
+                # the temporaries of the right operand are only computed when it is evaluated
+                (label, temp) = (self.new_label(), self.new_temp(int_type))
+                decided = 0 if node.node.op == '&&' else 1
+                self.lines.append('{} = {};'.format(temp, decided))
+                self.lines.append('if ({}({})) goto skip_{};'.format(
+                    '!' if decided == 0 else '', fragments.pop()[0], label))
+                skips.append((label, temp))
+                stack.append(node.node.right)
+            elif node.node_class is ast.BinOp:
+                if node.op in short_circuit_ops and split:
+                    stack += [Operands(node), RightOperand(node), node.left]
+                else:
+                    stack += [Operands(node), node.right, node.left]
+            elif node.node_class is ast.UnaryOp:
+                stack += [Operands(node), node.expr]
+            elif node.node_class is ast.ArrayRef:
+                stack.append(Operands(node))
+            else:
+                fragments.append(self.leaf(node))
+
+        return fragments.pop()
+
+    def leaf(self, node):
+        cls = node.node_class
+        if cls is ast.Integer:
+            value = wrap(node.value)
+            if value == int_min:
+                return ('(-9223372036854775807 - 1)', int_type)
+            return (str(value) if value >= 0 else '({})'.format(value), int_type)
+        elif cls is ast.Float:
+            if math.isinf(node.value):
+                return ('HUGE_VAL' if node.value > 0 else '(-HUGE_VAL)', float_type)
+            return ('({})'.format(node.value.hex()), float_type)
+
+        variable = self.variable(node)
+        return (self.local(variable), variable.type)
+
+    def operation(self, node, fragments):
+        cls = node.node_class
+
+        if cls is ast.ArrayRef:
+            return (self.index(node), self.variable(node).type)
+        elif cls is ast.UnaryOp:
+            (text, type_code) = fragments.pop()
+            if node.op == '!':
+                return ('(int64_t)!({})'.format(text), int_type)
+
+            return ('neg_int({})'.format(text) if type_code == int_type else '(-{})'.format(text), type_code)
+
+        (right, left) = (fragments.pop(), fragments.pop())
+        op = node.op
+
+        if op in short_circuit_ops:
+            return ('(int64_t)(({}) {} ({}))'.format(left[0], op, right[0]), int_type)
+        elif op in comparison_ops:
+            if left[1] == right[1]:
+                return ('(int64_t)({} {} {})'.format(left[0], op, right[0]), int_type)
+
+            comparison = 'compare_int_float' if left[1] == int_type else 'compare_float_int'
+            return ('compared_{}({}({}, {}))'.format(compared[op], comparison, left[0], right[0]), int_type)
+        elif left[1] == int_type and right[1] == int_type:
+            return ('{}({}, {})'.format(int_helpers[op], left[0], right[0]), int_type)
+
+        (left, right) = (converted(left, float_type), converted(right, float_type))
+        if op == '%':
+            return ('fmod({}, {})'.format(left, right), float_type)
+
+        return ('({} {} {})'.format(left, op, right), float_type)
+
+
+def find_c_compiler():
+    '''The C compiler in $CC, or cc, gcc or clang on the path, None if there is none'''
+    if os.environ.get('CC'):
+        return shutil.which(os.environ['CC'])
+
+    for name in ('cc', 'gcc', 'clang'):
+        path = shutil.which(name)
+        if path:
+            return path
+
+    return None
+
+
+def build_executable(c_source, executable, cc=None, flags=default_flags):
+    '''Compiles `c_source` to `executable`, raising a CalledProcessError with the compiler's output on errors'''
+    cc = cc or find_c_compiler()
+    if cc is None:
+        raise FileNotFoundError('No C compiler, set CC or install cc')
+
+    c_path = executable + '.c'
+    with open(c_path, 'w') as f:
+        f.write(c_source)
+
+    subprocess.run([cc, *flags, '-o', executable, c_path, '-lm'], check=True, capture_output=True, text=True)
+
+
+def run_executable(executable, variables):
+    '''Runs a built program and returns the values of `variables`, its top-level variables.
+       Raises the error the VM would have raised if the program fails.'''
+    process = subprocess.run([executable], capture_output=True, text=True)
+    if process.returncode == failure_status and process.stderr in errors:
+        raise errors[process.stderr]('raised by %s' % executable)
+    elif process.returncode != 0:
+        raise RuntimeError('%s exited with status %d, %s' % (executable, process.returncode, process.stderr))
+
+    lines = iter(process.stdout.split('\n'))
+
+    def parse(variable):
+        line = next(lines)
+        return int(line) if variable.type == int_type else float.fromhex(line)
+
+    return {
+        name: parse(variable) if variable.size is None else [parse(variable) for _ in range(variable.size)]
+        for (name, variable) in variables.items()
+    }
+
+
+def run_c(c_source, variables, cc=None, flags=default_flags):
+    '''Builds `c_source` in a temporary directory, runs it and returns the values of `variables`'''
+    with tempfile.TemporaryDirectory() as path:
+        executable = os.path.join(path, 'program')
+        build_executable(c_source, executable, cc, flags)
+        return run_executable(executable, variables)
@@ -0,0 +1,81 @@
+import random
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.codegen.c_codegen import CCodegen, find_c_compiler, part_size, run_c
+from compiler.ir.ir_test import outcome, random_source
+from compiler.vm.bytecode_test import lexer, parser
+from compiler.vm.vm_test import run as run_vm
+
+
+def run_tree(tree):
+    codegen = CCodegen()
+    return run_c(codegen.generate(tree), codegen.variables)
+
+
+def run(source):
+    return run_tree(parser.parse(lexer.lex(source)))
+
+
+@unittest.skipUnless(find_c_compiler(), 'needs a C compiler')
+class TestCCodegen(unittest.TestCase):
+    def test_static_storage(self):
+        '''Gives every variable static storage: `int x; float f, a[2];`'''
+        source = CCodegen().generate(parser.parse(lexer.lex('int x; float f, a[2]; if (x) { int x; }')))
+
+        assert 'static int64_t x_v0;\nstatic double f_v1;\nstatic int64_t x_v2;\nstatic double a_a0[2];' in source
+
+    def test_same_as_vm(self):
+        '''Gives the VM's results, also on overflow, truncating division, IEEE floats and mixed comparisons'''
+        sources = [
+            'int a, b, c, d; a = 7 / (0 - 2); b = (0 - 7) / 2; c = (0 - 7) % 2; d = 7 % (0 - 2);',
+            'int a, b, c, d; a = 9223372036854775807 + 1; b = a - 1; c = a * 2; d = a / (0 - 1) + a % (0 - 1);',
+            'float a, b, c, d, e; a = 1.0 / 0.0; b = -1.0 / 0.0; c = 0.0 / 0.0; d = 7.5 % 2.0; e = -0.0;',
+            'int x, y, z; float f; x = 2.9; y = 0.0 - 2.9; f = 1000000000000000000000000000000.0; z = f;',
+            'int a, b, c; a = 9007199254740993 > 9007199254740992.0; b = 9007199254740993 == 9007199254740992.0; '
+            'c = 0.5 < 1;',
+            'int a, b, c, d, e, zero; a = (2 < 3) + (2 == 2.0) + (3 != 3); b = !0 + !5; '
+            'c = zero && 1 / zero; d = 1 || 1 / zero; e = (2 && 3) + (0 || 0.5);',
+            'int x, a[2]; if (x > 1) { a[0] = 1; } else { if (x) { x = 5; } else { a[1] = 1; } }',
+            'int x; x = 1; if (x) { float x; x = 2.5; } x = x + 1;',
+            'float a[3]; int i; i = 2; a[i] = a[1] + 0.1; a[i - 2] = -a[i];',
+        ]
+
+        for source in sources:
+            # parsed outside of outcome, which would count two matching syntax errors as agreement
+            tree = parser.parse(lexer.lex(source))
+            assert outcome(run_tree, tree) == outcome(run_vm, source), source
+
+    def test_errors(self):
+        '''Fails with the error the VM raises'''
+        with self.assertRaises(IndexError):
+            run('int a[3]; a[3] = 1;')
+        with self.assertRaises(IndexError):
+            run('int a[3], x; x = a[0 - 1];')
+        with self.assertRaises(ZeroDivisionError):
+            run('int x; x = 1 % x;')
+        with self.assertRaises(ValueError):
+            run('int x; x = 0.0 / 0.0;')
+        with self.assertRaises(OverflowError):
+            run('int x; x = 1.0 / 0.0;')
+
+    def test_large_programs(self):
+        '''Splits programs into functions, and deep expressions into temporaries'''
+        expression = ast.ID('x')
+        for i in range(1000):
+            expression = ast.BinOp('-', ast.Integer(i), expression)
+        guarded = ast.BinOp('||', ast.ID('x'), ast.BinOp('/', ast.Integer(1), ast.BinOp('*', expression, ast.ID('y'))))
+
+        statements = [ast.Declaration('int', [ast.ID('x'), ast.ID('y')])]
+        statements += [ast.Assignment(ast.ID('x'), ast.BinOp('+', ast.ID('x'), ast.Integer(1)))] * (part_size + 10)
+        statements += [ast.IfStatement(ast.ID('x'), ast.Block([ast.Assignment(ast.ID('y'), guarded)]), ast.Block([]))]
+
+        # `x` is nonzero, so `1 / (... * y)` isn't computed
+        assert run_tree(ast.Block(statements)) == {'x': part_size + 10, 'y': 1}
+
+    def test_random_programs(self):
+        '''Gives the VM's results or errors on random programs'''
+        rng = random.Random(0)
+        for _ in range(20):
+            source = random_source(rng, statements=30)
+            assert outcome(run, source) == outcome(run_vm, source), source
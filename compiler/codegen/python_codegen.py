@@ -0,0 +1,308 @@
+import hashlib
+import json
+import marshal
+import math
+import os
+import sys
+import tempfile
+from array import array
+
+import compiler.parser.ast as ast
+from compiler.parser.visitor import Leave
+from compiler.typechecker.typechecker import Operands, float_type, int_type
+from compiler.vm.arithmetic import check_index, float_div, float_mod, int_div, int_mod, wrap
+from compiler.vm.bytecode import comparison_ops, short_circuit_ops
+from compiler.vm.scopes import VariableScopes
+
+
+codegen_version = 1  # part of the cache key, bumped whenever the generated code changes
+
+max_inline_height = 30
+
+# what the generated code runs with
+runtime = {
+    'array': array,
+    'check_index': check_index,
+    'float_div': float_div,
+    'float_mod': float_mod,
+    'int_div': int_div,
+    'int_mod': int_mod,
+    'inf': math.inf,
+}
+
+
+def wrapped(fragment):
+    '''The text of `fragment`, with an int wrapped to 64 bits if it may not be'''
+    (text, type_code, is_wrapped) = fragment
+    if type_code == int_type and not is_wrapped:
+        return '(({} + 9223372036854775808 & 18446744073709551615) - 9223372036854775808)'.format(text)
+
+    return text
+
+
+def converted(fragment, type_code):
+    '''The text of `fragment` converted to `type_code` and wrapped'''
+    if fragment[1] == type_code:
+        return wrapped(fragment)
+    elif type_code == int_type:
+        return wrapped(('int({})'.format(fragment[0]), int_type, False))
+
+    return 'float({})'.format(wrapped(fragment))
+
+
+def expression_height(root):
+    height = 0
+    stack = [(root, 1)]
+
+    while stack:
+        (node, depth) = stack.pop()
+        height = max(height, depth)
+        cls = node.node_class
+
+        if cls is ast.BinOp:
+            stack += [(node.left, depth + 1), (node.right, depth + 1)]
+        elif cls is ast.UnaryOp:
+            stack.append((node.expr, depth + 1))
+        elif cls is ast.ArrayRef:
+            stack.append((node.idx, depth + 1))
+
+    return height
+
+
+class RightOperand:
+    '''Stack entry for the right operand of `&&` or `||`, whose left operand is done'''
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+
+class PythonCodegen(VariableScopes):
+    '''Translates an AST to the source of a Python function `run`, which
+    runs the program and returns the values of its top-level variables.
+
+    Variables become locals of `run` and arrays `array.array` buffers, and
+    programs behave as on the VM. Statements aren't nested: the statements
+    of a branch are guarded by a flag holding whether the branch runs, so
+    programs can nest deeper than Python's indentation limit. Expressions
+    deeper than `max_inline_height` are split into temporaries.
+
+    Python ints don't overflow, and wrapping to 64 bits commutes with `+`,
+    `-` and `*`, so ints are only wrapped where it makes a difference: when
+    they are divided, compared, tested, converted or stored.'''
+    def generate(self, tree):
+        self.start()
+        self.lines = []
+        self.guards = [None]  # the flag of the innermost branch, None outside of branches
+        self.name_count = 0
+        self.visit(tree)
+
+        lines = ['def run():']
+        for variable in self.scalars:
+            lines.append('    {} = {}'.format(self.local(variable), '0.0' if variable.type == float_type else '0'))
+        for variable in self.arrays:
+            lines.append('    {} = array({!r}, bytes({}))'.format(
+                self.local(variable), 'd' if variable.type == float_type else 'q', 8 * variable.size))
+
+        lines += ['    ' + line for line in self.lines]
+        lines.append('    return {{{}}}'.format(', '.join(
+            '{!r}: {}'.format(name, self.local(variable) if variable.size is None
+                              else 'list({})'.format(self.local(variable)))
+            for (name, variable) in self.variables.items()
+        )))
+        return '\n'.join(lines) + '\n'
+
+    def local(self, variable):
+        '''Scalars and arrays are numbered separately, and temporaries and flags have no suffix'''
+        return '{}_{}{}'.format(variable.name, 'v' if variable.size is None else 'a', variable.index)
+
+    def new_name(self, prefix):
+        self.name_count += 1
+        return '{}{}'.format(prefix, self.name_count)
+
+    def emit(self, line):
+        guard = self.guards[-1]
+        self.lines.append(line if guard is None else 'if {}: {}'.format(guard, line))
+
+    def set_flag(self, condition):
+        '''Sets a new flag to whether the innermost branch runs and `condition` holds, and returns it'''
+        flag = self.new_name('_f')
+        guard = self.guards[-1]
+        self.lines.append('{} = {}'.format(flag, condition if guard is None else '{} and {}'.format(guard, condition)))
+        return flag
+
+    def index(self, ast_index):
+        text = converted(self.expression(ast_index), int_type)
+        if ast_index.node_class is ast.Integer and ast_index.value >= 0:
+            return text
+
+        return 'check_index({})'.format(text)
+
+    def visit_Assignment(self, node):
+        variable = self.variable(node.id)
+        value = converted(self.expression(node.expr), variable.type)
+
+        if variable.size is None:
+            self.emit('{} = {}'.format(self.local(variable), value))
+        else:
+            self.emit('{}[{}] = {}'.format(self.local(variable), self.index(node.id.idx), value))
+
+    def visit_Statement(self, node):
+        self.emit(self.expression(node.expr)[0])
+
+    def visit_IfStatement(self, node):
+        self.guards.append(self.set_flag(wrapped(self.expression(node.cond))))
+        return (node.then, Leave(PythonCodegen.else_branch, node), node.otherwise)
+
+    def else_branch(self, node):
+        then_flag = self.guards.pop()
+        self.guards.append(self.set_flag('not ' + then_flag) if node.otherwise.statements else 'False')
+
+    def leave_IfStatement(self, node):
+        self.guards.pop()
+
+    def expression(self, root):
+        '''Returns the fragment computing `root`, a (text, type code, wrapped) triple,
+           after emitting the temporaries it needs'''
+        split = expression_height(root) > max_inline_height
+        fragments = []
+        stack = [root]
+
+        while stack:
+            node = stack.pop()
+
+            if type(node) is Operands:
+                node = node.node
+                if node.node_class is ast.BinOp and node.op in short_circuit_ops and split:
+                    self.guards.pop()
+
+                fragment = self.operation(node, fragments)
+                if split:
+                    temp = self.new_name('_t')
+                    self.emit('{} = {}'.format(temp, fragment[0]))
+                    fragment = (temp,) + fragment[1:]
+                fragments.append(fragment)
+            elif type(node) is RightOperand:
+                # the temporaries of the right operand are only computed when it is evaluated
+                truth = wrapped(fragments[-1])
+                self.guards.append(self.set_flag(truth if node.node.op == '&&' else 'not ' + truth))
+                stack.append(node.node.right)
+            elif node.node_class is ast.BinOp:
+                if node.op in short_circuit_ops and split:
+                    stack += [Operands(node), RightOperand(node), node.left]
+                else:
+                    stack += [Operands(node), node.right, node.left]
+            elif node.node_class is ast.UnaryOp:
+                stack += [Operands(node), node.expr]
+            elif node.node_class is ast.ArrayRef:
+                stack.append(Operands(node))
+            else:
+                fragments.append(self.leaf(node))
+
+        return fragments.pop()
+
+    def leaf(self, node):
+        cls = node.node_class
+        if cls is ast.Integer:
+            value = wrap(node.value)
+            return (repr(value) if value >= 0 else '({!r})'.format(value), int_type, True)
+        elif cls is ast.Float:
+            return (repr(node.value) if math.isfinite(node.value) else 'inf', float_type, True)
+
+        variable = self.variable(node)
+        return (self.local(variable), variable.type, True)
+
+    def operation(self, node, fragments):
+        cls = node.node_class
+
+        if cls is ast.ArrayRef:
+            # indices are expressions of their own, so they can be checked
+            variable = self.variable(node)
+            return ('{}[{}]'.format(self.local(variable), self.index(node.idx)), variable.type, True)
+        elif cls is ast.UnaryOp:
+            operand = fragments.pop()
+            if node.op == '!':
+                return ('(0 if {} else 1)'.format(wrapped(operand)), int_type, True)
+
+            return ('(-{})'.format(operand[0]), operand[1], operand[1] == float_type)
+
+        right = fragments.pop()
+        left = fragments.pop()
+        op = node.op
+
+        if op in short_circuit_ops:
+            return ('(1 if {} {} {} else 0)'.format(wrapped(left), 'and' if op == '&&' else 'or', wrapped(right)),
+                    int_type, True)
+        elif op in comparison_ops:
+            return ('(1 if {} {} {} else 0)'.format(wrapped(left), op, wrapped(right)), int_type, True)
+        elif left[1] == int_type and right[1] == int_type:
+            if op == '/':
+                return ('int_div({}, {})'.format(wrapped(left), wrapped(right)), int_type, True)
+            elif op == '%':
+                return ('int_mod({}, {})'.format(wrapped(left), wrapped(right)), int_type, True)
+
+            return ('({} {} {})'.format(left[0], op, right[0]), int_type, False)
+        elif op == '/':
+            return ('float_div({}, {})'.format(wrapped(left), wrapped(right)), float_type, True)
+        elif op == '%':
+            return ('float_mod({}, {})'.format(wrapped(left), wrapped(right)), float_type, True)
+
+        return ('({} {} {})'.format(wrapped(left), op, wrapped(right)), float_type, True)
+
+
+def source_hash(source, variant=''):
+    '''Hashes a minic source with everything its code object depends on'''
+    key = [codegen_version, sys.implementation.cache_tag, variant, source]
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+
+class CodeCache:
+    '''Code objects of generated `run` functions, by source hash.
+
+    Code objects are kept in memory and, with a `path`, stored in that
+    directory as marshal files, so other processes skip codegen as well.
+    Unreadable files are regenerated and read-only locations skipped.
+    Caches sharing a directory only share code objects with the same
+    `variant`, which names the options the code was generated with.'''
+    def __init__(self, path=None, variant=''):
+        self.path = path
+        self.variant = variant
+        self.code = {}
+
+    def get(self, source, generate):
+        '''Returns the code object for `source`, calling `generate()` for the Python source when it is missing'''
+        key = source_hash(source, self.variant)
+        code = self.code.get(key)
+
+        if code is None and self.path:
+            code = self.read(key)
+        if code is None:
+            code = compile(generate(), '<minic {}>'.format(key[:12]), 'exec')
+            if self.path:
+                self.write(key, code)
+
+        self.code[key] = code
+        return code
+
+    def read(self, key):
+        try:
+            with open(os.path.join(self.path, key + '.marshal'), 'rb') as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def write(self, key, code):
+        '''Writes the code object atomically, skipping read-only locations'''
+        try:
+            with tempfile.NamedTemporaryFile('wb', dir=self.path, delete=False) as f:
+                marshal.dump(code, f)
+            os.replace(f.name, os.path.join(self.path, key + '.marshal'))
+        except OSError:
+            pass
+
+
+def run_code(code):
+    '''Runs the code object of a generated `run` function and returns what it returns'''
+    namespace = dict(runtime)
+    exec(code, namespace)
+    return namespace['run']()
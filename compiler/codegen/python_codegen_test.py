@@ -0,0 +1,154 @@
+import math
+import os
+import random
+import tempfile
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.codegen.python_codegen import CodeCache, PythonCodegen, run_code, source_hash
+from compiler.vm.bytecode_test import lexer, parser
+from compiler.vm.vm_test import run as run_vm
+
+
+def generate(source):
+    return PythonCodegen().generate(parser.parse(lexer.lex(source)))
+
+
+def run_tree(tree):
+    return run_code(compile(PythonCodegen().generate(tree), '<minic>', 'exec'))
+
+
+def run(source):
+    return run_tree(parser.parse(lexer.lex(source)))
+
+
+def outcome(run, source):
+    '''The repr of the result, since NaN isn't equal to itself, or the type of the error'''
+    try:
+        return repr(run(source))
+    except (ArithmeticError, IndexError, ValueError) as e:
+        return type(e)
+
+
+class TestPythonCodegen(unittest.TestCase):
+    def test_generate(self):
+        '''Generates a function with a local per variable: `int x; x = x * 2 + 2;`'''
+        source = generate('int x, a[2]; x = x * 2 + 2;')
+
+        assert source.startswith('def run():\n    x_v0 = 0\n    a_a0 = array(')
+        assert "return {'x': x_v0, 'a': list(a_a0)}" in source
+
+    def test_same_as_vm(self):
+        '''Gives the VM's results, also on overflow, truncating division and IEEE floats'''
+        sources = [
+            'int a, b, c, d; a = 7 / (0 - 2); b = (0 - 7) / 2; c = (0 - 7) % 2; d = 7 % (0 - 2);',
+            'int a, b, c; a = 9223372036854775807 + 1; b = a - 1; c = a * 2;',
+            'int a, b; a = 9223372036854775807 * 3 / 2; b = (9223372036854775807 + 1) / (0 - 1);',
+            'int a, b; float f; a = 4611686018427387904 * 4 > 0; f = 9223372036854775807 * 2 + 0.5; b = f;',
+            'float a, b, d, e; a = 1.0 / 0.0; b = -1.0 / 0.0; d = 7.5 % 2.0; e = 1 + 0.5;',
+            'int x, y; float f; x = 2.9; y = 0.0 - 2.9; f = 3;',
+            'int a, b, c, d, e, zero; a = (2 < 3) + (2 == 2.0) + (3 != 3); b = !0 + !5; '
+            'c = zero && 1 / zero; d = 1 || 1 / zero; e = (2 && 3) + (0 || 0.5);',
+            'int x, a[2]; x = 2; if (x > 1) { a[0] = 1; } else { a[1] = 1; } if (x) { a[0] = a[0] + 10; }',
+            'int x, a[2]; if (x > 1) { a[0] = 1; } else { if (x) { x = 5; } else { a[1] = 1; } }',
+            'int x; x = 1; if (x) { float x; x = 2.5; } x = x + 1;',
+            'float a[3]; int i; i = 2; a[i] = a[1] + 0.5; a[i - 2] = -a[i];',
+        ]
+
+        for source in sources:
+            assert run(source) == run_vm(source), source
+
+    def test_nan(self):
+        '''`0.0 / 0.0` and `1.0 % 0.0` are NaN'''
+        result = run('float a, b; a = 0.0 / 0.0; b = 1.0 % 0.0;')
+
+        assert math.isnan(result['a']) and math.isnan(result['b'])
+
+    def test_errors(self):
+        '''Indexing outside an array raises an IndexError and int division by zero a ZeroDivisionError'''
+        with self.assertRaises(IndexError):
+            run('int a[3]; a[3] = 1;')
+        with self.assertRaises(IndexError):
+            run('int a[3], x; x = a[0 - 1];')
+        with self.assertRaises(ZeroDivisionError):
+            run('int x; x = 1 / x;')
+
+    def test_deep_nesting(self):
+        '''Runs if statements nested deeper than Python can indent'''
+        depth = 10000
+        tree = ast.Block([ast.Declaration('int', [ast.ID('x')])])
+        statements = tree.statements
+        for _ in range(depth):
+            inner = ast.Block([ast.Assignment(ast.ID('x'), ast.BinOp('+', ast.ID('x'), ast.Integer(1)))])
+            statements.append(ast.IfStatement(ast.BinOp('<', ast.ID('x'), ast.Integer(depth)), inner, ast.Block([])))
+            statements = inner.statements
+
+        assert run_tree(tree) == {'x': depth}
+
+    def test_deep_expressions(self):
+        '''Splits deep expressions into temporaries, keeping `&&` and `||` lazy'''
+        expression = ast.ID('x')
+        for i in range(5000):
+            expression = ast.BinOp('-', ast.Integer(i), expression)
+        guarded = ast.BinOp('&&', ast.ID('zero'), ast.BinOp('/', ast.Integer(1), ast.BinOp('*', expression, ast.ID('zero'))))
+        tree = ast.Block([
+            ast.Declaration('int', [ast.ID('x'), ast.ID('y'), ast.ID('zero')]),
+            ast.Assignment(ast.ID('x'), ast.Integer(9223372036854775807)),
+            ast.Assignment(ast.ID('y'), ast.BinOp('+', expression, guarded)),
+        ])
+
+        # each pair of subtractions adds 1, wrapping around
+        assert run_tree(tree)['y'] == -2 ** 63 + 2499
+
+    def test_random_programs(self):
+        '''Gives the VM's results or errors on random straight-line programs'''
+        rng = random.Random(0)
+        operators = ['+', '-', '*', '/', '%', '<', '==', '&&', '||']
+        for _ in range(50):
+            lines = ['int i, j; float f, g;', 'i = 3; j = 0 - 7; f = 2.5; g = 0.0 - 1.25;']
+            for _ in range(10):
+                (target, left, right) = (rng.choice('ijfg'), rng.choice('ijfg'), rng.choice('ijfg'))
+                op = rng.choice(operators)
+                if op in '/%' and right in 'ij':
+                    right = '({} * 0 + 3)'.format(right)
+                lines.append('{} = {} {} {} * 1000003;'.format(target, left, op, right))
+            source = '\n'.join(lines)
+
+            assert outcome(run, source) == outcome(run_vm, source), source
+
+
+class TestCodeCache(unittest.TestCase):
+    def test_memory(self):
+        '''Generates the code for a source once'''
+        calls = []
+        cache = CodeCache()
+
+        def generate_x():
+            calls.append(1)
+            return generate('int x; x = 2;')
+
+        first = cache.get('int x; x = 2;', generate_x)
+        second = cache.get('int x; x = 2;', generate_x)
+
+        assert first is second
+        assert len(calls) == 1
+        assert run_code(first) == {'x': 2}
+
+    def test_directory(self):
+        '''Another cache with the same directory loads stored code, and regenerates unreadable files'''
+        source = 'int x; x = 3;'
+        with tempfile.TemporaryDirectory() as path:
+            CodeCache(path).get(source, lambda: generate(source))
+
+            code = CodeCache(path).get(source, lambda: self.fail('regenerated'))
+            assert run_code(code) == {'x': 3}
+
+            with open(os.path.join(path, source_hash(source) + '.marshal'), 'wb') as f:
+                f.write(b'\x00')
+            code = CodeCache(path).get(source, lambda: generate(source))
+            assert run_code(code) == {'x': 3}
+
+    def test_key(self):
+        '''Different sources have different keys'''
+        assert source_hash('int x;') != source_hash('int y;')
+        assert source_hash('int x;') == source_hash('int x;')
@@ -1,26 +1,107 @@
+from compiler.ir.builder import IrBuilder
+from compiler.ir.ir import run as run_ir
+from compiler.ir.passes import optimize
 from compiler.lexer.lexer import Lexer
+from compiler.optimizer.constant_folding import ConstantFolder
 from compiler.parser.parser import Parser
+from compiler.parser.visitor import count_nodes
+from compiler.stats import CompilerStats, measured
 from compiler.typechecker.typechecker import Typechecker
+from compiler.codegen.c_codegen import CCodegen, run_c
+from compiler.codegen.python_codegen import CodeCache, PythonCodegen, run_code
+from compiler.vm.bytecode import BytecodeCompiler
+from compiler.vm.vm import VM
 
 
-def create_compiler(with_logger):
+# the stage running a program on each backend
+run_stages = {'vm': 'VM', 'python': 'PYTHON', 'c': 'C', 'ir': 'IR INTERPRETER'}
+
+
+def create_compiler(with_logger, lexer_engine='rply', parser_backend='rply', backend='vm', code_cache_path=None,
+                    fold_constants=False, collect_stats=False, trace_memory=False):
+    if backend not in run_stages:
+        raise ValueError('Invalid backend, %s' % backend)
+
     class Compiler:
         def __init__(self):
-            self.lexer = Lexer()
-            self.parser = Parser()
+            self.lexer = Lexer(engine=lexer_engine)
+            self.parser = Parser(backend=parser_backend)
             self.typechecker = Typechecker()
+            if fold_constants:
+                self.constant_folder = ConstantFolder()
+
+            # only the backend that runs programs is built
+            if backend == 'vm':
+                self.bytecode_compiler = BytecodeCompiler()
+                self.vm = VM()
+            elif backend == 'python':
+                self.python_codegen = PythonCodegen()
+                self.code_cache = CodeCache(code_cache_path, 'folded' if fold_constants else '')
+            elif backend == 'c':
+                self.c_codegen = CCodegen()
+            else:
+                self.ir_builder = IrBuilder()
+                self.pass_reports = []
+            self.stats = CompilerStats(trace_memory) if collect_stats or trace_memory else None
 
-        @with_logger.log_result('LEXER')
+        @measured('LEXER', with_logger, tokens=len)
         def lex(self, source):
             return self.lexer.lex(source)
 
-        @with_logger.log_result('PARSER')
+        @measured('PARSER', with_logger, nodes=count_nodes)
         def parse(self, source):
             return self.parser.parse(self.lex(source))
 
-        @with_logger.log_result('TYPECHECKER')
+        @measured('CONSTANT FOLDING', with_logger, nodes=count_nodes)
+        def fold(self, source):
+            return self.constant_folder.fold(self.parse(source))
+
+        def syntax_tree(self, source):
+            return self.fold(source) if fold_constants else self.parse(source)
+
+        @measured('TYPECHECKER', with_logger, type_errors=lambda report: len(report.get_errors()))
         def typecheck(self, source):
-            return self.typechecker.typecheck(self.parse(source))
+            return self.typechecker.typecheck(self.syntax_tree(source))
+
+        @measured('TYPECHECKER')
+        def checked_tree(self, source):
+            tree = self.syntax_tree(source)
+            report = self.typechecker.typecheck(tree)
+            if report.get_errors():
+                raise ValueError('Type errors, %s' % report)
+
+            return tree
+
+        @measured('BYTECODE', with_logger)
+        def compile(self, source):
+            return self.bytecode_compiler.compile(self.checked_tree(source))
+
+        @measured('CODEGEN', with_logger)
+        def generate(self, source):
+            return self.python_codegen.generate(self.checked_tree(source))
+
+        @measured('C CODEGEN', with_logger)
+        def generate_c(self, source):
+            return self.c_codegen.generate(self.checked_tree(source))
+
+        @measured('IR', with_logger)
+        def ir(self, source):
+            '''The program as an optimized SSA function, with the passes' reports in `pass_reports`'''
+            function = self.ir_builder.build(self.checked_tree(source))
+            self.pass_reports = optimize(function)
+            return function
+
+        @measured(run_stages[backend], with_logger)
+        def run(self, source):
+            if backend == 'python':
+                # a cached code object skips every stage before running
+                return run_code(self.code_cache.get(source, lambda: self.generate(source)))
+            elif backend == 'c':
+                return run_c(self.generate_c(source), self.c_codegen.variables)
+            elif backend == 'ir':
+                return run_ir(self.ir(source))
+
+            return self.vm.run(self.compile(source))
 
     compiler = Compiler()
     return compiler
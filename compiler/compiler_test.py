@@ -3,6 +3,7 @@ from itertools import zip_longest
 from rply import Token
 
 import compiler.parser.ast as ast
+from compiler.codegen.c_codegen import find_c_compiler
 from compiler.typechecker.typechecker import TypecheckerError
 from compiler.compiler import create_compiler
 from compiler.utils import Logger
@@ -139,3 +140,97 @@ class CompilerTest(unittest.TestCase):
 
         for (r, e) in zip_longest(result.get_errors(), expected_errors):
             assert r == e
+
+    def test_compiler_run(self):
+        '''Can run a simple program:'''
+        given = '''
+            float duck, birds[2];
+            int wildcat;
+
+            duck = 1.5;
+            wildcat = 7 / 2;
+            birds[0] = duck * 2.0;
+
+            if (wildcat > 3) {
+              birds[1] = duck;
+            } else {
+              birds[1] = -duck;
+            }
+        '''
+
+        result = compiler.run(given)
+
+        assert result == {'duck': 1.5, 'birds': [3.0, -1.5], 'wildcat': 3}
+
+    def test_compiler_run_python(self):
+        '''Runs programs as cached Python code objects with the python backend:'''
+        python_compiler = create_compiler(Logger(write_fn=lambda output: None), backend='python')
+        given = 'int wildcat, birds[2]; wildcat = 7 / 2; if (wildcat > 3) { birds[0] = 1; } else { birds[1] = 1; }'
+
+        assert python_compiler.run(given) == compiler.run(given) == {'wildcat': 3, 'birds': [0, 1]}
+        assert python_compiler.run(given) == {'wildcat': 3, 'birds': [0, 1]}
+        assert len(python_compiler.code_cache.code) == 1
+
+    def test_compiler_run_ir(self):
+        '''Runs programs as optimized SSA IR with the ir backend:'''
+        ir_compiler = create_compiler(Logger(write_fn=lambda output: None), backend='ir')
+        given = 'int wildcat, birds[2]; wildcat = 7 / 2; if (wildcat > 3) { birds[0] = 1; } else { birds[1] = 1; }'
+
+        assert ir_compiler.run(given) == compiler.run(given) == {'wildcat': 3, 'birds': [0, 1]}
+        assert [report.name for report in ir_compiler.pass_reports][0] == 'constant_propagation'
+        assert ir_compiler.pass_reports[-1].after < ir_compiler.pass_reports[0].before
+
+    @unittest.skipUnless(find_c_compiler(), 'needs a C compiler')
+    def test_compiler_run_c(self):
+        '''Runs programs compiled to C with the c backend:'''
+        c_compiler = create_compiler(Logger(write_fn=lambda output: None), backend='c')
+        given = 'int wildcat; float birds[2]; wildcat = 7 / 2; if (wildcat > 3) { birds[0] = 1.0; } else { birds[1] = 0.5; }'
+
+        assert c_compiler.run(given) == compiler.run(given) == {'wildcat': 3, 'birds': [0.0, 0.5]}
+
+    def test_compiler_fold_constants(self):
+        '''Folds constants and prunes branches before typechecking with fold_constants:'''
+        folding_compiler = create_compiler(Logger(write_fn=lambda output: None), fold_constants=True)
+        given = 'int wildcat, birds[2]; wildcat = 7 / 2 * 3; if (0) { wildcat = 1.5; } else { birds[1] = wildcat; }'
+
+        assert folding_compiler.typecheck(given).get_errors() == []
+        assert folding_compiler.run(given) == {'wildcat': 9, 'birds': [0, 9]}
+        assert folding_compiler.constant_folder.eliminated == 11
+        assert folding_compiler.run('float duck; duck = 2.0 > 1.0;') == compiler.run('float duck; duck = 2.0 > 1.0;')
+
+    def test_compiler_stats(self):
+        '''Counts the costs of the stages the last call ran:'''
+        assert compiler.stats is None
+
+        stats_compiler = create_compiler(Logger(write_fn=lambda output: None), collect_stats=True, trace_memory=True)
+        given = 'int wildcat; float duck; wildcat = 1; duck = 1;'
+
+        report = stats_compiler.typecheck(given)
+        stats = stats_compiler.stats
+
+        assert list(stats.stages) == ['TYPECHECKER', 'PARSER', 'LEXER']
+        assert stats.stages['LEXER'].counters == {'tokens': 14}
+        assert stats.stages['PARSER'].counters == {'nodes': 11}
+        assert stats.stages['TYPECHECKER'].counters == {'type_errors': len(report.get_errors())} == {'type_errors': 1}
+        assert all(stage.peak_memory > 0 for stage in stats.stages.values())
+
+        stats_compiler.run('int wildcat; wildcat = 1;')
+        assert list(stats_compiler.stats.stages) == ['VM', 'BYTECODE', 'TYPECHECKER', 'PARSER', 'LEXER']
+        assert stats_compiler.stats.errors == 0
+
+        ir_compiler = create_compiler(Logger(write_fn=lambda output: None), backend='ir', collect_stats=True)
+        ir_compiler.run('int wildcat; wildcat = 1;')
+        assert list(ir_compiler.stats.stages) == ['IR INTERPRETER', 'IR', 'TYPECHECKER', 'PARSER', 'LEXER']
+
+    def test_compiler_builds_its_backend(self):
+        '''Builds only the backend it runs programs on, and the constant folder when folding:'''
+        backends = ('vm', 'python_codegen', 'c_codegen', 'ir_builder', 'constant_folder')
+        python_compiler = create_compiler(Logger(write_fn=lambda output: None), backend='python', fold_constants=True)
+
+        assert [hasattr(compiler, name) for name in backends] == [True, False, False, False, False]
+        assert [hasattr(python_compiler, name) for name in backends] == [False, True, False, False, True]
+
+    def test_compiler_run_type_errors(self):
+        '''Doesn't run programs with type errors:'''
+        with self.assertRaises(ValueError):
+            compiler.run('int wildcat; wildcat = 1.5;')
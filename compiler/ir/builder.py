@@ -0,0 +1,208 @@
+import compiler.parser.ast as ast
+from compiler.ir.ir import Function, Instruction, Op
+from compiler.parser.visitor import Leave
+from compiler.typechecker.typechecker import float_type, int_type
+from compiler.vm.arithmetic import wrap
+from compiler.vm.scopes import VariableScopes
+
+
+arithmetic_ops = {
+    '+': (Op.ADD_INT, Op.ADD),
+    '-': (Op.SUB_INT, Op.SUB),
+    '*': (Op.MUL_INT, Op.MUL),
+    '/': (Op.DIV_INT, Op.DIV),
+    '%': (Op.MOD_INT, Op.MOD),
+}
+
+comparison_ops = {'==': Op.EQ, '!=': Op.NE, '<': Op.LT, '<=': Op.LE, '>': Op.GT, '>=': Op.GE}
+
+# the value `a && b` and `a || b` have when `a` decides it
+decided_values = {'&&': 0, '||': 1}
+
+
+class IrBuilder(VariableScopes):
+    '''Lowers an AST to a `Function` in SSA form.
+
+    Scalars are renamed on the fly: each assignment copies its value to a
+    new register, which becomes the variable's current definition. The
+    two branches of an if statement start from the definitions before it,
+    and where a variable assigned in them ends up with different
+    definitions, a PHI in the block after the if picks the one control
+    came from. Since minic has no loops, PHIs never wait for definitions
+    that come later, and blocks are created after their predecessors.
+
+    `&&` and `||` branch around their right operand, as the VM does, and
+    types are resolved statically: arithmetic on an int and a float
+    converts the int, comparisons take mixed operands.'''
+    def build(self, tree):
+        self.start()
+        self.function = Function()
+        self.block = self.function.new_block()
+        self.definitions = {}  # Variable -> the register holding its current value
+        self.assigned = []  # the variables assigned so far, in order, with repeats
+        self.values = []  # registers holding the values of the expressions visited so far
+        self.branches = []  # the state of each if statement and short-circuit op being visited
+
+        self.visit(tree)
+
+        function = self.function
+        function.array_types.extend(variable.type for variable in self.arrays)
+        function.array_sizes.extend(variable.size for variable in self.arrays)
+        function.variables = self.variables
+        function.outputs = {
+            name: self.definitions[variable] for (name, variable) in self.variables.items() if variable.size is None
+        }
+        return function
+
+    def emit(self, op, type_code, args=(), value=None):
+        '''Appends an instruction defining a new register of `type_code` and returns the register'''
+        dest = self.function.new_register(type_code)
+        self.block.instructions.append(Instruction(op, dest, args, value))
+        return dest
+
+    def convert(self, register, type_code):
+        if self.function.register_types[register] == type_code:
+            return register
+
+        return self.emit(Op.TO_INT if type_code == int_type else Op.TO_FLOAT, type_code, (register,))
+
+    def define(self, variable, register):
+        self.definitions[variable] = register
+        self.assigned.append(variable)
+
+    def branch(self, condition):
+        '''Ends the current block with a branch on `condition` and returns the blocks it goes to if
+           the condition is nonzero and if it is zero'''
+        header = self.block
+        header.condition = condition
+        (true_block, false_block) = (self.function.new_block([header]), self.function.new_block([header]))
+        header.successors = (true_block, false_block)
+        return (true_block, false_block)
+
+    def join(self, *blocks):
+        '''Ends `blocks` with a jump to a new block and continues there'''
+        self.block = self.function.new_block(blocks)
+        for block in blocks:
+            block.successors = (self.block,)
+
+    def visit_Declaration(self, node):
+        count = len(self.scalars)
+        super().visit_Declaration(node)
+
+        for variable in self.scalars[count:]:
+            self.define(variable, self.emit(Op.CONST, variable.type, value=0.0 if variable.type == float_type else 0))
+
+    def visit_Assignment(self, node):
+        if node.id.node_class is ast.ArrayRef:
+            return (node.id.idx, Leave(IrBuilder.index, node.id), node.expr)
+
+        return (node.expr,)
+
+    def index(self, node):
+        self.values.append(self.convert(self.values.pop(), int_type))
+
+    def leave_Assignment(self, node):
+        variable = self.variable(node.id)
+        value = self.convert(self.values.pop(), variable.type)
+
+        if variable.size is None:
+            self.define(variable, self.emit(Op.COPY, variable.type, (value,)))
+        else:
+            index = self.values.pop()
+            self.block.instructions.append(Instruction(Op.STORE_ELEM, None, (index, value), variable.index))
+
+    def visit_Statement(self, node):
+        return (node.expr,)
+
+    def leave_Statement(self, node):
+        self.values.pop()
+
+    def visit_IfStatement(self, node):
+        return (node.cond, Leave(IrBuilder.then_branch, node),
+                node.then, Leave(IrBuilder.else_branch, node),
+                node.otherwise)
+
+    def then_branch(self, node):
+        (self.block, else_block) = self.branch(self.values.pop())
+        self.branches.append((else_block, dict(self.definitions), len(self.assigned)))
+
+    def else_branch(self, node):
+        (else_block, before, assigned) = self.branches.pop()
+        self.branches.append((self.block, self.definitions, assigned))
+        (self.block, self.definitions) = (else_block, before)
+
+    def leave_IfStatement(self, node):
+        (then_end, then_definitions, assigned) = self.branches.pop()
+        else_definitions = self.definitions
+        self.join(then_end, self.block)
+
+        # variables declared in a branch are out of scope after it
+        changed = dict.fromkeys(self.assigned[assigned:])
+        del self.assigned[assigned:]
+        for variable in changed:
+            (then_register, else_register) = (then_definitions.get(variable), else_definitions.get(variable))
+            if then_register is not None and else_register is not None and then_register != else_register:
+                self.define(variable, self.emit(Op.PHI, variable.type, (then_register, else_register)))
+
+    def visit_Integer(self, node):
+        self.values.append(self.emit(Op.CONST, int_type, value=wrap(node.value)))
+
+    def visit_Float(self, node):
+        self.values.append(self.emit(Op.CONST, float_type, value=node.value))
+
+    def visit_ID(self, node):
+        self.values.append(self.definitions[self.variable(node)])
+
+    def visit_ArrayRef(self, node):
+        return (node.idx,)
+
+    def leave_ArrayRef(self, node):
+        variable = self.variable(node)
+        index = self.convert(self.values.pop(), int_type)
+        self.values.append(self.emit(Op.LOAD_ELEM, variable.type, (index,), variable.index))
+
+    def visit_UnaryOp(self, node):
+        return (node.expr,)
+
+    def leave_UnaryOp(self, node):
+        operand = self.values.pop()
+        if node.op == '!':
+            self.values.append(self.emit(Op.NOT, int_type, (operand,)))
+        else:
+            type_code = self.function.register_types[operand]
+            self.values.append(self.emit(Op.NEG_INT if type_code == int_type else Op.NEG, type_code, (operand,)))
+
+    def visit_BinOp(self, node):
+        if node.op in decided_values:
+            return (node.left, Leave(IrBuilder.short_circuit, node), node.right)
+
+        return (node.left, node.right)
+
+    def short_circuit(self, node):
+        decided = self.emit(Op.CONST, int_type, value=decided_values[node.op])
+        (nonzero_block, zero_block) = self.branch(self.values.pop())
+        (right_block, skip_block) = (nonzero_block, zero_block) if node.op == '&&' else (zero_block, nonzero_block)
+        self.branches.append((skip_block, decided))
+        self.block = right_block
+
+    def leave_BinOp(self, node):
+        right = self.values.pop()
+
+        if node.op in decided_values:
+            # the skipped block only jumps to the join, so the PHI can tell the two ways apart
+            (skip_block, decided) = self.branches.pop()
+            zero = self.emit(Op.CONST, int_type, value=0)
+            truth = self.emit(Op.NE, int_type, (right, zero))
+            self.join(skip_block, self.block)
+            self.values.append(self.emit(Op.PHI, int_type, (decided, truth)))
+            return
+
+        left = self.values.pop()
+        if node.op in comparison_ops:
+            self.values.append(self.emit(comparison_ops[node.op], int_type, (left, right)))
+            return
+
+        is_int = self.function.register_types[left] == int_type and self.function.register_types[right] == int_type
+        type_code = int_type if is_int else float_type
+        (left, right) = (self.convert(left, type_code), self.convert(right, type_code))
+        self.values.append(self.emit(arithmetic_ops[node.op][0 if is_int else 1], type_code, (left, right)))
@@ -0,0 +1,211 @@
+from array import array
+from enum import IntEnum
+
+from compiler.typechecker.typechecker import float_type
+from compiler.vm.arithmetic import check_index, float_div, float_mod, int_div, int_mod, wrap
+
+
+class Op(IntEnum):
+    '''Three-address instructions, each defining at most one register.
+
+    Ops ending in _INT take ints and wrap around at 64 bits, the other
+    arithmetic ops take floats. Comparisons take ints, floats or one of
+    each and, like NOT, give 1 or 0.'''
+    CONST = 0  # dest = value
+    COPY = 1  # dest = args[0]
+    PHI = 2  # dest = args[i], where control came from the i-th predecessor of the block
+    LOAD_ELEM = 3  # dest = arrays[value][args[0]]
+    STORE_ELEM = 4  # arrays[value][args[0]] = args[1]
+    ADD_INT = 5
+    ADD = 6
+    SUB_INT = 7
+    SUB = 8
+    MUL_INT = 9
+    MUL = 10
+    DIV_INT = 11  # truncates towards zero
+    DIV = 12
+    MOD_INT = 13  # has the sign of the dividend
+    MOD = 14
+    NEG_INT = 15
+    NEG = 16
+    NOT = 17
+    EQ = 18
+    NE = 19
+    LT = 20
+    LE = 21
+    GT = 22
+    GE = 23
+    TO_INT = 24
+    TO_FLOAT = 25
+
+
+# what the ops computing a value from their args do, raising where the VM raises
+operations = {
+    Op.ADD_INT: lambda a, b: wrap(a + b),
+    Op.ADD: lambda a, b: a + b,
+    Op.SUB_INT: lambda a, b: wrap(a - b),
+    Op.SUB: lambda a, b: a - b,
+    Op.MUL_INT: lambda a, b: wrap(a * b),
+    Op.MUL: lambda a, b: a * b,
+    Op.DIV_INT: int_div,
+    Op.DIV: float_div,
+    Op.MOD_INT: int_mod,
+    Op.MOD: float_mod,
+    Op.NEG_INT: lambda a: wrap(-a),
+    Op.NEG: lambda a: -a,
+    Op.NOT: lambda a: 0 if a else 1,
+    Op.EQ: lambda a, b: 1 if a == b else 0,
+    Op.NE: lambda a, b: 1 if a != b else 0,
+    Op.LT: lambda a, b: 1 if a < b else 0,
+    Op.LE: lambda a, b: 1 if a <= b else 0,
+    Op.GT: lambda a, b: 1 if a > b else 0,
+    Op.GE: lambda a, b: 1 if a >= b else 0,
+    Op.TO_INT: lambda a: wrap(int(a)),
+    Op.TO_FLOAT: float,
+}
+
+commutative_ops = {Op.ADD_INT, Op.ADD, Op.MUL_INT, Op.MUL, Op.EQ, Op.NE}
+
+# ops that can raise, depending on their args
+trapping_ops = {Op.LOAD_ELEM, Op.STORE_ELEM, Op.DIV_INT, Op.MOD_INT, Op.TO_INT}
+
+
+class Instruction:
+    '''`dest = op args`, where `dest` and `args` are registers and `value`
+       is the constant of a CONST or the array of a LOAD_ELEM or STORE_ELEM'''
+    __slots__ = ('op', 'dest', 'args', 'value')
+
+    def __init__(self, op, dest, args=(), value=None):
+        self.op = op
+        self.dest = dest
+        self.args = args
+        self.value = value
+
+    def __repr__(self):
+        operands = ['r%d' % arg for arg in self.args]
+        if self.op is Op.CONST:
+            operands.append(repr(self.value))
+        elif self.value is not None:
+            operands.insert(0, 'a%d' % self.value)
+
+        text = ' '.join([self.op.name] + operands)
+        return text if self.dest is None else 'r%d = %s' % (self.dest, text)
+
+
+class BasicBlock:
+    '''Instructions run one after the other, starting with the block's PHIs.
+
+    A block with a `condition` register continues with the first of its
+    two `successors` if the condition is nonzero and with the second if
+    it is zero, other blocks with their only successor, or end the
+    program if they have none.'''
+    __slots__ = ('index', 'instructions', 'predecessors', 'successors', 'condition')
+
+    def __init__(self, index, predecessors):
+        self.index = index
+        self.instructions = []
+        self.predecessors = predecessors
+        self.successors = ()
+        self.condition = None
+
+    def __repr__(self):
+        lines = ['b%d:' % self.index]
+        lines += ['    %r' % instruction for instruction in self.instructions]
+        if self.condition is not None:
+            lines.append('    branch r%d b%d b%d' % (self.condition, *(block.index for block in self.successors)))
+        elif self.successors:
+            lines.append('    jump b%d' % self.successors[0].index)
+
+        return '\n'.join(lines)
+
+
+class Function:
+    '''A minic program in SSA form: every register is defined once, by an
+    instruction that dominates its uses.
+
+    `blocks` are in an order where each block comes after its
+    predecessors, starting with the entry. `register_types` holds the type
+    code of each register. Arrays aren't in registers but in memory, typed
+    by `array_types` and sized by `array_sizes`. `variables` are the
+    variables declared at the top level, by name, and `outputs` the
+    registers holding the final values of the scalars among them.'''
+    __slots__ = ('blocks', 'register_types', 'array_types', 'array_sizes', 'variables', 'outputs')
+
+    def __init__(self):
+        self.blocks = []
+        self.register_types = array('B')
+        self.array_types = array('B')
+        self.array_sizes = array('i')
+        self.variables = {}
+        self.outputs = {}
+
+    def new_register(self, type_code):
+        self.register_types.append(type_code)
+        return len(self.register_types) - 1
+
+    def new_block(self, predecessors=()):
+        block = BasicBlock(len(self.blocks), list(predecessors))
+        self.blocks.append(block)
+        return block
+
+    def instruction_count(self):
+        return sum(len(block.instructions) for block in self.blocks)
+
+    def rename(self, replacements):
+        '''Replaces each use of a register in `replacements` with the register it maps to'''
+        def resolve(register):
+            while register in replacements:
+                register = replacements[register]
+            return register
+
+        for block in self.blocks:
+            for instruction in block.instructions:
+                if instruction.args:
+                    instruction.args = tuple(map(resolve, instruction.args))
+            if block.condition is not None:
+                block.condition = resolve(block.condition)
+
+        self.outputs = {name: resolve(register) for (name, register) in self.outputs.items()}
+
+    def __repr__(self):
+        return '\n'.join(repr(block) for block in self.blocks)
+
+
+def run(function):
+    '''Interprets `function` and returns the values its top-level variables end up with'''
+    registers = [0] * len(function.register_types)
+    arrays = [array('d' if type_code == float_type else 'q', bytes(8 * size))
+              for (type_code, size) in zip(function.array_types, function.array_sizes)]
+
+    (block, previous) = (function.blocks[0], None)
+    while True:
+        for instruction in block.instructions:
+            op = instruction.op
+            args = instruction.args
+
+            if op is Op.CONST:
+                registers[instruction.dest] = instruction.value
+            elif op is Op.COPY:
+                registers[instruction.dest] = registers[args[0]]
+            elif op is Op.PHI:
+                registers[instruction.dest] = registers[args[block.predecessors.index(previous)]]
+            elif op is Op.LOAD_ELEM:
+                registers[instruction.dest] = arrays[instruction.value][check_index(registers[args[0]])]
+            elif op is Op.STORE_ELEM:
+                arrays[instruction.value][check_index(registers[args[0]])] = registers[args[1]]
+            else:
+                registers[instruction.dest] = operations[op](*(registers[arg] for arg in args))
+
+        if not block.successors:
+            break
+
+        previous = block
+        if block.condition is None or registers[block.condition]:
+            block = block.successors[0]
+        else:
+            block = block.successors[1]
+
+    return {
+        name: registers[function.outputs[name]] if variable.size is None else list(arrays[variable.index])
+        for (name, variable) in function.variables.items()
+    }
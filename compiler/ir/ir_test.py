@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from compiler.ir.builder import IrBuilder
+from compiler.ir.ir import Op, run
+from compiler.vm.bytecode_test import lexer, parser
+from compiler.vm.vm_test import run as run_vm
+
+
+def build(source):
+    return IrBuilder().build(parser.parse(lexer.lex(source)))
+
+
+def random_source(rng, statements=12):
+    '''A random program over a few ints, floats and an array, with nested ifs'''
+    variables = 'ijfg'
+    lines = ['int i, j, a[4]; float f, g;', 'i = 3; j = 0 - 7; f = 2.5; g = 0.0 - 1.25;']
+
+    def expression(depth):
+        if depth == 0 or rng.random() < 0.3:
+            return rng.choice([rng.choice(variables), str(rng.randint(0, 3)), '1.5', 'a[{}]'.format(rng.randint(0, 3))])
+        op = rng.choice(['+', '-', '*', '/', '%', '<', '==', '!=', '&&', '||'])
+        return '({} {} {})'.format(expression(depth - 1), op, expression(depth - 1))
+
+    def statement(depth):
+        if depth > 0 and rng.random() < 0.3:
+            return 'if ({}) {{ {} }} else {{ {} }}'.format(
+                expression(2), ' '.join(statement(depth - 1) for _ in range(2)), statement(depth - 1))
+        elif rng.random() < 0.2:
+            return 'a[i % 4 * (i % 4) % 4] = {};'.format(expression(2))
+
+        return '{} = {};'.format(rng.choice(variables), expression(2))
+
+    lines += [statement(2) for _ in range(statements)]
+    return '\n'.join(lines)
+
+
+def outcome(run, value):
+    '''The repr of the result, since NaN isn't equal to itself, or the type of the error'''
+    try:
+        return repr(run(value))
+    except (ArithmeticError, IndexError, ValueError) as e:
+        return type(e)
+
+
+class TestIrBuilder(unittest.TestCase):
+    def test_three_address_code(self):
+        '''Lowers expressions to an instruction per operation: `int x; x = x * 2 + 2;`'''
+        function = build('int x; x = x * 2 + 2;')
+
+        assert repr(function) == '\n'.join([
+            'b0:',
+            '    r0 = CONST 0',
+            '    r1 = CONST 2',
+            '    r2 = MUL_INT r0 r1',
+            '    r3 = CONST 2',
+            '    r4 = ADD_INT r2 r3',
+            '    r5 = COPY r4',
+        ])
+        assert function.outputs == {'x': 5}
+
+    def test_phis(self):
+        '''Joins the definitions of the variables an if statement assigns with PHIs'''
+        function = build('int x, y; float f; if (x) { x = 1; f = 2; } else { y = 3; }')
+
+        assert [block.predecessors for block in function.blocks[1:]] == [
+            [function.blocks[0]], [function.blocks[0]], [function.blocks[1], function.blocks[2]],
+        ]
+        phis = [instruction for instruction in function.blocks[3].instructions if instruction.op is Op.PHI]
+        assert len(phis) == 3
+        assert set(function.outputs.values()) == {phi.dest for phi in phis}
+
+    def test_ssa(self):
+        '''Defines each register once'''
+        function = build(random_source(random.Random(1), statements=50))
+
+        dests = [instruction.dest for block in function.blocks for instruction in block.instructions]
+        dests = [dest for dest in dests if dest is not None]
+        assert len(dests) == len(set(dests)) == len(function.register_types)
+
+    def test_block_scopes(self):
+        '''Variables declared in a block don't get PHIs after it'''
+        function = build('int x; if (x) { float x; x = 2.5; } x = x + 1;')
+
+        assert all(instruction.op is not Op.PHI for instruction in function.blocks[3].instructions)
+        assert run(function) == {'x': 1}
+
+    def test_same_as_vm(self):
+        '''Running the IR gives the VM's results or errors'''
+        rng = random.Random(0)
+        for _ in range(100):
+            source = random_source(rng)
+            assert outcome(lambda source: run(build(source)), source) == outcome(run_vm, source), source
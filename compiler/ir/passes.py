@@ -0,0 +1,243 @@
+import math
+
+from compiler.ir.ir import Op, commutative_ops, operations, trapping_ops
+
+
+class PassReport:
+    '''What a pass did to a function: its instruction counts before and
+       after, and how many instructions it rewrote in place'''
+    __slots__ = ('name', 'before', 'after', 'rewritten')
+
+    def __init__(self, name, before, after, rewritten):
+        self.name = name
+        self.before = before
+        self.after = after
+        self.rewritten = rewritten
+
+    @property
+    def delta(self):
+        return self.after - self.before
+
+    def __repr__(self):
+        return '{}: {} -> {} instructions ({:+d}), {} rewritten'.format(
+            self.name, self.before, self.after, self.delta, self.rewritten)
+
+
+def constant_key(value):
+    '''Tells apart constants Python compares equal, like 0 and 0.0 or 0.0 and -0.0'''
+    return (type(value), value.hex() if isinstance(value, float) else value)
+
+
+def constant_propagation(function):
+    '''Replaces instructions whose args are all constants with a CONST of
+       their value, unless computing it raises'''
+    constants = {}
+    rewritten = 0
+
+    # blocks come after their predecessors, so the args of an instruction are seen before it
+    for block in function.blocks:
+        for instruction in block.instructions:
+            op = instruction.op
+            if op is Op.CONST:
+                constants[instruction.dest] = instruction.value
+                continue
+            elif not instruction.args or not all(arg in constants for arg in instruction.args):
+                continue
+
+            values = [constants[arg] for arg in instruction.args]
+            if op is Op.COPY or op is Op.PHI:
+                if any(constant_key(value) != constant_key(values[0]) for value in values):
+                    continue
+                value = values[0]
+            elif op in operations:
+                try:
+                    value = operations[op](*values)
+                except (ArithmeticError, ValueError):
+                    continue
+            else:
+                continue
+
+            (instruction.op, instruction.args, instruction.value) = (Op.CONST, (), value)
+            constants[instruction.dest] = value
+            rewritten += 1
+
+    return rewritten
+
+
+def copy_propagation(function):
+    '''Removes COPYs, and PHIs whose args are all the same register,
+       using their source register instead'''
+    replacements = {}
+
+    def resolve(register):
+        while register in replacements:
+            register = replacements[register]
+        return register
+
+    for block in function.blocks:
+        instructions = []
+        for instruction in block.instructions:
+            if instruction.op is Op.COPY:
+                replacements[instruction.dest] = resolve(instruction.args[0])
+            elif instruction.op is Op.PHI and len({resolve(arg) for arg in instruction.args}) == 1:
+                replacements[instruction.dest] = resolve(instruction.args[0])
+            else:
+                instructions.append(instruction)
+        block.instructions = instructions
+
+    function.rename(replacements)
+    return 0
+
+
+def immediate_dominators(function):
+    '''The index of the immediate dominator of each block, by index, the entry's being its own.
+
+    Blocks come after their predecessors, so each block's dominators are
+    known when it is reached, and the dominators of two blocks can be
+    intersected by walking up from the later one.'''
+    dominators = [0] * len(function.blocks)
+
+    for block in function.blocks[1:]:
+        dominator = block.predecessors[0].index
+        for predecessor in block.predecessors[1:]:
+            other = predecessor.index
+            while dominator != other:
+                if dominator > other:
+                    dominator = dominators[dominator]
+                else:
+                    other = dominators[other]
+        dominators[block.index] = dominator
+
+    return dominators
+
+
+def expression_key(instruction, block):
+    '''Instructions with equal keys compute the same value, None if that isn't known'''
+    op = instruction.op
+    if op is Op.CONST:
+        return (op, constant_key(instruction.value))
+    elif op is Op.PHI:
+        return (op, block.index, instruction.args)
+    elif op in operations:
+        args = instruction.args
+        return (op, tuple(sorted(args)) if op in commutative_ops else args)
+
+    # memory changes between loads, and copies are copy propagation's
+    return None
+
+
+def common_subexpression_elimination(function):
+    '''Removes instructions computing what a dominating instruction already
+    has, using its register instead.
+
+    Blocks are walked down the dominator tree, with the expressions
+    computed on the way in a table undone on the way back up. Ops that
+    can raise are removed like the others, since the dominating one would
+    have raised first.'''
+    dominators = immediate_dominators(function)
+    children = [[] for _ in function.blocks]
+    for block in function.blocks[1:]:
+        children[dominators[block.index]].append(block)
+
+    available = {}
+    replacements = {}
+    undo = []  # the keys the blocks being walked made available
+    replace = replacements.get
+    stack = [function.blocks[0]]
+
+    while stack:
+        block = stack.pop()
+        if type(block) is int:
+            for key in undo[block:]:
+                del available[key]
+            del undo[block:]
+            continue
+
+        stack.append(len(undo))
+        stack += reversed(children[block.index])
+
+        instructions = []
+        for instruction in block.instructions:
+            if instruction.args:
+                instruction.args = tuple(map(replace, instruction.args, instruction.args))
+
+            key = expression_key(instruction, block)
+            if key is None:
+                instructions.append(instruction)
+            elif key in available:
+                replacements[instruction.dest] = available[key]
+            else:
+                undo.append(key)
+                available[key] = instruction.dest
+                instructions.append(instruction)
+        block.instructions = instructions
+
+    function.rename(replacements)
+    return 0
+
+
+def can_raise(instruction, definitions):
+    '''Whether running `instruction` may raise, so it has to run even if its value is unused'''
+    op = instruction.op
+    if op not in trapping_ops:
+        return False
+    elif op is Op.DIV_INT or op is Op.MOD_INT:
+        divisor = definitions[instruction.args[1]]
+        return divisor.op is not Op.CONST or divisor.value == 0
+    elif op is Op.TO_INT:
+        operand = definitions[instruction.args[0]]
+        return operand.op is not Op.CONST or not math.isfinite(operand.value)
+
+    return True
+
+
+def dead_code_elimination(function):
+    '''Removes instructions whose values aren't used and that can't raise'''
+    definitions = {}
+    for block in function.blocks:
+        for instruction in block.instructions:
+            if instruction.dest is not None:
+                definitions[instruction.dest] = instruction
+
+    live = bytearray(len(function.register_types))
+    used = [block.condition for block in function.blocks if block.condition is not None]
+    used += function.outputs.values()
+
+    for block in function.blocks:
+        for instruction in block.instructions:
+            if instruction.dest is None or can_raise(instruction, definitions):
+                used += instruction.args
+                if instruction.dest is not None:
+                    live[instruction.dest] = 1
+
+    while used:
+        register = used.pop()
+        if not live[register]:
+            live[register] = 1
+            used += definitions[register].args
+
+    for block in function.blocks:
+        block.instructions = [
+            instruction for instruction in block.instructions if instruction.dest is None or live[instruction.dest]
+        ]
+
+    return 0
+
+
+default_passes = [
+    constant_propagation,
+    copy_propagation,
+    common_subexpression_elimination,
+    dead_code_elimination,
+]
+
+
+def optimize(function, passes=default_passes):
+    '''Runs `passes` over `function` in order and returns a `PassReport` for each'''
+    reports = []
+    for optimization in passes:
+        before = function.instruction_count()
+        rewritten = optimization(function)
+        reports.append(PassReport(optimization.__name__, before, function.instruction_count(), rewritten))
+
+    return reports
@@ -0,0 +1,92 @@
+import random
+import unittest
+
+from compiler.ir.ir import Op, run
+from compiler.ir.ir_test import build, outcome, random_source
+from compiler.ir.passes import (
+    common_subexpression_elimination, constant_propagation, copy_propagation, dead_code_elimination, optimize,
+)
+from compiler.vm.vm_test import run as run_vm
+
+
+def ops(function):
+    return [instruction.op for block in function.blocks for instruction in block.instructions]
+
+
+class TestPasses(unittest.TestCase):
+    def test_constant_propagation(self):
+        '''Folds constants with C semantics: `x = 9223372036854775807 + 1;`'''
+        function = build('int x, y; x = 9223372036854775807 + 1; y = (0 - 7) / 2;')
+
+        assert constant_propagation(function) == 5
+        assert [instruction.value for instruction in function.blocks[0].instructions if instruction.dest in
+                function.outputs.values()] == [-2 ** 63, -3]
+
+    def test_constant_propagation_keeps_errors(self):
+        '''Doesn't fold operations that raise: `x = 1 / 0;`'''
+        function = build('int x; x = 1 / 0;')
+        constant_propagation(function)
+
+        assert Op.DIV_INT in ops(function)
+        with self.assertRaises(ZeroDivisionError):
+            run(function)
+
+    def test_copy_propagation(self):
+        '''Replaces copies with their sources'''
+        function = build('int x, y; x = y; y = x;')
+        reports = optimize(function, [copy_propagation])
+
+        assert Op.COPY not in ops(function)
+        assert reports[0].delta == -2
+        assert function.outputs == {'x': 1, 'y': 1}
+
+    def test_common_subexpression_elimination(self):
+        '''Reuses values computed in dominating blocks only'''
+        function = build('int x, y, z; x = y * z; if (x) { y = z * y; } else { y = 2; } z = y * z;')
+        optimize(function, [copy_propagation, common_subexpression_elimination])
+
+        # `z * y` in the branch is `y * z`, the last product has another `y`
+        assert ops(function).count(Op.MUL_INT) == 2
+
+    def test_common_subexpression_elimination_constants(self):
+        '''Keeps constants Python compares equal apart: `0`, `0.0` and `-0.0`'''
+        function = build('float f, g, h; f = 0.0; g = -0.0; h = 0; f = 0.0;')
+        optimize(function)
+
+        assert run(function) == run_vm('float f, g, h; f = 0.0; g = -0.0; h = 0; f = 0.0;')
+        assert repr(run(function)['g']) == '-0.0'
+
+    def test_dead_code_elimination(self):
+        '''Removes unused values, but not operations that can raise'''
+        function = build('int x, zero, a[2]; x + 1; x / 2; a[1]; x = 1 / zero;')
+        dead_code_elimination(function)
+
+        assert ops(function).count(Op.ADD_INT) == 0
+        assert ops(function).count(Op.LOAD_ELEM) == 1
+        with self.assertRaises(ZeroDivisionError):
+            run(function)
+
+    def test_reports(self):
+        '''Reports the instruction counts before and after each pass'''
+        function = build(random_source(random.Random(2), statements=50))
+        count = function.instruction_count()
+        reports = optimize(function)
+
+        assert [report.name for report in reports] == [
+            'constant_propagation', 'copy_propagation', 'common_subexpression_elimination', 'dead_code_elimination',
+        ]
+        assert reports[0].before == count and reports[-1].after == function.instruction_count() < count
+        assert all(report.after == next_report.before for (report, next_report) in zip(reports, reports[1:]))
+
+    def test_same_as_vm(self):
+        '''Optimized IR gives the VM's results or errors'''
+        rng = random.Random(0)
+        for _ in range(100):
+            source = random_source(rng)
+
+            def run_optimized(source):
+                function = build(source)
+                optimize(function)
+                return run(function)
+
+            assert outcome(run_optimized, source) == outcome(run_vm, source), source
@@ -1,12 +1,21 @@
+import os
 from rply import LexerGenerator
-from itertools import tee
+from collections.abc import Sequence
 
-from compiler.lexer.tokens import name_with_pattern
+from compiler.lexer.tokens import name_with_pattern, ignore_pattern
+from compiler.lexer.regex_lexer import RegexLexer
 
 
 class Lexer:
-    def __init__(self):
-        self.lexer = self.build_lexer()
+    def __init__(self, engine='rply'):
+        self.engine = engine
+
+        if engine == 'rply':
+            self.lexer = self.build_lexer()
+        elif engine == 'regex':
+            self.lexer = RegexLexer()
+        else:
+            raise ValueError('Unknown lexer engine, %s' % engine)
 
     def build_lexer(self):
         lg = LexerGenerator()
@@ -14,31 +23,78 @@ class Lexer:
         for (name, pattern) in name_with_pattern:
             lg.add(name, pattern)
 
-        lg.ignore(r'\s+')
+        lg.ignore(ignore_pattern)
 
         return lg.build()
 
     def lex(self, source):
+        if hasattr(source, 'fileno'):
+            return self.lex_file(source)
+
         stream = self.lexer.lex(source)
         return TokenStream(stream)
 
+    def lex_file(self, f):
+        '''Lexes a source file given as a path or a binary file object.
+           The regex engine scans a memory map of the file, the rply engine
+           needs the whole source as a string.'''
+        if isinstance(f, (str, os.PathLike)):
+            with open(f, 'rb') as file_obj:
+                return self.lex_file(file_obj)
+
+        if self.engine == 'regex':
+            return TokenStream(self.lexer.lex_file(f))
+
+        return TokenStream(self.lexer.lex(f.read().decode()))
+
+    def relex(self, tokens, offset, deleted, inserted):
+        '''Updates a token stream after an edit of its source, see `RegexLexer.relex`.
+           Returns the new stream and the changed index range.'''
+        if self.engine != 'regex':
+            raise ValueError('Incremental lexing needs the regex engine')
+
+        (store, changed) = self.lexer.relex(tokens.tokens, offset, deleted, inserted)
+        return (TokenStream(store), changed)
+
 
 class TokenStream:
-    def __init__(self, stream):
-        self._original_stream = stream
-        (self.stream,) = tee(self._original_stream, 1)
+    '''The tokens of a source, read from the current `position` on.
+
+    Iterating and `next` both consume tokens, so the parsers read a stream
+    alike, and a stream is read once: parsing it again, or after some of
+    it was read, needs a `rewind` first. Length, indexing, `peek` and repr
+    don't consume anything.'''
+    def __init__(self, tokens):
+        self.tokens = tokens if isinstance(tokens, Sequence) else list(tokens)
+        self.position = 0
 
     def __next__(self):
-        return next(self.stream)
+        if self.position >= len(self.tokens):
+            raise StopIteration
+
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
 
     def __iter__(self):
-        while self.stream:
-            yield next(self)
-        (self.stream,) = tee(self._original_stream, 1)
+        return self
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, idx):
+        return self.tokens[idx]
+
+    def peek(self, offset=0):
+        '''Returns the token `offset` positions after the current one, or None past the end'''
+        idx = self.position + offset
+        return self.tokens[idx] if 0 <= idx < len(self.tokens) else None
+
+    def rewind(self, position=0):
+        self.position = position
 
     def __repr__(self):
-        (self.stream, stream) = tee(self._original_stream, 2)
-        return '\n'.join(str(tok) for tok in stream)
+        return '\n'.join(str(tok) for tok in self.tokens)
 
     def __str__(self):
         return repr(self)
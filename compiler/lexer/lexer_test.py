@@ -3,6 +3,7 @@ from itertools import zip_longest
 from rply import Token
 
 from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
 
 
 lexer = Lexer()
@@ -94,3 +95,59 @@ class TestKeywords(unittest.TestCase):
 
         for (r, e) in zip_longest(result, expected):
             assert r == e
+
+
+class TestTokenStream(unittest.TestCase):
+    def test_len_and_lookahead(self):
+        '''Knows its length and can look ahead without consuming: `x = 1;`'''
+        result = lexer.lex('x = 1;')
+
+        assert len(result) == 4
+        assert result[2] == Token('INTEGER', '1')
+        assert result.peek() == Token('ID', 'x')
+        assert result.peek(3) == Token('SEMI', ';')
+        assert result.peek(4) is None
+        assert next(result) == Token('ID', 'x')
+
+    def test_rewind(self):
+        '''Can be consumed again after a rewind: `x = 1;`'''
+        result = lexer.lex('x = 1;')
+
+        consumed = list(iter(lambda: next(result, None), None))
+        assert next(result, None) is None
+
+        result.rewind()
+        assert next(result) == consumed[0]
+
+    def test_iteration_consumes(self):
+        '''Iterating reads on from `next` and consumes like it: `x = 1;`'''
+        result = lexer.lex('x = 1;')
+        next(result)
+
+        assert list(result) == [Token('EQUAL', '='), Token('INTEGER', '1'), Token('SEMI', ';')]
+        assert list(result) == []
+
+        result.rewind(3)
+        assert list(result) == [Token('SEMI', ';')]
+
+    def test_reparse_after_rewind(self):
+        '''Both parser backends parse a stream again once it is rewound: `x = 1;`'''
+        for backend in ('rply', 'pratt'):
+            parser = Parser(backend=backend)
+            result = lexer.lex('x = 1;')
+            tree = parser.parse(result)
+
+            result.rewind()
+            assert parser.parse(result) == tree
+
+    def test_repr_does_not_consume(self):
+        '''Printing the stream leaves it ready for the parser: `x = 1;`'''
+        result = lexer.lex('x = 1;')
+
+        assert str(result) == '\n'.join([
+            "Token('ID', 'x')",
+            "Token('EQUAL', '=')",
+            "Token('INTEGER', '1')",
+            "Token('SEMI', ';')",
+        ])
+        assert next(result) == Token('ID', 'x')
@@ -0,0 +1,153 @@
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_left
+from itertools import takewhile
+from rply.errors import LexingError
+
+from compiler.lexer.tokens import name_with_pattern, ignore_pattern
+from compiler.lexer.token_store import TokenStore, kind_codes
+
+
+# Keyword rules lead `name_with_pattern`, so they are matched as one group and
+# resolved through a table instead of taking up a group each.
+keywords = {pattern: name
+            for (name, pattern) in takewhile(lambda rule: rule[1].isalpha(), name_with_pattern)}
+
+IGNORE = -1
+KEYWORD = -2
+ERROR = -3
+
+
+def build_master_pattern(as_bytes=False):
+    '''Joins every token rule into a single alternation.
+
+    `re` tries alternatives left to right and takes the first one that
+    matches, which is the same "first rule added wins" policy rply uses, so
+    one match per token gives the same result as trying each rule in turn.
+    With `as_bytes` the pattern matches bytes-like sources instead of `str`.'''
+    alternatives = ['(?P<ignore>{})'.format(ignore_pattern),
+                    '(?P<keyword>{})'.format('|'.join(keywords))]
+
+    alternatives += ['(?P<{}>{})'.format(name, pattern)
+                     for (name, pattern) in name_with_pattern
+                     if pattern not in keywords]
+
+    alternatives += ['(?P<error>.)']
+
+    pattern = '|'.join(alternatives)
+    return re.compile(pattern.encode() if as_bytes else pattern)
+
+
+class RegexLexer:
+    def __init__(self):
+        self.master_pattern = build_master_pattern()
+        self.bytes_master_pattern = build_master_pattern(as_bytes=True)
+        self.group_codes = dict(kind_codes, ignore=IGNORE, keyword=KEYWORD, error=ERROR)
+        self.keyword_codes = {}
+        for (word, name) in keywords.items():
+            self.keyword_codes[word] = self.keyword_codes[word.encode()] = kind_codes[name]
+
+    def lex(self, source):
+        store = TokenStore(source)
+        self.scan(source, store)
+        return store
+
+    def lex_file(self, f):
+        '''Lexes a binary file object through a read-only memory map.
+
+        The whole map is handed to `re`, which reads it like any other bytes
+        object while the OS pages it in, so tokens are never split at page or
+        chunk boundaries and the file is never copied into a Python string.'''
+        if os.fstat(f.fileno()).st_size == 0:
+            return self.lex(b'')
+
+        return self.lex(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def scan(self, source, store):
+        master_pattern = self.master_pattern if isinstance(source, str) else self.bytes_master_pattern
+        group_codes = self.group_codes
+        keyword_codes = self.keyword_codes
+        append_kind = store.kinds.append
+        append_start = store.starts.append
+        append_end = store.ends.append
+
+        for match in master_pattern.finditer(source):
+            code = group_codes[match.lastgroup]
+
+            if code < 0:
+                if code == IGNORE:
+                    continue
+                elif code == KEYWORD:
+                    code = keyword_codes[match.group()]
+                else:
+                    raise LexingError(None, store.position_at(match.start()))
+
+            (start, end) = match.span()
+            append_kind(code)
+            append_start(start)
+            append_end(end)
+
+    def iter_tokens(self, source, pos=0):
+        '''Yields (kind code, start, end) for every token from `pos` on'''
+        master_pattern = self.master_pattern if isinstance(source, str) else self.bytes_master_pattern
+
+        for match in master_pattern.finditer(source, pos):
+            code = self.group_codes[match.lastgroup]
+
+            if code == IGNORE:
+                continue
+            elif code == KEYWORD:
+                code = self.keyword_codes[match.group()]
+            elif code == ERROR:
+                raise LexingError(None, TokenStore(source).position_at(match.start()))
+
+            yield (code,) + match.span()
+
+    def relex(self, store, offset, deleted, inserted):
+        '''Re-lexes `store` after replacing `deleted` characters at `offset` with `inserted`.
+
+        Scanning restarts one token before the edit and stops as soon as a
+        new token starts where an old token after the edit started: from
+        there on the lexer sees the same text from the same position, so the
+        old tokens are reused with their offsets shifted.
+
+        Returns the new store and a `(first, old_stop, new_stop)` triple:
+        the old tokens `[first:old_stop]` were replaced by the new tokens
+        `[first:new_stop]`.'''
+        source = store.source
+        if not isinstance(source, str) and isinstance(inserted, str):
+            inserted = inserted.encode()
+
+        new_source = source[:offset] + inserted + source[offset + deleted:]
+        shift = len(inserted) - deleted
+        unchanged_from = offset + len(inserted)
+
+        first = max(bisect_left(store.ends, offset) - 1, 0)
+        restart = min(store.starts[first], offset) if first < len(store) else 0
+
+        new_tokens = []
+        old_stop = len(store)
+        for (code, start, end) in self.iter_tokens(new_source, restart):
+            if start >= unchanged_from:
+                old_idx = bisect_left(store.starts, start - shift, first)
+                if old_idx < len(store) and store.starts[old_idx] == start - shift:
+                    old_stop = old_idx
+                    break
+            new_tokens.append((code, start, end))
+
+        new_store = TokenStore(new_source)
+        new_store.kinds = store.kinds[:first] + array('B', (code for (code, _, _) in new_tokens))
+        new_store.starts = store.starts[:first] + array('I', (start for (_, start, _) in new_tokens))
+        new_store.ends = store.ends[:first] + array('I', (end for (_, _, end) in new_tokens))
+
+        new_store.kinds += store.kinds[old_stop:]
+        if shift:
+            new_store.starts += array('I', (start + shift for start in store.starts[old_stop:]))
+            new_store.ends += array('I', (end + shift for end in store.ends[old_stop:]))
+        else:
+            new_store.starts += store.starts[old_stop:]
+            new_store.ends += store.ends[old_stop:]
+
+        return (new_store, (first, old_stop, first + len(new_tokens)))
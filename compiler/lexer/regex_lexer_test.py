@@ -0,0 +1,184 @@
+import mmap
+import random
+import tempfile
+import unittest
+from itertools import zip_longest
+from rply import Token
+from rply.errors import LexingError
+
+from compiler.lexer.lexer import Lexer
+from compiler.lexer.regex_lexer import RegexLexer
+
+
+rply_lexer = Lexer(engine='rply').lexer
+regex_lexer = RegexLexer()
+
+
+def assert_same_tokens(source):
+    expected = list(rply_lexer.lex(source))
+    result = list(regex_lexer.lex(source))
+
+    for (r, e) in zip_longest(result, expected):
+        assert r == e
+        assert r.getsourcepos().idx == e.getsourcepos().idx
+        assert r.getsourcepos().lineno == e.getsourcepos().lineno
+        assert r.getsourcepos().colno == e.getsourcepos().colno
+
+
+class TestRegexLexer(unittest.TestCase):
+    def test_same_tokens_as_rply(self):
+        '''Produces the same tokens as the rply lexer for a simple program'''
+        assert_same_tokens('''
+            float duck, goose, birds[2];
+            int wildcat;
+
+            duck = 1.0 + 44. * (3 % 2);
+            goose = -1;
+            birds[0] = duck;
+
+            if (duck != goose && !wildcat || duck == 1) {
+              birds[1] = goose / 2;
+            } else {
+              birds[1] = wildcat;
+            }
+        ''')
+
+    def test_same_rule_order_as_rply(self):
+        '''Keeps rply's first-rule-wins order: `iffy >= elsewhere <= integer;`'''
+        assert_same_tokens('iffy >= elsewhere <= integer;')
+
+    def test_source_positions(self):
+        '''Tracks line and column numbers across newlines'''
+        assert_same_tokens('int x;\n\n  x = 1;\n\tif (x) {\n}\n')
+
+    def test_empty_source(self):
+        '''Produces no tokens for whitespace-only input'''
+        assert list(regex_lexer.lex('')) == []
+        assert list(regex_lexer.lex(' \n\t ')) == []
+
+    def test_invalid_character(self):
+        '''Raises a LexingError on characters no rule matches: `x = @;`'''
+        with self.assertRaises(LexingError) as context:
+            list(regex_lexer.lex('x = @;'))
+
+        assert context.exception.getsourcepos().idx == 4
+
+
+class TestRegexLexerFile(unittest.TestCase):
+    def lex_file(self, source):
+        with tempfile.NamedTemporaryFile(suffix='.c') as f:
+            f.write(source.encode())
+            f.flush()
+            f.seek(0)
+            from_file = regex_lexer.lex_file(f)
+            from_path = Lexer(engine='regex').lex_file(f.name)
+
+            assert list(from_file) == list(from_path)
+            return from_file
+
+    def test_same_tokens_as_source_string(self):
+        '''Lexing a memory-mapped file gives the same tokens as lexing its contents'''
+        source = 'int x;\nfloat y;\nif (x >= 1) {\n  y = 2.5;\n}\n'
+        result = self.lex_file(source)
+
+        for (r, e) in zip_longest(result, regex_lexer.lex(source)):
+            assert r == e
+            assert r.getsourcepos().lineno == e.getsourcepos().lineno
+            assert r.getsourcepos().colno == e.getsourcepos().colno
+
+    def test_tokens_across_page_boundaries(self):
+        '''Tokens straddling memory page boundaries are kept whole'''
+        page = mmap.PAGESIZE
+        source = ' ' * (page - 3) + 'wildcat = 12345.5;' + ' ' * (page - 10) + 'duck;'
+        result = self.lex_file(source)
+
+        assert list(result) == [
+            Token('ID', 'wildcat'),
+            Token('EQUAL', '='),
+            Token('FLOAT', '12345.5'),
+            Token('SEMI', ';'),
+            Token('ID', 'duck'),
+            Token('SEMI', ';'),
+        ]
+
+    def test_empty_file(self):
+        '''An empty file has no tokens'''
+        assert len(self.lex_file('')) == 0
+
+
+class TestRegexLexerRelex(unittest.TestCase):
+    source = '''
+        float duck, goose, birds[2];
+        int wildcat;
+        duck = 1.0 + 44. * (3 % 2);
+        if (duck >= goose) {
+          birds[1] = goose / 2;
+        } else {
+          wildcat = 12;
+        }
+    '''
+
+    def assert_relex(self, offset, deleted, inserted):
+        store = regex_lexer.lex(self.source)
+        (result, (first, old_stop, new_stop)) = regex_lexer.relex(store, offset, deleted, inserted)
+
+        edited = self.source[:offset] + inserted + self.source[offset + deleted:]
+        expected = regex_lexer.lex(edited)
+
+        assert list(result.kinds) == list(expected.kinds)
+        assert list(result.starts) == list(expected.starts)
+        assert list(result.ends) == list(expected.ends)
+        assert list(store[:first]) == list(result[:first])
+        assert list(store[old_stop:]) == list(result[new_stop:])
+
+        return (first, old_stop, new_stop)
+
+    def test_edit_inside_token(self):
+        '''Changing one character re-lexes only the surrounding tokens'''
+        offset = self.source.index('44.')
+        (first, old_stop, new_stop) = self.assert_relex(offset, 1, '5')
+
+        assert old_stop - first == new_stop - first
+        assert old_stop - first <= 3
+
+    def test_edits_that_merge_and_split_tokens(self):
+        '''Handles edits that join, split, insert and remove tokens'''
+        self.assert_relex(self.source.index(', goose'), 2, '')
+        self.assert_relex(self.source.index('wildcat = 12'), 0, 'if')
+        self.assert_relex(self.source.index('1.0') + 1, 1, ' ')
+        self.assert_relex(self.source.index('>='), 1, '<')
+        self.assert_relex(self.source.index('} else'), 0, 'x = 1; y = 2.;')
+        self.assert_relex(0, len(self.source), 'int x;')
+        self.assert_relex(len(self.source), 0, 'x = 3;')
+
+    def test_random_edits(self):
+        '''Re-lexing gives the same tokens as lexing the edited source'''
+        rng = random.Random(0)
+        for _ in range(200):
+            offset = rng.randrange(len(self.source))
+            deleted = rng.randrange(4)
+            inserted = ''.join(rng.choice('ab1. ;=+\n') for _ in range(rng.randrange(4)))
+
+            edited = self.source[:offset] + inserted + self.source[offset + deleted:]
+            try:
+                regex_lexer.lex(edited)
+            except LexingError:
+                with self.assertRaises(LexingError):
+                    regex_lexer.relex(regex_lexer.lex(self.source), offset, deleted, inserted)
+            else:
+                self.assert_relex(offset, deleted, inserted)
+
+    def test_invalid_edit(self):
+        '''Raises a LexingError when the edit adds an invalid character'''
+        store = regex_lexer.lex(self.source)
+
+        with self.assertRaises(LexingError):
+            regex_lexer.relex(store, self.source.index('duck ='), 0, '@')
+
+    def test_lexer_relex(self):
+        '''Lexer.relex updates a token stream'''
+        lexer = Lexer(engine='regex')
+        (result, changed) = lexer.relex(lexer.lex('x = 1;'), 4, 1, '2.5')
+
+        assert list(result) == list(lexer.lex('x = 2.5;'))
+        assert changed == (1, 3, 3)
@@ -0,0 +1,100 @@
+import re
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from functools import partial
+from rply import Token
+from rply.token import SourcePosition
+
+from compiler.lexer.tokens import names
+
+
+kind_codes = {name: code for (code, name) in enumerate(names)}
+
+
+class TokenStore(Sequence):
+    '''Tokens kept as parallel arrays of kind codes and source offsets.
+
+    Values and source positions are computed from `source` only when they are
+    asked for, so a stored token takes 9 bytes instead of a `Token`, its
+    `SourcePosition` and its value string. `source` is either a `str` or a
+    bytes-like object such as a memory map of the source file.'''
+    def __init__(self, source):
+        self.source = source
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self._newlines = None
+
+    def append(self, kind, start, end):
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [StoredToken(self, i) for i in range(*idx.indices(len(self)))]
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('token index out of range')
+
+        return StoredToken(self, idx)
+
+    def __iter__(self):
+        return map(partial(StoredToken, self), range(len(self)))
+
+    def gettokentype(self, idx):
+        return names[self.kinds[idx]]
+
+    def getstr(self, idx):
+        value = self.source[self.starts[idx]:self.ends[idx]]
+        return value if isinstance(value, str) else value.decode()
+
+    def getsourcepos(self, idx):
+        return self.position_at(self.starts[idx])
+
+    def position_at(self, offset):
+        '''Returns the rply `SourcePosition` of a source offset'''
+        if self._newlines is None:
+            newline = '\n' if isinstance(self.source, str) else b'\n'
+            self._newlines = array('I', (m.start() for m in re.finditer(newline, self.source)))
+
+        line = bisect_left(self._newlines, offset)
+        line_start = self._newlines[line - 1] if line else -1
+        return SourcePosition(offset, line + 1, offset - line_start)
+
+    def __repr__(self):
+        return '\n'.join(str(tok) for tok in self)
+
+    def __str__(self):
+        return repr(self)
+
+
+class StoredToken(Token):
+    '''A `Token` view of one entry of a `TokenStore`'''
+    def __init__(self, store, idx):
+        self.store = store
+        self.idx = idx
+
+    def gettokentype(self):
+        return self.store.gettokentype(self.idx)
+
+    def getstr(self):
+        return self.store.getstr(self.idx)
+
+    @property
+    def name(self):
+        return self.store.gettokentype(self.idx)
+
+    @property
+    def value(self):
+        return self.store.getstr(self.idx)
+
+    @property
+    def source_pos(self):
+        return self.store.getsourcepos(self.idx)
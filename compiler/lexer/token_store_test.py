@@ -0,0 +1,54 @@
+import unittest
+from rply import Token
+
+from compiler.lexer.lexer import Lexer
+from compiler.lexer.token_store import TokenStore, kind_codes
+from compiler.parser.parser import Parser
+
+
+rply_lexer = Lexer(engine='rply')
+regex_lexer = Lexer(engine='regex')
+parser = Parser()
+
+
+class TestTokenStore(unittest.TestCase):
+    def test_stored_tokens_are_tokens(self):
+        '''Stored tokens compare equal to rply tokens: `x = 1.5;`'''
+        store = TokenStore('x = 1.5;')
+        store.append(kind_codes['ID'], 0, 1)
+        store.append(kind_codes['EQUAL'], 2, 3)
+        store.append(kind_codes['FLOAT'], 4, 7)
+
+        assert len(store) == 3
+        assert store[0] == Token('ID', 'x')
+        assert Token('FLOAT', '1.5') == store[-1]
+        assert store[1:] == [Token('EQUAL', '='), Token('FLOAT', '1.5')]
+        assert list(store) == [Token('ID', 'x'), Token('EQUAL', '='), Token('FLOAT', '1.5')]
+        assert store[2].getstr() == '1.5'
+        assert store[2].gettokentype() == 'FLOAT'
+
+        with self.assertRaises(IndexError):
+            store[3]
+
+    def test_source_positions(self):
+        '''Computes line and column numbers on demand'''
+        store = regex_lexer.lex('int x;\n  x = 1;').tokens
+        pos = store[4].getsourcepos()
+
+        assert store[4] == Token('EQUAL', '=')
+        assert (pos.idx, pos.lineno, pos.colno) == (11, 2, 5)
+
+    def test_parser_accepts_stored_tokens(self):
+        '''The parser builds the same tree from stored and rply tokens'''
+        source = '''
+            float duck, birds[2];
+            int wildcat;
+            birds[0] = duck * 2.0;
+            if (duck) {
+              wildcat = -1;
+            } else {
+              birds[1] = wildcat;
+            }
+        '''
+
+        assert parser.parse(regex_lexer.lex(source)) == parser.parse(rply_lexer.lex(source))
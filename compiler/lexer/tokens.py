@@ -37,4 +37,6 @@ name_with_pattern = [
     ('EQUAL', r'='),
 ]
 
+ignore_pattern = r'\s+'
+
 names = [name for (name, _) in name_with_pattern]
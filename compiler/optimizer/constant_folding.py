@@ -0,0 +1,235 @@
+import math
+
+import compiler.parser.ast as ast
+from compiler.ir.builder import arithmetic_ops, comparison_ops, decided_values
+from compiler.ir.ir import operations
+from compiler.parser.visitor import Leave, Visitor
+from compiler.typechecker.typechecker import float_type, int_type, mixed, type_codes, untyped
+from compiler.vm.arithmetic import wrap
+
+
+literal_classes = (ast.Integer, ast.Float)
+
+# a type bit of its own for undeclared ids, which the or of the types of their expressions keeps
+undeclared = 4
+
+
+def literal_value(node):
+    return wrap(node.value) if node.node_class is ast.Integer else node.value
+
+
+def literal(value):
+    return ast.Integer(value) if type(value) is int else ast.Float(value)
+
+
+def literal_type(value):
+    return int_type if type(value) is int else float_type
+
+
+def fold_binop(op, left, right):
+    '''The value of `left op right` for two literals, or None where folding
+       would raise or give a float minic has no literal for'''
+    (left, right) = (literal_value(left), literal_value(right))
+    is_int = type(left) is int and type(right) is int
+
+    if op in decided_values:
+        return (1 if left and right else 0) if op == '&&' else (1 if left or right else 0)
+    elif op in comparison_ops:
+        return operations[comparison_ops[op]](left, right)
+    elif not is_int:
+        (left, right) = (float(left), float(right))
+
+    try:
+        value = operations[arithmetic_ops[op][0 if is_int else 1]](left, right)
+    except ArithmeticError:
+        return None
+
+    return value if is_int or math.isfinite(value) else None
+
+
+def fold_unaryop(op, operand):
+    value = literal_value(operand)
+    if op == '!':
+        return 0 if value else 1
+
+    return wrap(-value) if type(value) is int else -value
+
+
+class ConstantFolder(Visitor):
+    '''Folds operations on literals and prunes if statements with literal
+    conditions, returning a new tree and leaving the input as it was.
+
+    Folding follows the VM: ints wrap around at 64 bits, int division and
+    `%` truncate towards zero, and `0 && x` and `1 || x` don't depend on
+    `x`. Divisions by zero, which raise, and float results without a minic
+    literal, like infinities, are left to run. Expression statements that
+    fold to a literal are dropped.
+
+    The right-hand sides of assignments keep the type the typechecker
+    infers for them, the bitwise or of the types of their leaves, so
+    folding neither adds nor removes type errors. `2.0 > 1.0` is a float
+    expression with an int value and `1 + 2.5` a mixed one, so neither is
+    folded there. The typechecker doesn't check other expressions, like if
+    conditions, and they fold whatever their type. Expressions mentioning
+    undeclared ids, an error when compiling, are never folded away.
+
+    The branch an if statement takes is spliced into the enclosing block,
+    or kept as a nested block if it declares variables. Pruned branches
+    aren't typechecked, so their type errors go unreported.
+
+    `eliminated` is the number of nodes the last fold removed. Unchanged
+    subtrees are shared with the input.'''
+    def fold(self, tree):
+        self.eliminated = 0
+        self.results = []  # (node or list of statements, node count, inferred type) of each subtree visited so far
+        self.types = {}  # name -> the type code of the innermost declaration visible
+        self.scopes = []  # (name, hidden type code or None) pairs of each open block
+        self.checked = False  # whether the expression being visited is the right-hand side of an assignment
+        self.visit(tree)
+
+        return self.results.pop()[0]
+
+    def visit_Block(self, node):
+        self.scopes.append([])
+        return node.statements
+
+    def leave_Block(self, node):
+        for (name, hidden) in reversed(self.scopes.pop()):
+            if hidden is None:
+                del self.types[name]
+            else:
+                self.types[name] = hidden
+
+        count = len(node.statements)
+        results = self.results[len(self.results) - count:]
+        del self.results[len(self.results) - count:]
+
+        statements = []
+        size = 1
+        for (result, result_size, _) in results:
+            if type(result) is list:
+                statements += result
+            else:
+                statements.append(result)
+            size += result_size
+
+        unchanged = len(statements) == count and all(a is b for (a, b) in zip(statements, node.statements))
+        self.results.append((node if unchanged else ast.Block(statements), size, None))
+
+    def visit_Declaration(self, node):
+        type_code = type_codes[node.type]
+        for ast_variable in node.ids:
+            name = (ast_variable.id if ast_variable.node_class is ast.ArrayRef else ast_variable).name
+            self.scopes[-1].append((name, self.types.get(name)))
+            self.types[name] = type_code
+
+        self.results.append((node, 1 + len(node.ids) + sum(id.node_class is ast.ArrayRef for id in node.ids) * 2, None))
+
+    def visit_Statement(self, node):
+        return (node.expr,)
+
+    def leave_Statement(self, node):
+        (expr, size, _) = self.results.pop()
+        if expr.node_class in literal_classes:
+            self.eliminated += 2
+            self.results.append(([], 0, None))
+        else:
+            self.results.append((node if expr is node.expr else ast.Statement(expr), size + 1, None))
+
+    def visit_Assignment(self, node):
+        return (node.id, Leave(ConstantFolder.check_types, node), node.expr)
+
+    def check_types(self, node):
+        self.checked = True
+
+    def leave_Assignment(self, node):
+        self.checked = False
+        (expr, expr_size, _) = self.results.pop()
+        (id, id_size, _) = self.results.pop()
+        unchanged = id is node.id and expr is node.expr
+        self.results.append((node if unchanged else ast.Assignment(id, expr), id_size + expr_size + 1, None))
+
+    def visit_IfStatement(self, node):
+        return (node.cond, node.then, node.otherwise)
+
+    def leave_IfStatement(self, node):
+        (otherwise, otherwise_size, _) = self.results.pop()
+        (then, then_size, _) = self.results.pop()
+        (cond, cond_size, _) = self.results.pop()
+
+        if cond.node_class not in literal_classes:
+            unchanged = cond is node.cond and then is node.then and otherwise is node.otherwise
+            self.results.append((node if unchanged else ast.IfStatement(cond, then, otherwise),
+                                 cond_size + then_size + otherwise_size + 1, None))
+            return
+
+        (kept, kept_size, pruned_size) = ((then, then_size, otherwise_size) if literal_value(cond)
+                                          else (otherwise, otherwise_size, then_size))
+        self.eliminated += 2 + pruned_size
+
+        if any(statement.node_class is ast.Declaration for statement in kept.statements):
+            self.results.append((kept, kept_size, None))
+        else:
+            self.eliminated += 1
+            self.results.append((kept.statements, kept_size - 1, None))
+
+    def visit_ID(self, node):
+        # undeclared ids are a KeyError when compiling, which folding them away would hide
+        self.results.append((node, 1, self.types.get(node.name, mixed | undeclared)))
+
+    def visit_Integer(self, node):
+        self.results.append((node, 1, int_type))
+
+    def visit_Float(self, node):
+        self.results.append((node, 1, float_type))
+
+    def visit_ArrayRef(self, node):
+        return (node.id, node.idx)
+
+    def leave_ArrayRef(self, node):
+        (idx, idx_size, _) = self.results.pop()
+        (id, id_size, _) = self.results.pop()
+        # array elements are untyped, whatever their index
+        unchanged = id is node.id and idx is node.idx
+        self.results.append((node if unchanged else ast.ArrayRef(id, idx), id_size + idx_size + 1, untyped))
+
+    def visit_UnaryOp(self, node):
+        return (node.expr,)
+
+    def leave_UnaryOp(self, node):
+        (expr, size, type_code) = self.results.pop()
+
+        value = fold_unaryop(node.op, expr) if expr.node_class in literal_classes else None
+        if value is not None and self.folds_to(value, type_code):
+            self.eliminated += 1
+            self.results.append((literal(value), 1, type_code))
+        else:
+            self.results.append((node if expr is node.expr else ast.UnaryOp(node.op, expr), size + 1, type_code))
+
+    def folds_to(self, value, type_code):
+        '''Whether an expression of type `type_code` can be replaced by the literal `value`'''
+        return literal_type(value) == type_code if self.checked else not type_code & undeclared
+
+    def visit_BinOp(self, node):
+        return (node.left, node.right)
+
+    def leave_BinOp(self, node):
+        (right, right_size, right_type) = self.results.pop()
+        (left, left_size, left_type) = self.results.pop()
+        type_code = left_type | right_type
+
+        value = None
+        if left.node_class in literal_classes and right.node_class in literal_classes:
+            value = fold_binop(node.op, left, right)
+        elif left.node_class in literal_classes and node.op in decided_values:
+            # the right operand isn't run when the left one decides the value
+            if (1 if literal_value(left) else 0) == decided_values[node.op]:
+                value = decided_values[node.op]
+
+        if value is not None and self.folds_to(value, type_code):
+            self.eliminated += left_size + right_size
+            self.results.append((literal(value), 1, type_code))
+        else:
+            unchanged = left is node.left and right is node.right
+            self.results.append((node if unchanged else ast.BinOp(node.op, left, right), left_size + right_size + 1,
+                                 type_code))
@@ -0,0 +1,164 @@
+import copy
+import random
+import unittest
+
+import compiler.parser.ast as ast
+from benchmarks.generate import generate_program
+from compiler.ir.ir_test import outcome, random_source
+from compiler.optimizer.constant_folding import ConstantFolder
+from compiler.parser.visitor import child_nodes
+from compiler.typechecker.typechecker import Typechecker
+from compiler.vm.bytecode import BytecodeCompiler
+from compiler.vm.bytecode_test import lexer, parser
+from compiler.vm.vm import VM
+
+
+def parse(source):
+    return parser.parse(lexer.lex(source))
+
+
+def node_count(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        count += 1
+        stack += child_nodes(stack.pop())
+
+    return count
+
+
+def run_tree(tree):
+    return VM().run(BytecodeCompiler().compile(tree))
+
+
+class TestConstantFolding(unittest.TestCase):
+    def test_int_arithmetic(self):
+        '''Folds ints like C: `(0 - 7) / 2 + 7 % (0 - 2)`, `9223372036854775807 + 1`'''
+        folder = ConstantFolder()
+        tree = folder.fold(parse('int x, y; x = (0 - 7) / 2 + 7 % (0 - 2); y = 9223372036854775807 + 1;'))
+
+        assert tree.statements[1:] == [
+            ast.Assignment(ast.ID('x'), ast.Integer(-2)),
+            ast.Assignment(ast.ID('y'), ast.Integer(-2 ** 63)),
+        ]
+        assert folder.eliminated == 12
+
+    def test_float_arithmetic(self):
+        '''Folds floats, but not to values without a literal: `1.0 / 0.0`'''
+        tree = ConstantFolder().fold(parse('float f, g; f = 1.0 + 2.5 * 2.0; g = 1.0 / 0.0;'))
+
+        assert tree.statements[1:] == [
+            ast.Assignment(ast.ID('f'), ast.Float(6.0)),
+            ast.Assignment(ast.ID('g'), ast.BinOp('/', ast.Float(1.0), ast.Float(0.0))),
+        ]
+
+    def test_keeps_types(self):
+        '''Doesn't fold what would change the inferred type: `2.0 > 1.0`, `!1.5`, `1 < 2.0`, `0 && f`'''
+        folder = ConstantFolder()
+        tree = parse('int x; float y, f; y = 2.0 > 1.0; y = !1.5; y = 1.5 && 2.5; x = 1 < 2.0; x = 0 && f;')
+
+        assert folder.fold(tree) is tree
+        assert folder.eliminated == 0
+
+        # array elements are untyped, so `0 && a[1]` is an int like 0
+        tree = folder.fold(parse('int x, a[2]; x = 0 && a[1];'))
+        assert tree.statements[1] == ast.Assignment(ast.ID('x'), ast.Integer(0))
+
+    def test_array_ref(self):
+        '''Keeps what it folds in the id of an element: `a[1 + 1][2]`'''
+        folder = ConstantFolder()
+        tree = folder.fold(parse('int x, a[3]; x = a[1 + 1][2];'))
+
+        assert tree.statements[1].expr == ast.ArrayRef(ast.ArrayRef(ast.ID('a'), ast.Integer(2)), ast.Integer(2))
+        assert folder.eliminated == 2
+
+    def test_division_by_zero(self):
+        '''Leaves int division by zero to raise: `1 / 0`'''
+        tree = ConstantFolder().fold(parse('int x; x = 1 / 0 + 2 * 3;'))
+
+        assert tree.statements[1] == ast.Assignment(
+            ast.ID('x'), ast.BinOp('+', ast.BinOp('/', ast.Integer(1), ast.Integer(0)), ast.Integer(6)))
+
+    def test_short_circuit(self):
+        '''Folds `0 && x` and `1 || x`, whose right operands don't run'''
+        tree = ConstantFolder().fold(parse('int x, y; x = 0 && 1 / y; y = 2 || x; x = 1 && x;'))
+
+        assert tree.statements[1:] == [
+            ast.Assignment(ast.ID('x'), ast.Integer(0)),
+            ast.Assignment(ast.ID('y'), ast.Integer(1)),
+            ast.Assignment(ast.ID('x'), ast.BinOp('&&', ast.Integer(1), ast.ID('x'))),
+        ]
+
+    def test_prune_branches(self):
+        '''Keeps the branch a literal condition takes, in the enclosing block unless it declares variables'''
+        folder = ConstantFolder()
+        tree = folder.fold(parse('''
+            int x;
+            if (2 > 1) { x = 1; x = 2; } else { x = 3; }
+            if (0) { x = 4; } else { int y; y = 5; }
+            if (x) { 1 + 2; }
+        '''))
+
+        assert tree == ast.Block([
+            ast.Declaration('int', [ast.ID('x')]),
+            ast.Assignment(ast.ID('x'), ast.Integer(1)),
+            ast.Assignment(ast.ID('x'), ast.Integer(2)),
+            ast.Block([ast.Declaration('int', [ast.ID('y')]), ast.Assignment(ast.ID('y'), ast.Integer(5))]),
+            ast.IfStatement(ast.ID('x'), ast.Block([]), ast.Block([])),
+        ])
+        assert folder.eliminated == 9 + 6 + 4
+
+    def test_prune_typed_conditions(self):
+        '''Prunes on conditions of any type, which the typechecker doesn't check: `2.0 > 1.0`, `1 < 2.0`'''
+        folder = ConstantFolder()
+        tree = folder.fold(parse('''
+            int x;
+            if (2.0 > 1.0) { x = 1; }
+            if (1 < 2.0 && !1.5) { x = 2; } else { x = 3; }
+        '''))
+
+        assert tree == ast.Block([
+            ast.Declaration('int', [ast.ID('x')]),
+            ast.Assignment(ast.ID('x'), ast.Integer(1)),
+            ast.Assignment(ast.ID('x'), ast.Integer(3)),
+        ])
+        assert folder.eliminated == 7 + 11
+
+    def test_undeclared_condition(self):
+        '''Keeps the undeclared ids of conditions to fail compiling: `if (0 && y)`'''
+        folder = ConstantFolder()
+        tree = parse('int x; if (0 && y) { x = 1; }')
+
+        assert folder.fold(tree) is tree
+        assert folder.eliminated == 0
+
+    def test_random_programs(self):
+        '''Counts the nodes it eliminates, leaves its input as it was, and doesn't change results'''
+        rng = random.Random(0)
+        folder = ConstantFolder()
+        for _ in range(100):
+            tree = parse(random_source(rng))
+            original = copy.deepcopy(tree)
+            folded = folder.fold(tree)
+
+            assert tree == original
+            assert node_count(tree) - node_count(folded) == folder.eliminated
+            assert outcome(run_tree, folded) == outcome(run_tree, tree)
+
+    def test_same_type_errors(self):
+        '''Gives valid random programs the type errors they have unfolded, which is none'''
+        rng = random.Random(0)
+        folder = ConstantFolder()
+        checked = 0
+        for _ in range(300):
+            source = generate_program(20, seed=rng.randrange(2 ** 32), runnable=True)
+            # comparisons and logic on float literals, in expressions the generator keeps apart
+            source += 'duck = 2.5 > 1.5; weight = !1.5; goose = (1.5 && 2.5) + 1.0; total = 0 && wildcat;'
+            tree = parse(source)
+            errors = Typechecker().typecheck(tree).get_errors()
+            folded_errors = Typechecker().typecheck(folder.fold(tree)).get_errors()
+
+            assert [repr(error) for error in folded_errors] == [repr(error) for error in errors]
+            checked += not errors
+
+        assert checked
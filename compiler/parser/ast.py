@@ -1,117 +1,278 @@
-from itertools import zip_longest
-from compiler.utils import is_iterable
+from compiler.parser.symbols import intern_symbol
+
+
+class AstNodeType(type):
+    '''Generates equality, `__hash__` and repr helpers for each node class from its `__slots__`.
+
+    Two nodes are equal when they are of the same class and each pair of
+    fields is the same object or has the same type and compares equal.
+    `list_fields` name the fields holding lists of nodes, `value_fields`
+    the fields holding plain values. The remaining `child_fields` hold a
+    single node each. `derived_fields` are slots computed from the fields,
+    like the symbol id of an ID, and are left out of equality, hashing and
+    repr. `node_class` is the class itself; views of other tree representations report the class they
+    stand for, so passes can treat both alike.
+
+    Expression nodes are immutable once built. They compute their
+    structural hash from their children's in `__init__` and keep it in a
+    `_hash` slot, which equality checks compare before any field, and have
+    a `__weakref__` slot so they can be interned. Statement nodes and
+    blocks change while a parser builds them, so they aren't hashable.
+
+    Generated programs nest deeply, so equality and repr don't rely on the
+    Python stack: `_eq_fields` compares a node's own fields and its children
+    down to a bounded depth, queueing deeper ones, `_repr_parts` lists the
+    strings and children a repr is made of, and `nodes_equal` and
+    `node_repr` walk the trees with explicit stacks.'''
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+
+        cls.node_class = cls
+        cls.fields = tuple(slot for slot in namespace.get('__slots__', ())
+                           if not slot.startswith('_') and slot not in cls.derived_fields)
+        cls.child_fields = tuple(field for field in cls.fields
+                                 if field not in cls.list_fields and field not in cls.value_fields)
+        if not cls.fields:
+            return
+
+        generated = {
+            '_eq_fields': AstNodeType.eq_fields_source,
+            '_repr_parts': AstNodeType.repr_parts_source,
+        }
+        if '_hash' in cls.__slots__:
+            generated['__hash__'] = AstNodeType.hash_source
+        for (method, make_source) in generated.items():
+            if method not in namespace:
+                scope = {'cls': cls}
+                exec(make_source(cls), scope)
+                setattr(cls, method, scope[method])
+
+    def eq_fields_source(cls):
+        compare_children = [
+            '        if type(a) is not type(b):',
+            '            return False',
+            '        if not depth:',
+            '            pairs += (a, b)',
+            '        elif not a._eq_fields(b, pairs, depth - 1):',
+            '            return False',
+        ]
+
+        lines = ['def _eq_fields(self, other, pairs, depth):']
+        if '_hash' in cls.__slots__:
+            lines += ['    if self._hash != other._hash:', '        return False']
+
+        for field in cls.fields:
+            if field in cls.value_fields:
+                lines += ['    if not (self.{0} is other.{0} or'
+                          ' (type(self.{0}) is type(other.{0}) and self.{0} == other.{0})):'.format(field),
+                          '        return False']
+            elif field in cls.list_fields:
+                lines += ['    if len(self.{0}) != len(other.{0}):'.format(field),
+                          '        return False',
+                          '    for (a, b) in zip(self.{0}, other.{0}):'.format(field),
+                          '        if a is b:',
+                          '            continue'] + compare_children
+            else:
+                lines += ['    (a, b) = (self.{0}, other.{0})'.format(field),
+                          '    if a is not b:'] + compare_children
+
+        return '\n'.join(lines + ['    return True'])
+
+    def hash_source(cls):
+        return 'def __hash__(self):\n    return self._hash'
+
+    def repr_parts_source(cls):
+        parts = []
+        for (i, field) in enumerate(cls.fields):
+            parts += ['{!r}'.format(('{}('.format(cls.__name__) if i == 0 else ', ') + field + '='),
+                      'self.{}'.format(field)]
+
+        return 'def _repr_parts(self):\n    return ({}, {!r})'.format(', '.join(parts), ')')
+
+
+eq_recursion_depth = 100
+
+
+def nodes_equal(first, second):
+    '''Compares two trees of the same class.
+
+    Children are compared recursively up to `eq_recursion_depth` levels
+    down, deeper pairs are queued on `pairs` and compared from there, so the
+    depth of the trees doesn't matter.'''
+    pairs = [first, second]  # flattened, the last two items are the next pair
+
+    while pairs:
+        b = pairs.pop()
+        a = pairs.pop()
+        if not a._eq_fields(b, pairs, eq_recursion_depth):
+            return False
 
+    return True
 
-class AstNode:
-    def __eq__(self, other):
-        if not isinstance(other, AstNode):
-            return False
 
-        if not type(self) is type(other):
-            return False
+def node_repr(root):
+    '''Joins the `_repr_parts` of a tree, without recursing'''
+    out = []
+    stack = [root]
 
-        for attr in list(self.__dict__):
-            # get top-level attribute values
-            self_data = self.__getattribute__(attr)
-            other_data = other.__getattribute__(attr)
+    while stack:
+        part = stack.pop()
 
-            if not type(self_data) is type(other_data):
-                return False
+        if type(part) is str:
+            out.append(part)
+        elif isinstance(part, AstNode):
+            stack.extend(reversed(part._repr_parts()))
+        elif type(part) is list:
+            items = ['[']
+            for item in part:
+                items += [item if isinstance(item, AstNode) else repr(item), ', ']
 
-            if is_iterable(self_data) and is_iterable(other_data):
-                # if attribute is an iterable check if any of the elements are not the same
-                has_different_attrs = any(self_subnode.__ne__(other_subnode)
-                                          for (self_subnode, other_subnode) in zip_longest(self_data, other_data))
-                if has_different_attrs:
-                    return False
+            if part:
+                items.pop()
+            stack.extend(reversed(items + [']']))
+        else:
+            out.append(str(part))
 
-            elif self_data.__ne__(other_data):
-                # if attribute if something else, check if they are equal
-                return False
+    return ''.join(out)
 
-        return True
 
-    def __ne__(self, other):
-        return not (self == other)
+class AstNode(metaclass=AstNodeType):
+    __slots__ = ()
+    list_fields = ()
+    value_fields = ()
+    derived_fields = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+
+        return nodes_equal(self, other)
+
+    # statement nodes change while the parsers build them, so only expression nodes are hashable
+    __hash__ = None
+
+    def __reduce__(self):
+        # rebuilt through the constructor, as hashes and symbol ids differ between processes
+        return (self.node_class, tuple(getattr(self, field) for field in self.fields))
 
     def __repr__(self):
-        return '{}({})'.format(
-            str(type(self)).split('.')[-1][:-2],  # such wow
-            ', '.join(['{}={}'.format(attr, self.__getattribute__(attr))
-                       for attr in self.__dict__])  # somebody pls stop me
-        )
+        return node_repr(self)
 
     def __str__(self):
         return repr(self)
 
 
 class Block(AstNode):
+    __slots__ = ('statements',)
+    list_fields = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements
 
     def getastlist(self):
         return self.statements
 
-    def __repr__(self):
-        return 'Block(\n  {}\n)'.format('\n  '.join([s.__repr__() for s in self.statements]))
+    def _repr_parts(self):
+        parts = ['Block(\n  ']
+        for statement in self.statements:
+            parts += [statement, '\n  ']
 
-    def __str__(self):
-        return repr(self)
+        if self.statements:
+            parts.pop()
+        return parts + ['\n)']
 
 
 class Statement(AstNode):
+    __slots__ = ('expr',)
+
     def __init__(self, expr):
         self.expr = expr
 
 
 class Integer(AstNode):
+    __slots__ = ('value', '_hash', '__weakref__')
+    value_fields = ('value',)
+
     def __init__(self, value):
         self.value = value
+        self._hash = hash((Integer, value))
 
 
 class Float(AstNode):
+    __slots__ = ('value', '_hash', '__weakref__')
+    value_fields = ('value',)
+
     def __init__(self, value):
         self.value = value
+        self._hash = hash((Float, value))
 
 
 class ID(AstNode):
+    __slots__ = ('name', 'symbol', '_hash', '__weakref__')
+    value_fields = ('name',)
+    derived_fields = ('symbol',)
+
     def __init__(self, name):
         self.name = name
+        self.symbol = intern_symbol(name)
+        self._hash = hash((ID, name))
 
 
 class BinOp(AstNode):
+    __slots__ = ('op', 'left', 'right', '_hash', '__weakref__')
+    value_fields = ('op',)
+
     def __init__(self, op, left, right):
         self.op = op
         self.left = left
         self.right = right
+        self._hash = hash((BinOp, op, left._hash, right._hash))
 
 
 class UnaryOp(AstNode):
+    __slots__ = ('op', 'expr', '_hash', '__weakref__')
+    value_fields = ('op',)
+
     def __init__(self, op, expr):
         self.op = op
         self.expr = expr
+        self._hash = hash((UnaryOp, op, expr._hash))
 
 
 class Assignment(AstNode):
+    __slots__ = ('id', 'expr')
+
     def __init__(self, id, expr):
         self.id = id
         self.expr = expr
 
 
 class Declaration(AstNode):
+    __slots__ = ('type', 'ids')
+    value_fields = ('type',)
+    list_fields = ('ids',)
+
     def __init__(self, type, ids):
         self.type = type
         self.ids = ids
 
 
 class ArrayRef(AstNode):
+    __slots__ = ('id', 'idx', '_hash', '__weakref__')
+
     def __init__(self, id, idx):
         self.id = id
         self.idx = idx
+        self._hash = hash((ArrayRef, id._hash, idx._hash))
 
 
 class IfStatement(AstNode):
+    __slots__ = ('cond', 'then', 'otherwise')
+
     def __init__(self, cond, then, otherwise):
         self.cond = cond
         self.then = then
         self.otherwise = otherwise
+
+
+node_classes = [Block, Statement, Integer, Float, ID, BinOp, UnaryOp, Assignment, Declaration, ArrayRef, IfStatement]
@@ -0,0 +1,170 @@
+import pickle
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.parser.symbols import intern_symbol, symbol_names
+
+
+class TestAstNode(unittest.TestCase):
+    def test_structural_equality(self):
+        '''Nodes with the same class and fields are equal: `x = (1 + y) * 2.0;`'''
+        def build():
+            return ast.Assignment(
+                ast.ID('x'),
+                ast.BinOp('*', ast.BinOp('+', ast.Integer(1), ast.ID('y')), ast.Float(2.0))
+            )
+
+        assert build() == build()
+        assert not build() != build()
+        assert build() != ast.Assignment(ast.ID('x'), ast.Float(2.0))
+        assert build() != ast.Statement(build().expr)
+        assert build() != 'x = (1 + y) * 2.0;'
+
+    def test_field_types_are_compared(self):
+        '''Values of different types are not equal: `1.0` vs `1`'''
+        assert ast.Float(1.0) != ast.Float(1)
+        assert ast.Integer(1) != ast.Float(1)
+
+    def test_list_fields(self):
+        '''List fields are compared element by element'''
+        assert ast.Block([ast.ID('x')]) == ast.Block([ast.ID('x')])
+        assert ast.Block([ast.ID('x')]) != ast.Block([ast.ID('x'), ast.ID('y')])
+        assert ast.Declaration('int', [ast.ID('x')]) != ast.Declaration('float', [ast.ID('x')])
+
+    def test_hash(self):
+        '''Equal expressions have equal hashes and can be used as keys'''
+        first = ast.ArrayRef(ast.ID('x'), ast.BinOp('+', ast.Integer(3), ast.Float(1.5)))
+        second = ast.ArrayRef(ast.ID('x'), ast.BinOp('+', ast.Integer(3), ast.Float(1.5)))
+
+        assert hash(first) == hash(second)
+        assert {first: 1}[second] == 1
+
+    def test_statements_unhashable(self):
+        '''Statements and blocks change while the parsers build them, so they can't be keys'''
+        nodes = [
+            ast.Block([]), ast.Statement(ast.ID('x')), ast.Assignment(ast.ID('x'), ast.Integer(1)),
+            ast.Declaration('int', [ast.ID('x')]), ast.IfStatement(ast.ID('x'), ast.Block([]), ast.Block([])),
+        ]
+
+        for node in nodes:
+            with self.assertRaises(TypeError):
+                hash(node)
+
+    def test_pickle(self):
+        '''Nodes are pickled as their constructor arguments: `if (x) { y = -1.5; }`'''
+        node = ast.IfStatement(
+            ast.ID('x'),
+            ast.Block([ast.Assignment(ast.ID('y'), ast.UnaryOp('-', ast.Float(1.5)))]),
+            ast.Block([])
+        )
+
+        assert pickle.loads(pickle.dumps(node)) == node
+        assert ast.ID('x').__reduce__() == (ast.ID, ('x',))
+        assert ast.Block([]).__reduce__() == (ast.Block, ([],))
+
+    def test_repr(self):
+        '''Fields are listed in constructor order'''
+        node = ast.IfStatement(ast.ID('x'), ast.Block([ast.Statement(ast.UnaryOp('-', ast.Integer(1)))]), ast.Block([]))
+
+        assert repr(node.cond) == 'ID(name=x)'
+        assert repr(node.then) == 'Block(\n  Statement(expr=UnaryOp(op=-, expr=Integer(value=1)))\n)'
+        assert repr(node).startswith('IfStatement(cond=ID(name=x), then=Block(')
+
+    def test_slots(self):
+        '''Nodes keep their fields in slots'''
+        node = ast.BinOp('+', ast.Integer(1), ast.Integer(2))
+
+        assert ast.BinOp.fields == ('op', 'left', 'right')
+        assert not hasattr(node, '__dict__')
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
+    def test_cached_hash(self):
+        '''Expression nodes compute their hash once'''
+        node = ast.UnaryOp('-', ast.ArrayRef(ast.ID('x'), ast.Integer(3)))
+
+        assert hash(node) == hash(ast.UnaryOp('-', ast.ArrayRef(ast.ID('x'), ast.Integer(3))))
+        assert node._hash == hash(node)
+        assert node.expr._hash == hash(node.expr)
+        assert ast.UnaryOp.fields == ('op', 'expr')
+
+    def test_different_hash_is_unequal(self):
+        '''Nodes with different hashes are unequal without comparing fields'''
+        first = ast.BinOp('+', ast.Integer(1), ast.Integer(2))
+        second = ast.BinOp('+', ast.Integer(1), ast.Integer(2))
+        second._hash = hash(first) + 1
+
+        assert first != second
+
+
+def nested_blocks(depth):
+    '''`if (x) { ... if (x) { x = 1; } ... }` nested `depth` times'''
+    block = ast.Block([ast.Assignment(ast.ID('x'), ast.Integer(1))])
+    for _ in range(depth):
+        block = ast.Block([ast.IfStatement(ast.ID('x'), block, ast.Block([]))])
+
+    return block
+
+
+def chain(length):
+    '''`1 + 1 + ... + 1` with `length` additions'''
+    expr = ast.Integer(1)
+    for _ in range(length):
+        expr = ast.BinOp('+', expr, ast.Integer(1))
+
+    return expr
+
+
+class TestDeepTrees(unittest.TestCase):
+    depth = 100000
+
+    def test_equality(self):
+        '''Compares trees nested deeper than the recursion limit'''
+        assert nested_blocks(self.depth) == nested_blocks(self.depth)
+        assert nested_blocks(self.depth) != nested_blocks(self.depth - 1)
+        assert chain(self.depth) == chain(self.depth)
+        assert ast.BinOp('+', chain(self.depth), ast.Integer(1)) != ast.BinOp('+', chain(self.depth), ast.Float(1.0))
+
+    def test_repr(self):
+        '''Reprs trees nested deeper than the recursion limit'''
+        text = repr(chain(self.depth))
+
+        assert text.startswith('BinOp(op=+, left=BinOp(op=+, left=')
+        assert text.count('Integer(value=1)') == self.depth + 1
+        assert repr(nested_blocks(self.depth)).count('IfStatement(') == self.depth
+
+    def test_same_repr_as_nested_format(self):
+        '''Reprs match formatting each node's fields in turn'''
+        node = ast.Block([
+            ast.Declaration('int', [ast.ID('x'), ast.ArrayRef(ast.ID('y'), ast.Integer(2))]),
+            ast.Block([ast.Statement(ast.UnaryOp('-', ast.Float(1.5)))]),
+            ast.IfStatement(ast.ID('x'), ast.Block([]), ast.Block([])),
+        ])
+
+        assert repr(node) == (
+            'Block(\n'
+            '  Declaration(type=int, ids=[ID(name=x), ArrayRef(id=ID(name=y), idx=Integer(value=2))])\n'
+            '  Block(\n'
+            '  Statement(expr=UnaryOp(op=-, expr=Float(value=1.5)))\n'
+            ')\n'
+            '  IfStatement(cond=ID(name=x), then=Block(\n'
+            '  \n'
+            '), otherwise=Block(\n'
+            '  \n'
+            '))\n'
+            ')'
+        )
+
+
+class TestSymbols(unittest.TestCase):
+    def test_symbol_ids(self):
+        '''Ids with the same name share a symbol id'''
+        assert ast.ID('duck').symbol == ast.ID('duck').symbol == intern_symbol('duck')
+        assert ast.ID('duck').symbol != ast.ID('goose').symbol
+        assert symbol_names[ast.ID('goose').symbol] == 'goose'
+
+    def test_symbol_is_not_a_field(self):
+        '''The symbol id is left out of the fields, equality and repr'''
+        assert ast.ID.fields == ('name',)
+        assert ast.ID.derived_fields == ('symbol',)
+        assert repr(ast.ID('duck')) == 'ID(name=duck)'
@@ -0,0 +1,193 @@
+from array import array
+
+import compiler.parser.ast as ast
+from compiler.parser.ast import node_classes
+from compiler.parser.symbols import intern_symbol
+
+
+kind_codes = {cls: code for (code, cls) in enumerate(node_classes)}
+
+
+def field_columns(cls):
+    '''Maps each field of `cls` to its first column, list fields take two: start and length'''
+    columns = {}
+    column = 0
+
+    for field in cls.fields:
+        columns[field] = column
+        column += 2 if field in cls.list_fields else 1
+
+    return columns
+
+
+layouts = [field_columns(cls) for cls in node_classes]
+
+
+class FlatAst:
+    '''An AST stored as parallel arrays instead of one object per node.
+
+    Node `i` has kind `kinds[i]` (an index into `node_classes`) and up to
+    three int columns. A child field holds the child's index, a value field
+    an index into the interned `values`, and a list field the start and
+    length of a run in `children`. Parents always have smaller indices than
+    their children, and the root is node 0.'''
+    def __init__(self):
+        self.kinds = array('B')
+        self.columns = [array('i'), array('i'), array('i')]
+        self.children = array('i')
+        self.values = []
+        self.value_indices = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def intern(self, value):
+        key = (type(value), value)
+        if key not in self.value_indices:
+            self.value_indices[key] = len(self.values)
+            self.values.append(value)
+
+        return self.value_indices[key]
+
+    def add(self, node_class):
+        self.kinds.append(kind_codes[node_class])
+        for column in self.columns:
+            column.append(0)
+
+        return len(self.kinds) - 1
+
+    @staticmethod
+    def from_tree(tree):
+        flat = FlatAst()
+        stack = [(tree, flat.add(tree.node_class))]
+
+        while stack:
+            (node, idx) = stack.pop()
+            cls = node.node_class
+
+            for (field, column) in layouts[kind_codes[cls]].items():
+                value = getattr(node, field)
+
+                if field in cls.list_fields:
+                    child_indices = [flat.add(child.node_class) for child in value]
+                    stack.extend(zip(value, child_indices))
+                    flat.columns[column][idx] = len(flat.children)
+                    flat.columns[column + 1][idx] = len(child_indices)
+                    flat.children.extend(child_indices)
+                elif field in cls.value_fields:
+                    flat.columns[column][idx] = flat.intern(value)
+                else:
+                    child_idx = flat.add(value.node_class)
+                    stack.append((value, child_idx))
+                    flat.columns[column][idx] = child_idx
+
+        return flat
+
+    def child_indices(self, idx):
+        cls = node_classes[self.kinds[idx]]
+        layout = layouts[self.kinds[idx]]
+
+        for field in cls.child_fields:
+            yield self.columns[layout[field]][idx]
+
+        for field in cls.list_fields:
+            start = self.columns[layout[field]][idx]
+            yield from self.children[start:start + self.columns[layout[field] + 1][idx]]
+
+    def to_tree(self, idx=0):
+        '''Builds the object tree of the subtree rooted at `idx`'''
+        subtree = []
+        stack = [idx]
+        while stack:
+            subtree.append(stack.pop())
+            stack.extend(self.child_indices(subtree[-1]))
+
+        # children come after their parents, so building in reverse index
+        # order always finds a node's children already built
+        built = {}
+        for i in sorted(subtree, reverse=True):
+            built[i] = self.build_node(i, built)
+
+        return built[idx]
+
+    def build_node(self, idx, built):
+        cls = node_classes[self.kinds[idx]]
+        args = []
+
+        for (field, column) in layouts[self.kinds[idx]].items():
+            value = self.columns[column][idx]
+
+            if field in cls.list_fields:
+                stop = value + self.columns[column + 1][idx]
+                args.append([built[child] for child in self.children[value:stop]])
+            elif field in cls.value_fields:
+                args.append(self.values[value])
+            else:
+                args.append(built[value])
+
+        return cls(*args)
+
+    def node(self, idx=0):
+        '''Returns a view of node `idx` with the fields of the AST class it stands for'''
+        return view_classes[self.kinds[idx]](self, idx)
+
+
+class FlatNode:
+    '''A view of node `index` of `flat`.
+
+    Views are the same node when they are of the same flat AST and index,
+    and compare and hash on that without building any tree; `to_node`
+    builds the object tree to compare contents.'''
+    __slots__ = ('flat', 'index')
+
+    def __init__(self, flat, index):
+        self.flat = flat
+        self.index = index
+
+    def to_node(self):
+        return self.flat.to_tree(self.index)
+
+    def __eq__(self, other):
+        if not isinstance(other, FlatNode):
+            return NotImplemented
+
+        return self.flat is other.flat and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.flat), self.index))
+
+    def __repr__(self):
+        return repr(self.to_node())
+
+    def __str__(self):
+        return repr(self)
+
+
+def field_property(cls, field, column):
+    if field in cls.list_fields:
+        def get(self):
+            start = self.flat.columns[column][self.index]
+            stop = start + self.flat.columns[column + 1][self.index]
+            return [self.flat.node(child) for child in self.flat.children[start:stop]]
+    elif field in cls.value_fields:
+        def get(self):
+            return self.flat.values[self.flat.columns[column][self.index]]
+    else:
+        def get(self):
+            return self.flat.node(self.flat.columns[column][self.index])
+
+    return property(get)
+
+
+def view_class(cls):
+    namespace = {'__slots__': (), 'node_class': cls}
+    for (field, column) in field_columns(cls).items():
+        namespace[field] = field_property(cls, field, column)
+
+    if cls is ast.ID:
+        namespace['symbol'] = property(lambda self: intern_symbol(self.name))
+
+    return type('Flat' + cls.__name__, (FlatNode,), namespace)
+
+
+view_classes = [view_class(cls) for cls in node_classes]
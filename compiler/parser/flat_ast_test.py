@@ -0,0 +1,87 @@
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.parser.flat_ast import FlatAst
+
+
+def build():
+    return ast.Block([
+        ast.Declaration('float', [ast.ID('duck'), ast.ArrayRef(ast.ID('birds'), ast.Integer(2))]),
+        ast.Assignment(ast.ID('duck'), ast.BinOp('+', ast.Float(1.0), ast.UnaryOp('-', ast.Integer(1)))),
+        ast.IfStatement(
+            ast.BinOp('>=', ast.ID('duck'), ast.Integer(1)),
+            ast.Block([ast.Statement(ast.ID('duck'))]),
+            ast.Block([])
+        ),
+    ])
+
+
+class TestFlatAst(unittest.TestCase):
+    def test_round_trip(self):
+        '''Converting to the flat form and back gives an equal tree'''
+        tree = build()
+        flat = FlatAst.from_tree(tree)
+
+        assert flat.to_tree() == tree
+        assert len(flat) == 20
+
+    def test_subtree(self):
+        '''Any node can be rebuilt on its own'''
+        flat = FlatAst.from_tree(build())
+        assignment = flat.node().statements[1]
+
+        assert flat.to_tree(assignment.index) == build().statements[1]
+
+    def test_parents_before_children(self):
+        '''Children are stored after their parents'''
+        flat = FlatAst.from_tree(build())
+
+        for idx in range(len(flat)):
+            assert all(child > idx for child in flat.child_indices(idx))
+
+    def test_views(self):
+        '''Views expose the fields of the class they stand for'''
+        flat = FlatAst.from_tree(build())
+        root = flat.node()
+        declaration = root.statements[0]
+        if_statement = root.statements[2]
+
+        assert root.node_class is ast.Block
+        assert declaration.node_class is ast.Declaration
+        assert declaration.type == 'float'
+        assert [variable.node_class for variable in declaration.ids] == [ast.ID, ast.ArrayRef]
+        assert declaration.ids[1].idx.value == 2
+        assert if_statement.cond.op == '>='
+        assert if_statement.otherwise.statements == []
+        assert if_statement.then.to_node() == ast.Block([ast.Statement(ast.ID('duck'))])
+        assert repr(if_statement.cond) == 'BinOp(op=>=, left=ID(name=duck), right=Integer(value=1))'
+        assert if_statement.cond.left.symbol == ast.ID('duck').symbol
+
+    def test_view_identity(self):
+        '''Views of the same node are equal and hash alike, views of equal nodes elsewhere aren't'''
+        flat = FlatAst.from_tree(build())
+        (first, second) = (flat.node(), flat.node())
+        other = FlatAst.from_tree(build()).node()
+
+        assert first == second
+        assert hash(first) == hash(second)
+        assert len({first, second, other}) == 2
+        assert first != other
+        assert first.statements[2].then != first.statements[2].otherwise
+        assert first.to_node() == other.to_node()
+
+    def test_values_are_interned(self):
+        '''Repeated names, operators and literals are stored once'''
+        flat = FlatAst.from_tree(build())
+
+        assert sorted(map(repr, flat.values)) == sorted(map(repr, [
+            'float', 'duck', 'birds', 2, '+', 1.0, '-', 1, '>=',
+        ]))
+
+    def test_values_keep_their_type(self):
+        '''`1` and `1.0` are interned separately'''
+        tree = ast.Block([ast.Statement(ast.Integer(1)), ast.Statement(ast.Float(1.0))])
+        flat = FlatAst.from_tree(tree)
+
+        assert flat.to_tree() == tree
+        assert type(flat.node().statements[1].expr.value) is float
@@ -0,0 +1,42 @@
+import weakref
+from functools import partial
+
+import compiler.parser.ast as ast
+
+
+interned_classes = [ast.Integer, ast.Float, ast.ID, ast.BinOp, ast.UnaryOp, ast.ArrayRef]
+
+statement_classes = [ast.Block, ast.Statement, ast.Assignment, ast.Declaration, ast.IfStatement]
+
+
+class NodeInterner:
+    '''Node factory that shares structurally identical expression nodes.
+
+    It has the same constructors as `compiler.parser.ast`, so it can be
+    handed to the parsers in place of the module. Expressions are looked up
+    by class and fields in a weak-valued table: children are already
+    interned, so each lookup compares them by identity and costs O(1), and
+    an entry goes away with the last tree using it. Statements and blocks
+    are built as usual, since the parsers extend blocks in place.'''
+    def __init__(self):
+        self.table = weakref.WeakValueDictionary()
+
+        for cls in interned_classes:
+            value_positions = [cls.fields.index(field) for field in cls.value_fields]
+            setattr(self, cls.__name__, partial(self.intern, cls, value_positions))
+        for cls in statement_classes:
+            setattr(self, cls.__name__, cls)
+
+    def __len__(self):
+        return len(self.table)
+
+    def intern(self, cls, value_positions, *fields):
+        # value types are part of the key since `Float(1.0) != Float(1)`
+        key = (cls, *fields, *[type(fields[i]) for i in value_positions])
+        node = self.table.get(key)
+
+        if node is None:
+            node = cls(*fields)
+            self.table[key] = node
+
+        return node
@@ -0,0 +1,72 @@
+import gc
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.lexer.lexer import Lexer
+from compiler.parser.interning import NodeInterner
+from compiler.parser.parser import Parser
+
+
+lexer = Lexer()
+
+source = '''
+    int x, birds[2];
+    x = birds[1] + (x + 1);
+    birds[1] = x + 1;
+    if (x + 1) { x = birds[1]; }
+'''
+
+
+class TestNodeInterner(unittest.TestCase):
+    def test_identical_subtrees_are_shared(self):
+        '''Structurally identical expressions are the same object: `x + 1`'''
+        nodes = NodeInterner()
+        first = nodes.BinOp('+', nodes.ID('x'), nodes.Integer(1))
+        second = nodes.BinOp('+', nodes.ID('x'), nodes.Integer(1))
+
+        assert first is second
+        assert first == ast.BinOp('+', ast.ID('x'), ast.Integer(1))
+        assert nodes.BinOp('-', nodes.ID('x'), nodes.Integer(1)) is not first
+
+    def test_value_types_are_kept_apart(self):
+        '''`1` and `1.0` are not shared'''
+        nodes = NodeInterner()
+
+        assert nodes.Float(1.0) is not nodes.Float(1)
+        assert type(nodes.Float(1).value) is int
+
+    def test_statements_are_not_shared(self):
+        '''Blocks are extended in place, so each one is a new object'''
+        nodes = NodeInterner()
+
+        assert nodes.Block([]) is not nodes.Block([])
+        assert nodes.Statement(nodes.ID('x')) is not nodes.Statement(nodes.ID('x'))
+
+    def test_entries_are_weak(self):
+        '''Nodes no tree uses any more leave the table'''
+        nodes = NodeInterner()
+        node = nodes.ArrayRef(nodes.ID('birds'), nodes.Integer(1))
+        assert len(nodes) == 3
+
+        del node
+        gc.collect()
+        assert len(nodes) == 0
+
+
+class TestInterningParser(unittest.TestCase):
+    def test_same_trees(self):
+        '''Both backends build the same trees with and without interning'''
+        expected = Parser().parse(lexer.lex(source))
+
+        for backend in ['rply', 'pratt']:
+            assert Parser(backend=backend, intern=True).parse(lexer.lex(source)) == expected
+
+    def test_shared_subtrees(self):
+        '''Repeated expressions in a program are built once'''
+        for backend in ['rply', 'pratt']:
+            tree = Parser(backend=backend, intern=True).parse(lexer.lex(source))
+            (_, assignment, array_assignment, if_statement) = tree.statements
+
+            assert assignment.expr.left is array_assignment.id
+            assert assignment.expr.right is array_assignment.expr
+            assert if_statement.cond is array_assignment.expr
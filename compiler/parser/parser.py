@@ -1,25 +1,28 @@
 from rply import ParserGenerator
 
-from compiler.parser.productions import add_productions
+import compiler.parser.ast as ast
+from compiler.parser.interning import NodeInterner
+from compiler.parser.productions import add_productions, precedence
+from compiler.parser.tables import load_parser, default_tables_path
+from compiler.parser.pratt_parser import PrattParser
 from compiler.lexer.tokens import names as token_names
 
 
 class Parser:
-    def __init__(self):
-        self.parser = self.build_parser()
+    def __init__(self, backend='rply', tables_path=default_tables_path, intern=False):
+        nodes = NodeInterner() if intern else ast
 
-    def build_parser(self):
-        pg = ParserGenerator(
-            token_names,
-            precedence = [
-                ('left', ['NOT_EQUAL', 'EQUAL_EQUAL', 'GREATER', 'GREATER_EQUAL', 'SMALLER', 'SMALLER_EQUAL']),
-                ('left', ['OR', 'AND']),
-                ('left', ['PLUS', 'MINUS']),
-                ('left', ['MUL', 'DIV', 'MOD'])
-            ]
-        )
+        if backend == 'rply':
+            self.parser = self.build_parser(tables_path, nodes)
+        elif backend == 'pratt':
+            self.parser = PrattParser(nodes)
+        else:
+            raise ValueError('Unknown parser backend, %s' % backend)
 
-        return add_productions(pg).build()
+    def build_parser(self, tables_path=default_tables_path, nodes=ast):
+        pg = ParserGenerator(token_names, precedence=precedence)
+
+        return load_parser(add_productions(pg, nodes), tables_path)
 
     def parse(self, tokens):
         return self.parser.parse(tokens)
@@ -8,7 +8,12 @@ import compiler.parser.ast as ast
 parser = Parser()
 
 
-class TestExpr(unittest.TestCase):
+class ParserTestCase(unittest.TestCase):
+    '''Parses with `parser`, which subclasses set to run the cases against another backend'''
+    parser = parser
+
+
+class TestExpr(ParserTestCase):
     def test_add(self):
         '''Can parse a simple addition: `1 + 1;`'''
         given = iter([
@@ -22,7 +27,7 @@ class TestExpr(unittest.TestCase):
             ast.Statement(ast.BinOp('+', ast.Integer(1), ast.Integer(1)))
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
 
@@ -47,7 +52,7 @@ class TestExpr(unittest.TestCase):
             )
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
 
@@ -64,7 +69,7 @@ class TestExpr(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Statement(
@@ -91,7 +96,7 @@ class TestExpr(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Statement(
@@ -116,7 +121,7 @@ class TestExpr(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Statement(
@@ -140,7 +145,7 @@ class TestExpr(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Statement(
@@ -164,7 +169,7 @@ class TestExpr(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Statement(
@@ -183,7 +188,7 @@ class TestExpr(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Statement(
@@ -212,7 +217,7 @@ class TestExpr(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Statement(
@@ -231,7 +236,7 @@ class TestExpr(unittest.TestCase):
         assert result == expected
 
 
-class TestAssignment(unittest.TestCase):
+class TestAssignment(ParserTestCase):
     def test_simple_assignment(self):
         '''Can parse a simple assignment: `x = 5;`'''
         given = iter([
@@ -241,7 +246,7 @@ class TestAssignment(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Assignment(
@@ -267,7 +272,7 @@ class TestAssignment(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Assignment(
@@ -291,7 +296,7 @@ class TestAssignment(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Assignment(
@@ -318,7 +323,7 @@ class TestAssignment(unittest.TestCase):
             Token('SEMI', ';')
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Assignment(
@@ -361,7 +366,7 @@ class TestAssignment(unittest.TestCase):
             Token('SEMI', ';'),
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         expected = ast.Block([
             ast.Assignment(
@@ -385,7 +390,7 @@ class TestAssignment(unittest.TestCase):
         assert result == expected
 
 
-class TestDeclaration(unittest.TestCase):
+class TestDeclaration(ParserTestCase):
     def test_simple_declaration(self):
         '''Can parse a simple declaration: `int a;`'''
         given = iter([
@@ -398,7 +403,7 @@ class TestDeclaration(unittest.TestCase):
             ast.Declaration('int', [ast.ID('a')])
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
 
@@ -421,7 +426,7 @@ class TestDeclaration(unittest.TestCase):
             )
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
 
@@ -440,12 +445,12 @@ class TestDeclaration(unittest.TestCase):
             )
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
 
 
-class TestBlockStatement(unittest.TestCase):
+class TestBlockStatement(ParserTestCase):
     def test_simple_block_of_statements(self):
         '''Can parse a nested block of statements:
            `int x;
@@ -478,12 +483,95 @@ class TestBlockStatement(unittest.TestCase):
             ])
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
+
+        assert expected == result
+
+    def test_statements_after_nested_block(self):
+        '''Statements after a nested block are not added to it:
+           `int x;
+            {
+              int y;
+            }
+            x = 5;`
+        '''
+        given = iter([
+            Token('INT_TYPE', 'int'),
+            Token('ID', 'x'),
+            Token('SEMI', ';'),
+
+            Token('LCURLY', '{'),
+            Token('INT_TYPE', 'int'),
+            Token('ID', 'y'),
+            Token('SEMI', ';'),
+            Token('RCURLY', '}'),
+
+            Token('ID', 'x'),
+            Token('EQUAL', '='),
+            Token('INTEGER', '5'),
+            Token('SEMI', ';'),
+        ])
+
+        expected = ast.Block([
+            ast.Declaration('int', [ast.ID('x')]),
+            ast.Block([
+                ast.Declaration('int', [ast.ID('y')]),
+            ]),
+            ast.Assignment(ast.ID('x'), ast.Integer(5))
+        ])
+
+        result = self.parser.parse(given)
+
+        assert expected == result
+
+    def test_leading_nested_block(self):
+        '''A nested block at the start of a block is a block of its own:
+           `{
+              int y;
+            }
+            y = 5;`
+        '''
+        given = iter([
+            Token('LCURLY', '{'),
+            Token('INT_TYPE', 'int'),
+            Token('ID', 'y'),
+            Token('SEMI', ';'),
+            Token('RCURLY', '}'),
+
+            Token('ID', 'y'),
+            Token('EQUAL', '='),
+            Token('INTEGER', '5'),
+            Token('SEMI', ';'),
+        ])
+
+        expected = ast.Block([
+            ast.Block([
+                ast.Declaration('int', [ast.ID('y')]),
+            ]),
+            ast.Assignment(ast.ID('y'), ast.Integer(5))
+        ])
+
+        result = self.parser.parse(given)
+
+        assert expected == result
+
+    def test_many_statements(self):
+        '''Collects a long sequence of statements into one block: `x = 0; x = 1; ...`'''
+        count = 5000
+        given = iter([
+            token
+            for i in range(count)
+            for token in (Token('ID', 'x'), Token('EQUAL', '='), Token('INTEGER', str(i)), Token('SEMI', ';'))
+        ])
+
+        expected = ast.Block([ast.Assignment(ast.ID('x'), ast.Integer(i)) for i in range(count)])
+
+        result = self.parser.parse(given)
 
         assert expected == result
 
 
-class TestIfStatement(unittest.TestCase):
+class TestIfStatement(ParserTestCase):
     def test_single_if_statement(self):
         '''Can parse a single if statement
            `if (1) {
@@ -514,7 +602,7 @@ class TestIfStatement(unittest.TestCase):
             )
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
 
@@ -563,12 +651,12 @@ class TestIfStatement(unittest.TestCase):
             )
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
 
 
-class TestParser(unittest.TestCase):
+class TestParser(ParserTestCase):
     def test_simple_program(self):
         '''Can parse a simple program
            `int x[3], duck, goose, wildcat;
@@ -627,6 +715,6 @@ class TestParser(unittest.TestCase):
             ast.Assignment(ast.ArrayRef(ast.ID('x'), ast.Integer(2)), ast.ID('wildcat')),
         ])
 
-        result = parser.parse(given)
+        result = self.parser.parse(given)
 
         assert expected == result
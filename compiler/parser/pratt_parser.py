@@ -0,0 +1,207 @@
+from rply import Token
+
+import compiler.parser.ast as ast
+from compiler.parser.productions import precedence
+
+
+prefix_operators = ['MINUS', 'BANG']
+
+end_of_input = Token('$end', '$end')
+
+# what an expression on the stack is waiting to become once it ends
+(parenthesized, unary, index, right_operand) = range(4)
+
+
+def binding_power(assoc, level):
+    '''Minimum level an operator's right operand may contain'''
+    return level + 1 if assoc == 'left' else level
+
+
+class PrattParser:
+    '''Hand-written parser for the grammar in `productions.py`.
+
+    Expressions are parsed Pratt-style from the same precedence table the
+    rply parser is generated from. Unary operators follow rply's conflict
+    resolution: a unary operator with a precedence level takes the operators
+    that bind tighter into its operand, one without a level takes all of
+    them, so both backends build the same trees. Nodes are built with the
+    constructors of `nodes`.
+
+    Blocks, if statements and nested expressions are parsed on explicit
+    stacks instead of by recursion, so like the rply backend it takes
+    programs of any nesting depth.'''
+    def __init__(self, nodes=ast):
+        self.nodes = nodes
+        self.binary_powers = {}  # token type -> (level, right operand power)
+        levels = {}
+
+        for (level, (assoc, terms)) in enumerate(precedence, 1):
+            for term in terms:
+                self.binary_powers[term] = (level, binding_power(assoc, level))
+                levels[term] = (assoc, level)
+
+        self.prefix_powers = {op: binding_power(*levels[op]) if op in levels else 0
+                              for op in prefix_operators}
+
+    def parse(self, tokens):
+        self.tokens = iter(tokens)
+        self.token = None
+        self.advance()
+
+        return self.statements()
+
+    def advance(self):
+        '''Moves to the next token and returns the current one'''
+        token = self.token
+        self.token = next(self.tokens, end_of_input)
+        self.kind = self.token.gettokentype()
+        return token
+
+    def expect(self, kind):
+        if self.kind != kind:
+            self.error()
+
+        return self.advance()
+
+    def error(self):
+        raise ValueError('Invalid token, %s' % self.kind)
+
+    def statements(self):
+        '''Parses the whole program, with the blocks and if statements being parsed on a stack'''
+        # the statements of each open block, with the if statement it belongs to: None, (cond,) for a
+        # then branch or (cond, then) for an else branch
+        stack = [([], None)]
+
+        while True:
+            (statements, branch) = stack[-1]
+            closing = '$end' if len(stack) == 1 else 'RCURLY'
+
+            # blocks have at least one statement, the statement parsed otherwise reports the token
+            if self.kind == closing and statements:
+                if len(stack) == 1:
+                    return self.nodes.Block(statements)
+
+                self.advance()
+                stack.pop()
+                block = self.nodes.Block(statements)
+
+                if branch is None:
+                    stack[-1][0].append(block)
+                elif len(branch) == 2:
+                    stack[-1][0].append(self.nodes.IfStatement(branch[0], branch[1], block))
+                elif self.kind == 'ELSE':
+                    self.advance()
+                    self.expect('LCURLY')
+                    stack.append(([], (branch[0], block)))
+                else:
+                    stack[-1][0].append(self.nodes.IfStatement(branch[0], block, self.nodes.Block([])))
+            elif self.kind == 'LCURLY':
+                self.advance()
+                stack.append(([], None))
+            elif self.kind == 'IF':
+                self.advance()
+                self.expect('LPAREN')
+                cond = self.expr()
+                self.expect('RPAREN')
+                self.expect('LCURLY')
+                stack.append(([], (cond,)))
+            else:
+                statements.append(self.statement())
+
+    def statement(self):
+        if self.kind in ('INT_TYPE', 'FLOAT_TYPE'):
+            return self.declaration()
+        elif self.kind == 'ID':
+            variable = self.variable()
+            if self.kind == 'EQUAL':
+                self.advance()
+                statement = self.nodes.Assignment(variable, self.expr())
+            else:
+                statement = self.nodes.Statement(self.expr(variable))
+        else:
+            statement = self.nodes.Statement(self.expr())
+
+        self.expect('SEMI')
+        return statement
+
+    def declaration(self):
+        type = self.advance().getstr()
+        variables = [self.variable()]
+
+        while self.kind == 'COMMA':
+            self.advance()
+            variables.append(self.variable())
+
+        self.expect('SEMI')
+        return self.nodes.Declaration(type, variables)
+
+    def variable(self):
+        variable = self.nodes.ID(self.expect('ID').getstr())
+
+        while self.kind == 'LBRACE':
+            self.advance()
+            variable = self.nodes.ArrayRef(variable, self.expr())
+            self.expect('RBRACE')
+
+        return variable
+
+    def expr(self, left=None):
+        '''Parses an expression, continuing from `left` if it is given.
+
+        Operands that nest, parenthesized and prefix expressions, array
+        indices and right operands, are parsed on a stack of what to do
+        with them once they end, along with the minimum level of the
+        operators they may contain, so nesting doesn't recurse.'''
+        stack = []  # (what it becomes, op or node, min power) of each operand being parsed
+        min_power = 0
+
+        while True:
+            if left is None:
+                kind = self.kind
+                if kind == 'INTEGER':
+                    left = self.nodes.Integer(int(self.advance().getstr()))
+                elif kind == 'FLOAT':
+                    left = self.nodes.Float(float(self.advance().getstr()))
+                elif kind == 'ID':
+                    left = self.nodes.ID(self.advance().getstr())
+                    if self.kind == 'LBRACE':
+                        self.advance()
+                        stack.append((index, left, min_power))
+                        (left, min_power) = (None, 0)
+                        continue
+                elif kind == 'LPAREN':
+                    self.advance()
+                    stack.append((parenthesized, None, min_power))
+                    min_power = 0
+                    continue
+                elif kind in self.prefix_powers:
+                    op = self.advance().getstr()
+                    stack.append((unary, op, min_power))
+                    min_power = self.prefix_powers[kind]
+                    continue
+                else:
+                    self.error()
+
+            powers = self.binary_powers.get(self.kind)
+            if powers is not None and powers[0] >= min_power:
+                op = self.advance().getstr()
+                stack.append((right_operand, (op, left), min_power))
+                (left, min_power) = (None, powers[1])
+                continue
+            elif not stack:
+                return left
+
+            (pending, value, min_power) = stack.pop()
+            if pending == parenthesized:
+                self.expect('RPAREN')
+            elif pending == unary:
+                left = self.nodes.UnaryOp(value, left)
+            elif pending == right_operand:
+                left = self.nodes.BinOp(value[0], value[1], left)
+            else:
+                self.expect('RBRACE')
+                left = self.nodes.ArrayRef(value, left)
+                if self.kind == 'LBRACE':
+                    self.advance()
+                    stack.append((index, left, min_power))
+                    (left, min_power) = (None, 0)
@@ -0,0 +1,79 @@
+import random
+import unittest
+
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.parser import parser_test
+
+
+lexer = Lexer(engine='regex')
+rply_parser = Parser(backend='rply')
+pratt_parser = Parser(backend='pratt')
+
+
+class TestPrattExpr(parser_test.TestExpr):
+    parser = pratt_parser
+
+
+class TestPrattAssignment(parser_test.TestAssignment):
+    parser = pratt_parser
+
+
+class TestPrattDeclaration(parser_test.TestDeclaration):
+    parser = pratt_parser
+
+
+class TestPrattBlockStatement(parser_test.TestBlockStatement):
+    parser = pratt_parser
+
+
+class TestPrattIfStatement(parser_test.TestIfStatement):
+    parser = pratt_parser
+
+
+class TestPrattParser(parser_test.TestParser):
+    parser = pratt_parser
+
+
+def parse(parser, source):
+    try:
+        return parser.parse(lexer.lex(source))
+    except ValueError as e:
+        return str(e)
+
+
+class TestSameAsRply(unittest.TestCase):
+    def test_unary_operators(self):
+        '''Unary operators bind like in the rply backend: `-a * b; !a + b; a * -b + c;`'''
+        for source in ['-a * b;', '-a + b;', '!a + b;', '!a == b;', 'a * -b * c;', 'a * !b + c;', '- -a % b;']:
+            assert parse(pratt_parser, source) == parse(rply_parser, source)
+
+    def test_nested_blocks(self):
+        '''Blocks at the start of a statement list are handled like in the rply backend'''
+        for source in ['{ x; } y;', '{ { x; } y; } z;', 'if (x) { { y; } } else { z; { w; } }']:
+            assert parse(pratt_parser, source) == parse(rply_parser, source)
+
+    def test_deep_nesting(self):
+        '''Takes programs nested deeper than the recursion limit, like the rply backend'''
+        depth = 2000
+        sources = [
+            'if (x) { ' * depth + 'x = 1;' + ' } else { y; }' * depth,
+            '{ ' * depth + 'x;' + ' }' * depth,
+            'x = ' + '(' * depth + '1' + ' + 2)' * depth + ';',
+            'x = ' + '-' * depth + '1;',
+            'x = ' + 'a[' * depth + '1' + ']' * depth + ';',
+        ]
+
+        for source in sources:
+            tree = parse(pratt_parser, source)
+            assert not isinstance(tree, str) and tree == parse(rply_parser, source)
+
+    def test_random_token_sequences(self):
+        '''Builds the same trees and reports the same invalid tokens as the rply backend'''
+        rng = random.Random(0)
+        words = ['a', 'b', '1', '2.5', '+', '-', '*', '/', '%', '==', '!=', '<', '>=', '&&', '||', '!',
+                 '(', ')', '[', ']', ';', '=', '{', '}', 'if', 'else', 'int', 'float', ',']
+
+        for _ in range(3000):
+            source = ' '.join(rng.choice(words) for _ in range(rng.randrange(1, 12)))
+            assert parse(pratt_parser, source) == parse(rply_parser, source)
@@ -1,8 +1,18 @@
+from functools import partial
+
 import compiler.parser.ast as ast
 from compiler.utils import is_iterable
 
 
-def statements_productions(pg):
+precedence = [
+    ('left', ['NOT_EQUAL', 'EQUAL_EQUAL', 'GREATER', 'GREATER_EQUAL', 'SMALLER', 'SMALLER_EQUAL']),
+    ('left', ['OR', 'AND']),
+    ('left', ['PLUS', 'MINUS']),
+    ('left', ['MUL', 'DIV', 'MOD'])
+]
+
+
+def statements_productions(pg, nodes):
     # Statements
     @pg.production('main : statements')
     def main(s):
@@ -11,7 +21,9 @@ def statements_productions(pg):
     @pg.production('statements : statements statement')
     @pg.production('statements : statements block')
     def statements(s):
-        return ast.Block(s[0].getastlist() + [s[1]])
+        # the left block is never referenced elsewhere, so it is extended in place
+        s[0].getastlist().append(s[1])
+        return s[0]
 
     @pg.production('block : LCURLY statements RCURLY')
     def block_statements(s):
@@ -19,29 +31,30 @@ def statements_productions(pg):
 
     @pg.production('statements : statement')
     def statements_statement(s):
-        return ast.Block([s[0]])
+        return nodes.Block([s[0]])
 
     @pg.production('statements : block')
     def statements_block(s):
-        return s[0]
+        # a leading block is a scope of its own, not the start of the enclosing one
+        return nodes.Block([s[0]])
 
     return pg
 
 
-def statement_productions(pg):
+def statement_productions(pg, nodes):
     # Statement
     @pg.production('statement : expr SEMI')
     def statement_expr(s):
-        return ast.Statement(s[0])
+        return nodes.Statement(s[0])
 
     @pg.production('statement : variable EQUAL expr SEMI')
     def statement_assignment(s):
-        return ast.Assignment(s[0], s[2])
+        return nodes.Assignment(s[0], s[2])
 
     @pg.production('statement : type variables SEMI')
     def statement_declaration(s):
-        return ast.Declaration(s[0],
-                               [s[1]] if isinstance(s[1], ast.AstNode) else s[1])
+        return nodes.Declaration(s[0],
+                                 [s[1]] if isinstance(s[1], ast.AstNode) else s[1])
 
     @pg.production('statement : if_statement')
     def statement_if_statement(s):
@@ -49,11 +62,11 @@ def statement_productions(pg):
 
     @pg.production('if_statement : IF LPAREN expr RPAREN block')
     def if_statement(s):
-        return ast.IfStatement(s[2], s[4], ast.Block([]))
+        return nodes.IfStatement(s[2], s[4], nodes.Block([]))
 
     @pg.production('if_statement : IF LPAREN expr RPAREN block ELSE block')
     def ifelse_statement(s):
-        return ast.IfStatement(s[2], s[4], s[6])
+        return nodes.IfStatement(s[2], s[4], s[6])
 
     return pg
 
@@ -68,12 +81,15 @@ def type_productions(pg):
     return pg
 
 
-def variables_productions(pg):
+def variables_productions(pg, nodes):
     # Variables
     @pg.production('variables : variables COMMA variable')
     def variables_sequence(s):
-        return ((s[0] if is_iterable(s[0]) else [s[0]]) +
-                [s[2]])
+        if not is_iterable(s[0]):
+            return [s[0], s[2]]
+
+        s[0].append(s[2])
+        return s[0]
 
     @pg.production('variables : variable')
     def variables_single(s):
@@ -81,16 +97,16 @@ def variables_productions(pg):
 
     @pg.production('variable : variable LBRACE expr RBRACE')
     def variable_arrayref(s):
-        return ast.ArrayRef(s[0], s[2])
+        return nodes.ArrayRef(s[0], s[2])
 
     @pg.production('variable : ID')
     def variable(s):
-        return ast.ID(s[0].getstr())
+        return nodes.ID(s[0].getstr())
 
     return pg
 
 
-def expressions_productions(pg):
+def expressions_productions(pg, nodes):
     # Expressions
     @pg.production('expr : LPAREN expr RPAREN')
     def expr_parens(s):
@@ -99,7 +115,7 @@ def expressions_productions(pg):
     @pg.production('expr : MINUS expr')
     @pg.production('expr : BANG expr')
     def expr_unaryop(s):
-        return ast.UnaryOp(s[0].getstr(), s[1])
+        return nodes.UnaryOp(s[0].getstr(), s[1])
 
     @pg.production('expr : expr PLUS expr')
     @pg.production('expr : expr MINUS expr')
@@ -115,7 +131,7 @@ def expressions_productions(pg):
     @pg.production('expr : expr SMALLER expr')
     @pg.production('expr : expr SMALLER_EQUAL expr')
     def expr_binop(s):
-        return ast.BinOp(s[1].getstr(), s[0], s[2])
+        return nodes.BinOp(s[1].getstr(), s[0], s[2])
 
     @pg.production('expr : INTEGER')
     @pg.production('expr : FLOAT')
@@ -125,8 +141,8 @@ def expressions_productions(pg):
             return s[0]
         else:
             handlers = {
-                'INTEGER': lambda t: ast.Integer(int(t.getstr())),
-                'FLOAT': lambda t: ast.Float(float(t.getstr())),
+                'INTEGER': lambda t: nodes.Integer(int(t.getstr())),
+                'FLOAT': lambda t: nodes.Float(float(t.getstr())),
             }
 
             default_handler = lambda t: t  # noqa
@@ -145,13 +161,14 @@ def error_handler(pg):
     return pg
 
 
-def add_productions(pg):
+def add_productions(pg, nodes=ast):
+    '''Registers the grammar on `pg`, building nodes with the constructors of `nodes`'''
     production_groups = [
-        statements_productions,
-        statement_productions,
+        partial(statements_productions, nodes=nodes),
+        partial(statement_productions, nodes=nodes),
         type_productions,
-        variables_productions,
-        expressions_productions,
+        partial(variables_productions, nodes=nodes),
+        partial(expressions_productions, nodes=nodes),
         error_handler
     ]
 
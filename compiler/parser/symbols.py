@@ -0,0 +1,16 @@
+symbol_ids = {}  # str -> int
+symbol_names = []  # int -> str
+
+
+def intern_symbol(name):
+    '''Returns the symbol id of an identifier, the same one for each occurrence of the name.
+
+    Ids are small consecutive ints, so tables keyed by identifier can be
+    arrays indexed by symbol id.'''
+    symbol = symbol_ids.get(name)
+
+    if symbol is None:
+        symbol = symbol_ids[name] = len(symbol_names)
+        symbol_names.append(name)
+
+    return symbol
@@ -0,0 +1,105 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import warnings
+from rply import ParserGenerator
+from rply.errors import ParserGeneratorWarning
+from rply.grammar import Grammar
+from rply.parser import LRParser
+from rply.parsergenerator import LRTable
+
+
+default_tables_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parsetab.json')
+
+
+def grammar_hash(pg):
+    '''Hashes everything the LR tables of `pg` are computed from'''
+    grammar = [
+        ParserGenerator.VERSION,
+        pg.tokens,
+        pg.precedence,
+        [(name, syms, precedence) for (name, syms, _, precedence) in pg.productions],
+    ]
+    return hashlib.sha1(json.dumps(grammar).encode()).hexdigest()
+
+
+def build_grammar(pg):
+    g = Grammar(pg.tokens)
+
+    for level, (assoc, terms) in enumerate(pg.precedence, 1):
+        for term in terms:
+            g.set_precedence(term, assoc, level)
+
+    for (name, syms, func, precedence) in pg.productions:
+        g.add_production(name, syms, func, precedence)
+
+    g.set_start()
+    return g
+
+
+def generate_tables(g):
+    g.build_lritems()
+    g.compute_first()
+    g.compute_follow()
+
+    table = LRTable.from_grammar(g)
+
+    if table.sr_conflicts:
+        warnings.warn('%d shift/reduce conflicts' % len(table.sr_conflicts), ParserGeneratorWarning, stacklevel=2)
+    if table.rr_conflicts:
+        warnings.warn('%d reduce/reduce conflicts' % len(table.rr_conflicts), ParserGeneratorWarning, stacklevel=2)
+
+    return table
+
+
+def read_tables(path, key):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return data if data.get('grammar_hash') == key else None
+
+
+def write_tables(path, data):
+    '''Writes the tables atomically, skipping locations they can't be written to.
+       A failed write removes its temporary file.'''
+    try:
+        f = tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), delete=False)
+    except OSError:
+        return
+
+    try:
+        with f:
+            json.dump(data, f)
+        os.replace(f.name, path)
+    except BaseException as e:
+        with contextlib.suppress(OSError):
+            os.unlink(f.name)
+        if not isinstance(e, OSError):
+            raise
+
+
+def load_parser(pg, tables_path=default_tables_path):
+    '''Builds an LR parser for the productions registered on `pg`.
+
+    Computing the LALR tables is the slow part of building a parser, so they
+    are stored in `tables_path` together with a hash of the tokens,
+    precedence and productions they were computed from. Stored tables are
+    reused while the hash matches and regenerated when the grammar changes.
+    With `tables_path=None` the tables are always computed.'''
+    g = build_grammar(pg)
+    key = grammar_hash(pg)
+
+    data = read_tables(tables_path, key) if tables_path else None
+    if data is not None:
+        table = LRTable.from_cache(g, data)
+    else:
+        table = generate_tables(g)
+        if tables_path:
+            write_tables(tables_path, dict(pg.serialize_table(table), grammar_hash=key))
+
+    return LRParser(table, pg.error_handler)
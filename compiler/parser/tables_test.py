@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+from rply import ParserGenerator, Token
+
+from compiler.parser.parser import Parser
+from compiler.parser.productions import add_productions
+from compiler.parser.tables import grammar_hash, load_parser, write_tables
+from compiler.lexer.tokens import names as token_names
+import compiler.parser.ast as ast
+
+
+given = [
+    Token('ID', 'x'), Token('EQUAL', '='),
+    Token('INTEGER', '1'), Token('PLUS', '+'), Token('INTEGER', '5'), Token('MUL', '*'), Token('INTEGER', '20'),
+    Token('SEMI', ';'),
+]
+
+expected = ast.Block([
+    ast.Assignment(
+        ast.ID('x'),
+        ast.BinOp('+', ast.Integer(1), ast.BinOp('*', ast.Integer(5), ast.Integer(20)))
+    )
+])
+
+
+class TestParseTables(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.tables_path = os.path.join(self.directory.name, 'parsetab.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def stored_hash(self):
+        with open(self.tables_path) as f:
+            return json.load(f)['grammar_hash']
+
+    def test_tables_are_stored_and_reused(self):
+        '''The first parser stores its tables, the next one parses the same way from them'''
+        generated = Parser(tables_path=self.tables_path)
+        assert os.path.exists(self.tables_path)
+        modified = os.stat(self.tables_path).st_mtime_ns
+
+        loaded = Parser(tables_path=self.tables_path)
+        assert os.stat(self.tables_path).st_mtime_ns == modified
+
+        assert generated.parse(iter(given)) == expected
+        assert loaded.parse(iter(given)) == expected
+
+    def test_tables_are_regenerated_on_grammar_change(self):
+        '''Changing the precedence invalidates the stored tables'''
+        Parser(tables_path=self.tables_path)
+
+        pg = add_productions(ParserGenerator(token_names, precedence=[
+            ('left', ['MUL', 'DIV', 'MOD']),
+            ('left', ['PLUS', 'MINUS']),
+        ]))
+        parser = load_parser(pg, self.tables_path)
+
+        assert self.stored_hash() == grammar_hash(pg)
+        assert parser.parse(iter(given)) == ast.Block([
+            ast.Assignment(
+                ast.ID('x'),
+                ast.BinOp('*', ast.BinOp('+', ast.Integer(1), ast.Integer(5)), ast.Integer(20))
+            )
+        ])
+
+    def test_corrupt_tables_are_regenerated(self):
+        '''Unreadable stored tables are replaced'''
+        with open(self.tables_path, 'w') as f:
+            f.write('{')
+
+        assert Parser(tables_path=self.tables_path).parse(iter(given)) == expected
+        assert self.stored_hash() is not None
+
+    def test_failed_writes_leave_no_temporary_file(self):
+        '''Errors writing the tables are raised and an unwritable path skipped, removing the temporary file'''
+        with self.assertRaises(TypeError):
+            write_tables(self.tables_path, {'grammar_hash': object()})
+        assert os.listdir(self.directory.name) == []
+
+        os.mkdir(self.tables_path)
+        write_tables(self.tables_path, {'grammar_hash': 'x'})
+        assert os.listdir(self.directory.name) == ['parsetab.json']
@@ -0,0 +1,102 @@
+from compiler.parser.ast import node_classes
+
+
+def node_fields(cls):
+    '''The fields of `cls` holding nodes, each with whether it holds a list of them'''
+    return tuple((field, field in cls.list_fields) for field in cls.fields if field not in cls.value_fields)
+
+
+child_layouts = {cls: node_fields(cls) for cls in node_classes}
+
+
+def child_nodes(node):
+    '''The children of `node` in field order'''
+    children = []
+
+    for (field, is_list) in child_layouts[node.node_class]:
+        if is_list:
+            children.extend(getattr(node, field))
+        else:
+            children.append(getattr(node, field))
+
+    return children
+
+
+def count_nodes(tree):
+    '''The number of nodes in `tree`, walked on an explicit stack like the visitor'''
+    count = 0
+    stack = [tree]
+
+    while stack:
+        count += 1
+        stack += child_nodes(stack.pop())
+
+    return count
+
+
+class Leave:
+    '''Stack entry calling a `leave_<class name>` method once `node`'s subtree has been visited'''
+    __slots__ = ('method', 'node')
+
+    def __init__(self, method, node):
+        self.method = method
+        self.node = node
+
+    @staticmethod
+    def leave(visitor, entry):
+        entry.method(visitor, entry.node)
+
+
+Leave.node_class = Leave
+
+
+def with_leave(visit, leave):
+    def visit_and_leave(self, node):
+        return [*(visit(self, node) or ()), Leave(leave, node)]
+
+    return visit_and_leave
+
+
+class Visitor:
+    '''Base class for passes over an AST.
+
+    A pass handles a node class with a `visit_<class name>` method, which
+    returns the nodes to visit next, in order. The methods are looked up
+    once per pass into `dispatch`, so visiting a node is a single dict
+    lookup whatever its class. Classes without a method go to
+    `generic_visit`, which continues with all of the node's children.
+    A `leave_<class name>` method is called after the nodes its visit
+    method returned, like the end of a block. Visit methods can also return
+    `Leave(method, node)` entries among the nodes, to call `method` on
+    `node` between two of its children.
+
+    Nodes are visited in pre-order on an explicit stack, so trees of any
+    depth can be walked. The walk works on anything with a `node_class`
+    and the fields of that class, like the views of a flat AST.'''
+    dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = {
+            node_class: getattr(cls, 'visit_' + node_class.__name__, cls.generic_visit)
+            for node_class in node_classes
+        }
+
+        for node_class in node_classes:
+            leave = getattr(cls, 'leave_' + node_class.__name__, None)
+            if leave is not None:
+                cls.dispatch[node_class] = with_leave(cls.dispatch[node_class], leave)
+                cls.dispatch[Leave] = Leave.leave
+
+    def visit(self, tree):
+        dispatch = self.dispatch
+        stack = [tree]
+
+        while stack:
+            node = stack.pop()
+            children = dispatch[node.node_class](self, node)
+            if children:
+                stack.extend(reversed(children))
+
+    def generic_visit(self, node):
+        return child_nodes(node)
@@ -0,0 +1,102 @@
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.parser.flat_ast import FlatAst
+from compiler.parser.visitor import Visitor, child_nodes, count_nodes
+
+
+class Recorder(Visitor):
+    def __init__(self):
+        self.visited = []
+
+    def generic_visit(self, node):
+        self.visited.append(node.node_class.__name__)
+        return super().generic_visit(node)
+
+
+class BlockRecorder(Recorder):
+    def leave_Block(self, node):
+        self.visited.append('end')
+
+
+class SkipExpressions(Recorder):
+    def visit_Assignment(self, node):
+        self.visited.append('Assignment')
+
+
+def build():
+    '''`int x; x = 1 + y; if (x) { -x; } else { }`'''
+    return ast.Block([
+        ast.Declaration('int', [ast.ID('x')]),
+        ast.Assignment(ast.ID('x'), ast.BinOp('+', ast.Integer(1), ast.ID('y'))),
+        ast.IfStatement(ast.ID('x'), ast.Block([ast.Statement(ast.UnaryOp('-', ast.ID('x')))]), ast.Block([])),
+    ])
+
+
+class TestVisitor(unittest.TestCase):
+    def test_child_nodes(self):
+        '''Children come from the field metadata, in field order'''
+        tree = build()
+
+        assert child_nodes(tree) == tree.statements
+        assert child_nodes(tree.statements[0]) == [ast.ID('x')]
+        assert child_nodes(tree.statements[1].expr) == [ast.Integer(1), ast.ID('y')]
+        assert child_nodes(ast.Integer(1)) == []
+
+    def test_count_nodes(self):
+        '''Counts the nodes of a tree, the tree included'''
+        assert count_nodes(build()) == 15
+        assert count_nodes(ast.Integer(1)) == 1
+
+    def test_pre_order(self):
+        '''Visits every node in pre-order by default'''
+        recorder = Recorder()
+        recorder.visit(build())
+
+        assert recorder.visited == [
+            'Block', 'Declaration', 'ID', 'Assignment', 'ID', 'BinOp', 'Integer', 'ID',
+            'IfStatement', 'ID', 'Block', 'Statement', 'UnaryOp', 'ID', 'Block',
+        ]
+
+    def test_visit_methods(self):
+        '''A visit method replaces the generic visit and decides where to continue'''
+        recorder = SkipExpressions()
+        recorder.visit(build())
+
+        assert recorder.visited[:4] == ['Block', 'Declaration', 'ID', 'Assignment']
+        assert recorder.visited[4] == 'IfStatement'
+
+    def test_leave_methods(self):
+        '''A leave method runs once the subtree of its node has been visited'''
+        recorder = BlockRecorder()
+        recorder.visit(build())
+
+        assert recorder.visited[:2] == ['Block', 'Declaration']
+        assert recorder.visited[-10:] == [
+            'IfStatement', 'ID', 'Block', 'Statement', 'UnaryOp', 'ID', 'end', 'Block', 'end', 'end',
+        ]
+
+    def test_dispatch_table(self):
+        '''Each pass gets its own table with an entry per node class'''
+        assert SkipExpressions.dispatch[ast.Assignment] is SkipExpressions.visit_Assignment
+        assert SkipExpressions.dispatch[ast.Block] is Recorder.generic_visit
+        assert Recorder.dispatch[ast.Assignment] is Recorder.generic_visit
+        assert len(Recorder.dispatch) == len(ast.node_classes)
+
+    def test_flat_ast(self):
+        '''Walks the views of a flat AST like the object tree'''
+        (from_tree, from_flat) = (Recorder(), Recorder())
+        from_tree.visit(build())
+        from_flat.visit(FlatAst.from_tree(build()).node())
+
+        assert from_flat.visited == from_tree.visited
+
+    def test_deep_tree(self):
+        '''Walks trees deeper than the recursion limit'''
+        expr = ast.Integer(1)
+        for _ in range(100000):
+            expr = ast.UnaryOp('-', expr)
+
+        recorder = Recorder()
+        recorder.visit(expr)
+        assert len(recorder.visited) == 100001
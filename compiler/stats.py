@@ -0,0 +1,175 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageStats:
+    '''What a compiler stage cost: its calls, wall and CPU seconds, the
+       exceptions raised in it, the peak memory it allocated with memory
+       tracing on, and counts of what it produced, like tokens'''
+    __slots__ = ('name', 'calls', 'wall', 'cpu', 'errors', 'peak_memory', 'counters')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.errors = 0
+        self.peak_memory = None
+        self.counters = {}
+
+    def as_dict(self):
+        return {
+            'name': self.name, 'calls': self.calls, 'wall': self.wall, 'cpu': self.cpu, 'errors': self.errors,
+            'peak_memory': self.peak_memory, **self.counters,
+        }
+
+    def __repr__(self):
+        counters = ''.join(', {} {}'.format(value, name) for (name, value) in self.counters.items())
+        memory = '' if self.peak_memory is None else ', {} bytes peak'.format(self.peak_memory)
+        return '{}: {:.6f} s wall, {:.6f} s cpu, {} errors{}{}'.format(
+            self.name, self.wall, self.cpu, self.errors, memory, counters)
+
+
+class CompilerStats:
+    '''The `StageStats` of the stages a compiler call ran, in the order they started.
+
+    Stages call each other, parsing lexing first for example, so a
+    stage's times are its own, leaving out the stages it called, and add
+    up to the call's. Peak memory is the most a stage allocated on top of
+    what was allocated when it started, the stages it called included.
+    Tracing memory slows every allocation down several times, so it is
+    off by default.'''
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        # [stage, start wall, start cpu, wall and cpu of the stages it called, start memory, peak so far] of each
+        # running stage, innermost last
+        self.running = []
+        self.started_tracing = False
+        self.last_error = None
+
+    def start(self, name):
+        if not self.running and self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = StageStats(name)
+        stage.calls += 1
+
+        (start_memory, peak) = (None, None)
+        if self.trace_memory:
+            # keeps the caller's peak so far, tracemalloc's restarts for the stage
+            if self.running:
+                self.running[-1][6] = max(self.running[-1][6], tracemalloc.get_traced_memory()[1])
+            (start_memory, peak) = (tracemalloc.get_traced_memory()[0], 0)
+            tracemalloc.reset_peak()
+
+        self.running.append([stage, time.perf_counter(), time.process_time(), 0.0, 0.0, start_memory, peak])
+        return stage
+
+    def stop(self, error=None):
+        (stage, start_wall, start_cpu, called_wall, called_cpu, start_memory, peak) = self.running.pop()
+        (wall, cpu) = (time.perf_counter() - start_wall, time.process_time() - start_cpu)
+        stage.wall += wall - called_wall
+        stage.cpu += cpu - called_cpu
+        if error is not None and error is not self.last_error:
+            # counted once, in the stage that raised it and not in the stages it goes up through
+            stage.errors += 1
+            self.last_error = error
+
+        if self.running:
+            self.running[-1][3] += wall
+            self.running[-1][4] += cpu
+
+        if start_memory is not None:
+            # tracemalloc's peak isn't reset when a called stage stops, so it includes theirs
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            stage.peak_memory = max(stage.peak_memory or 0, peak - start_memory)
+
+        if not self.running and self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextmanager
+    def untimed(self):
+        '''Leaves what runs in it, like logging a stage's result, out of the running stages' costs'''
+        caller = self.running[-1] if self.running else None
+        if caller is not None and caller[5] is not None:
+            caller[6] = max(caller[6], tracemalloc.get_traced_memory()[1])
+        (start_wall, start_cpu) = (time.perf_counter(), time.process_time())
+
+        yield
+
+        if caller is not None:
+            caller[3] += time.perf_counter() - start_wall
+            caller[4] += time.process_time() - start_cpu
+            if caller[5] is not None:
+                tracemalloc.reset_peak()
+
+    @property
+    def wall(self):
+        return sum(stage.wall for stage in self.stages.values())
+
+    @property
+    def cpu(self):
+        return sum(stage.cpu for stage in self.stages.values())
+
+    @property
+    def errors(self):
+        return sum(stage.errors for stage in self.stages.values())
+
+    def as_dict(self):
+        return {
+            'wall': self.wall, 'cpu': self.cpu, 'errors': self.errors,
+            'stages': [stage.as_dict() for stage in self.stages.values()],
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def __repr__(self):
+        return '\n'.join(repr(stage) for stage in self.stages.values())
+
+
+def measured(name, logger=None, **counters):
+    '''Decorates a compiler stage method to add its costs to the compiler's `stats`, and log its result with `logger`.
+
+    Without stats, the compiler's `stats` being None, the stage only logs.
+    A call that isn't made from another stage starts new stats. Each
+    counter is a function of the stage's result, like `tokens=len`.
+    Counting and logging aren't part of the costs of any stage.'''
+    def wrapper(f):
+        def measured_stage(compiler, *args, **kwargs):
+            stats = compiler.stats
+            if stats is None:
+                result = f(compiler, *args, **kwargs)
+                if logger is not None:
+                    logger.log(name, result)
+                return result
+
+            if not stats.running:
+                stats = compiler.stats = CompilerStats(stats.trace_memory)
+
+            stage = stats.start(name)
+            try:
+                result = f(compiler, *args, **kwargs)
+            except BaseException as e:
+                stats.stop(e)
+                raise
+            stats.stop()
+
+            with stats.untimed():
+                for (counter, count) in counters.items():
+                    stage.counters[counter] = stage.counters.get(counter, 0) + count(result)
+                if logger is not None:
+                    logger.log(name, result)
+
+            return result
+
+        return measured_stage
+
+    return wrapper
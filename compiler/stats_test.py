@@ -0,0 +1,96 @@
+import time
+import unittest
+
+from compiler.stats import CompilerStats, measured
+from compiler.utils import Logger
+
+
+# logging and counting are slow here, to show they aren't part of any stage's time
+slow_logger = Logger(write_fn=lambda output: time.sleep(0.05))
+
+
+def slow_len(result):
+    time.sleep(0.05)
+    return len(result)
+
+
+class Stages:
+    def __init__(self, trace_memory=False):
+        self.stats = CompilerStats(trace_memory)
+
+    @measured('OUTER', items=len)
+    def outer(self, fail=False):
+        time.sleep(0.01)
+        return self.inner(fail) * 2
+
+    @measured('INNER', slow_logger, items=slow_len)
+    def inner(self, fail):
+        time.sleep(0.05)
+        if fail:
+            raise ValueError('inner')
+
+        return [bytes(100000)]
+
+
+class TestCompilerStats(unittest.TestCase):
+    def test_own_times(self):
+        '''A stage's times leave out the stages it calls, so they add up to the call's'''
+        stages = Stages()
+        start = time.perf_counter()
+        stages.outer()
+        elapsed = time.perf_counter() - start
+
+        (outer, inner) = stages.stats.stages.values()
+        assert (outer.name, inner.name) == ('OUTER', 'INNER')
+        assert 0.01 <= outer.wall < 0.05 <= inner.wall
+        assert stages.stats.wall <= elapsed
+        assert (outer.counters, inner.counters) == ({'items': 2}, {'items': 1})
+
+    def test_untimed_logging(self):
+        '''Logging and counting a stage's result count for neither the stage nor its caller'''
+        stages = Stages()
+        stages.outer()
+
+        assert stages.stats.stages['OUTER'].wall < 0.05
+        assert stages.stats.stages['INNER'].wall < 0.1
+
+    def test_no_stats(self):
+        '''Without stats, stages only run and log'''
+        stages = Stages()
+        stages.stats = None
+
+        assert stages.outer() == [bytes(100000)] * 2
+        assert stages.stats is None
+
+    def test_new_stats_per_call(self):
+        '''Each call that isn't made from a stage starts new stats'''
+        stages = Stages()
+        stages.outer()
+        first = stages.stats
+        stages.inner(False)
+
+        assert stages.stats is not first
+        assert list(stages.stats.stages) == ['INNER']
+        assert first.stages['INNER'].calls == 1
+
+    def test_errors(self):
+        '''An exception counts as an error of the stage it was raised in only'''
+        stages = Stages()
+        with self.assertRaises(ValueError):
+            stages.outer(fail=True)
+
+        assert (stages.stats.stages['OUTER'].errors, stages.stats.stages['INNER'].errors) == (0, 1)
+        assert stages.stats.errors == 1
+        assert stages.stats.as_dict()['stages'][1]['errors'] == 1
+
+    def test_peak_memory(self):
+        '''With memory tracing on, a stage's peak includes the stages it calls'''
+        stages = Stages(trace_memory=True)
+        stages.outer()
+
+        (outer, inner) = stages.stats.stages.values()
+        assert 100000 <= inner.peak_memory <= outer.peak_memory
+
+        stages = Stages()
+        stages.outer()
+        assert stages.stats.stages['OUTER'].peak_memory is None
@@ -0,0 +1,153 @@
+from bisect import bisect_left, insort
+
+from compiler.parser.visitor import Visitor
+from compiler.typechecker.typechecker import SymbolTable, Typechecker, TypecheckerReport, type_codes
+
+
+class StatementIndexer(Visitor):
+    '''Collects the identifiers a top-level statement reads, assigns and declares.
+
+    Declarations in the blocks of the statement end with their block, so
+    only the ids they mention are collected.'''
+    def index(self, statement):
+        self.symbols = set()
+        self.declared = {}  # symbol id -> the type code the id has after the statement
+        self.depth = 0
+        self.visit(statement)
+
+        # a tuple of ints is untracked by the garbage collector, a set isn't
+        return (tuple(self.symbols), self.declared)
+
+    def visit_ID(self, node):
+        self.symbols.add(node.symbol)
+
+    def visit_Block(self, node):
+        self.depth += 1
+        return node.statements
+
+    def leave_Block(self, node):
+        self.depth -= 1
+
+    def visit_Declaration(self, node):
+        if not self.depth:
+            for ast_variable in node.ids:
+                self.declared[SymbolTable.extract_id(ast_variable).symbol] = type_codes[node.type]
+
+        return node.ids
+
+
+class IncrementalTypechecker:
+    '''Typechecks a program and re-checks only what an edit affects.
+
+    For each top-level statement it keeps the errors found in it, the symbol
+    ids it mentions and the type each id it declares ends up with, in lists
+    parallel to `statements`. `declaring` and `using` index the positions
+    of the statements declaring and mentioning each id.
+
+    After an edit, the replaced statements are checked, and of the
+    statements after them only those mentioning an id that the old or new
+    statements declare. They are checked in order against the declarations
+    before them, replayed from the stored types of the declaring statements
+    only, and the report is the same as a full recheck.
+
+    An edit that mentions an undeclared id raises the typechecker's
+    KeyError. The edited tree is still the one the next edit applies to,
+    but none of the errors found are kept: the statements it would have
+    re-checked stay `stale` and are re-checked with the next edit.'''
+    def __init__(self):
+        self.typechecker = Typechecker()
+        self.indexer = StatementIndexer()
+        self.statements = []
+        self.symbols = []  # tuple of the symbol ids each statement mentions
+        self.declared = []  # symbol id -> the type code each id a statement declares ends up with
+        self.errors = []  # tuple of the errors found in each statement
+        self.declaring = {}  # symbol id -> positions of the statements declaring it
+        self.using = {}  # symbol id -> positions of the statements mentioning it
+        self.stale = set()  # positions of the statements whose errors a failed check left out of date
+
+    def typecheck(self, tree):
+        return self.update(tree, 0, len(self.statements), len(tree.statements))
+
+    def update(self, tree, first, old_stop, new_stop):
+        '''Re-checks `tree` after `statements[first:old_stop]` of the previous
+           tree were replaced by its `statements[first:new_stop]`.'''
+        changed_symbols = set()
+        for declared in self.declared[first:old_stop]:
+            changed_symbols.update(declared)
+
+        if old_stop == new_stop:
+            # positions after the edit are unchanged, so the index is patched
+            self.unindex(first, old_stop)
+
+        statements = tree.statements[first:new_stop]
+        (symbols, declared) = zip(*map(self.indexer.index, statements)) if statements else ((), ())
+        self.statements[first:old_stop] = statements
+        self.symbols[first:old_stop] = symbols
+        self.declared[first:old_stop] = declared
+        self.errors[first:old_stop] = [()] * len(statements)
+
+        if old_stop == new_stop:
+            self.index(first, new_stop)
+        else:
+            self.declaring = {}
+            self.using = {}
+            self.index(0, len(self.statements))
+
+        for declared in self.declared[first:new_stop]:
+            changed_symbols.update(declared)
+
+        # the stale statements that weren't replaced, at their positions in the edited tree
+        shift = new_stop - old_stop
+        affected = {position if position < first else position + shift
+                    for position in self.stale if position < first or position >= old_stop}
+        affected.update(range(first, new_stop))
+        for symbol in changed_symbols:
+            positions = self.using.get(symbol, [])
+            affected.update(positions[bisect_left(positions, new_stop):])
+
+        try:
+            errors = self.check(affected)
+        except BaseException:
+            self.stale = affected
+            raise
+
+        for (position, found) in errors.items():
+            self.errors[position] = found
+        self.stale = set()
+
+        report = TypecheckerReport()
+        for errors in self.errors:
+            report.errors += errors
+
+        return report
+
+    def index(self, start, stop):
+        for position in range(start, stop):
+            for symbol in self.declared[position]:
+                insort(self.declaring.setdefault(symbol, []), position)
+            for symbol in self.symbols[position]:
+                insort(self.using.setdefault(symbol, []), position)
+
+    def unindex(self, start, stop):
+        for position in range(start, stop):
+            for symbol in self.declared[position]:
+                self.declaring[symbol].remove(position)
+            for symbol in self.symbols[position]:
+                self.using[symbol].remove(position)
+
+    def check(self, positions):
+        '''Returns the errors of the statements at `positions`, by position'''
+        symbol_table = SymbolTable()
+        declaring = set().union(*self.declaring.values())
+        errors = {}
+
+        for position in sorted(declaring.union(positions)):
+            if position in positions:
+                # the statement's own declarations update the table as it is checked
+                report = self.typechecker.typecheck(self.statements[position], symbol_table)
+                errors[position] = tuple(report.get_errors())
+            else:
+                for (symbol, type_code) in self.declared[position].items():
+                    symbol_table.declare(symbol, type_code)
+
+        return errors
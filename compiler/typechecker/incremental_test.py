@@ -0,0 +1,125 @@
+import random
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.typechecker.incremental import IncrementalTypechecker
+from compiler.typechecker.typechecker import Typechecker
+
+
+class CountingTypechecker(IncrementalTypechecker):
+    def check(self, positions):
+        self.checked_positions = sorted(positions)
+        return super().check(positions)
+
+
+def declaration(type, name):
+    return ast.Declaration(type, [ast.ID(name)])
+
+
+def assignment(name, expr):
+    return ast.Assignment(ast.ID(name), expr)
+
+
+def program():
+    '''`int x; float y; x = 1; y = 2.0; if (x) { y = x; } x = y + 1.0;`'''
+    return ast.Block([
+        declaration('int', 'x'),
+        declaration('float', 'y'),
+        assignment('x', ast.Integer(1)),
+        assignment('y', ast.Float(2.0)),
+        ast.IfStatement(ast.ID('x'), ast.Block([assignment('y', ast.ID('x'))]), ast.Block([])),
+        assignment('x', ast.BinOp('+', ast.ID('y'), ast.Float(1.0))),
+    ])
+
+
+def edit(tree, first, old_stop, statements):
+    return ast.Block(tree.statements[:first] + statements + tree.statements[old_stop:])
+
+
+class TestIncrementalTypechecker(unittest.TestCase):
+    def assert_update(self, typechecker, tree, first, old_stop, statements):
+        edited = edit(tree, first, old_stop, statements)
+        report = typechecker.update(edited, first, old_stop, first + len(statements))
+
+        assert report.get_errors() == Typechecker().typecheck(edited).get_errors()
+        return edited
+
+    def test_full_check(self):
+        '''The first check reports the same errors as the typechecker'''
+        tree = program()
+
+        assert IncrementalTypechecker().typecheck(tree).get_errors() == Typechecker().typecheck(tree).get_errors()
+
+    def test_assignment_edit(self):
+        '''Editing an assignment re-checks only that assignment: `x = 1;` -> `x = 1.0;`'''
+        typechecker = CountingTypechecker()
+        typechecker.typecheck(program())
+
+        self.assert_update(typechecker, program(), 2, 3, [assignment('x', ast.Float(1.0))])
+        assert typechecker.checked_positions == [2]
+
+    def test_declaration_edit(self):
+        '''Editing a declaration re-checks the statements after it using the id: `float y;` -> `int y;`'''
+        typechecker = CountingTypechecker()
+        typechecker.typecheck(program())
+
+        self.assert_update(typechecker, program(), 1, 2, [declaration('int', 'y')])
+        assert typechecker.checked_positions == [1, 3, 4, 5]
+
+    def test_block_declaration_edit(self):
+        '''Declarations in a block don't affect the statements after it: `if (x) { float x; x = 1.0; }`'''
+        typechecker = CountingTypechecker()
+        typechecker.typecheck(program())
+
+        scoped = ast.IfStatement(ast.ID('x'), ast.Block([declaration('float', 'x'), assignment('x', ast.Float(1.0))]),
+                                 ast.Block([]))
+        self.assert_update(typechecker, program(), 4, 5, [scoped])
+        assert typechecker.declared[4] == {}
+        assert typechecker.checked_positions == [4]
+
+    def test_insert_and_delete(self):
+        '''Statements can be inserted and removed'''
+        typechecker = IncrementalTypechecker()
+        tree = program()
+        typechecker.typecheck(tree)
+
+        tree = self.assert_update(typechecker, tree, 3, 3, [declaration('int', 'y'), assignment('y', ast.Integer(3))])
+        tree = self.assert_update(typechecker, tree, 2, 4, [])
+        tree = self.assert_update(typechecker, tree, 0, 0, [declaration('float', 'x')])
+        self.assert_update(typechecker, tree, 0, len(tree.statements), [declaration('int', 'z')])
+
+    def test_undeclared_id_edit(self):
+        '''After an edit mentioning an undeclared id, fixing it gives the full recheck's errors:
+           `float y; x = 1;` -> `int y; z = 1;` -> `int y; x = 1;`'''
+        typechecker = CountingTypechecker()
+        typechecker.typecheck(program())
+
+        failed = edit(program(), 1, 3, [declaration('int', 'y'), assignment('z', ast.Integer(1))])
+        with self.assertRaises(KeyError):
+            typechecker.update(failed, 1, 3, 3)
+
+        self.assert_update(typechecker, failed, 2, 3, [assignment('x', ast.Integer(1))])
+        assert typechecker.checked_positions == [1, 2, 3, 4, 5]
+
+    def test_random_edits(self):
+        '''Random edits give the same report as a full recheck'''
+        rng = random.Random(0)
+        names = ['x', 'y', 'z']
+
+        def statement():
+            roll = rng.random()
+            if roll < 0.3:
+                return declaration(rng.choice(['int', 'float']), rng.choice(names))
+            leaf = rng.choice([ast.Integer(1), ast.Float(1.0)] + [ast.ID(name) for name in names])
+            if roll < 0.9:
+                return assignment(rng.choice(names), ast.BinOp('+', leaf, rng.choice([ast.Integer(2), ast.Float(2.0)])))
+            return ast.IfStatement(ast.ID(rng.choice(names)), ast.Block([statement()]), ast.Block([]))
+
+        tree = ast.Block([declaration('int', name) for name in names] + [statement() for _ in range(30)])
+        typechecker = IncrementalTypechecker()
+        typechecker.typecheck(tree)
+
+        for _ in range(300):
+            first = rng.randrange(len(names), len(tree.statements) + 1)
+            old_stop = min(first + rng.randrange(3), len(tree.statements))
+            tree = self.assert_update(typechecker, tree, first, old_stop, [statement() for _ in range(rng.randrange(3))])
@@ -1,72 +1,271 @@
+import gc
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from enum import IntEnum
+from multiprocessing import get_all_start_methods, get_context
+
 import compiler.parser.ast as ast
+from compiler.parser.symbols import intern_symbol, symbol_names
+from compiler.parser.visitor import Visitor
+
+
+chunks_per_worker = 4
+
+
+class Typechecker(Visitor):
+    def typecheck(self, tree, symbol_table=None, workers=None):
+        '''Returns a report of the type errors in `tree`. With `workers`, the
+           top-level statements are checked in that many processes, see
+           `typecheck_parallel`.'''
+        if workers is not None:
+            return typecheck_parallel(tree, workers, symbol_table)
+
+        self.error_report = TypecheckerReport()
+        self.symbol_table = SymbolTable() if symbol_table is None else symbol_table
+        self.visit(tree)
+
+        return self.error_report
+
+    def visit_Assignment(self, node):
+        expression_type = self.symbol_table.infer_type(node.expr) or TypeCode.INT
+        id_type = self.symbol_table.get_id_type(node.id)
+        if expression_type != id_type:
+            self.error_report.add_error(node)
+
+    def visit_Block(self, node):
+        self.symbol_table.enter_scope()
+        return node.statements
+
+    def leave_Block(self, node):
+        self.symbol_table.leave_scope()
+
+    def visit_Declaration(self, node):
+        self.symbol_table.add_declaration(node)
+
+    def visit_IfStatement(self, node):
+        return (node.then, node.otherwise)
+
+    def visit_Statement(self, node):
+        # expression statements have nothing to check
+        return None
+
+
+def typecheck_parallel(tree, workers, symbol_table=None):
+    '''Typechecks the top-level statements of the block `tree` in chunks across `workers` processes.
+
+    Only top-level declarations are visible to the statements after them,
+    so a first pass adds just those to the symbol table and records the
+    declarations in effect where each chunk starts. The chunks are then
+    checked in parallel, each from its own declarations, and their errors
+    are merged in order into the report a single process would give.
+
+    The workers get the statements once, when they start. Where processes
+    can be forked they share them with this one instead of unpickling a
+    copy, which would take longer than checking them.'''
+    symbol_table = SymbolTable() if symbol_table is None else symbol_table
+    statements = tree.statements
+    chunk_size = max(1, -(-len(statements) // (workers * chunks_per_worker)))
+    chunks = []
+
+    symbol_table.enter_scope()
+    for start in range(0, len(statements), chunk_size):
+        chunks.append((start, min(start + chunk_size, len(statements)), symbol_table.declared_names()))
+        for statement in statements[start:start + chunk_size]:
+            if statement.node_class is ast.Declaration:
+                symbol_table.add_declaration(statement)
+    symbol_table.leave_scope()
+
+    context = get_context('fork') if 'fork' in get_all_start_methods() else None
+    report = TypecheckerReport()
+    with ProcessPoolExecutor(workers, context, share_statements, (statements,)) as executor:
+        for errors in executor.map(typecheck_chunk, *zip(*chunks)):
+            report.errors += errors
+
+    return report
+
+
+shared_statements = []
+
+
+def share_statements(statements):
+    global shared_statements
+    shared_statements = statements
+    # keeps the collector from walking, and so copying, the memory shared with the parent
+    gc.freeze()
+
+
+def typecheck_chunk(start, stop, declared):
+    '''Typechecks `shared_statements[start:stop]` after the `(name, type code)` pairs declared before them'''
+    symbol_table = SymbolTable()
+    for (name, type_code) in declared:
+        symbol_table.declare(intern_symbol(name), type_code)
 
+    return Typechecker().typecheck(ast.Block(shared_statements[start:stop]), symbol_table).get_errors()
 
-class Typechecker:
-    def typecheck(self, tree):
-        error_report = TypecheckerReport()
-        symbol_table = SymbolTable()
 
-        def typecheck_rec(node):
-            if type(node) is ast.Assignment:
-                expression_type = symbol_table.get_expression_type(node.expr)
-                id_type = symbol_table.get_id_type(node.id)
-                if expression_type != id_type:
-                    error_report.add_error(node)
-            elif type(node) is ast.Declaration:
-                symbol_table.add_declaration(node)
-            elif type(node) is ast.IfStatement:
-                typecheck_rec(node.then)
-                typecheck_rec(node.otherwise)
-            elif type(node) is ast.Block:
-                for statement in node.statements:
-                    typecheck_rec(statement)
+class TypeCode(IntEnum):
+    '''Types as the symbol table stores them.
 
-        typecheck_rec(tree)
+    UNTYPED is the type of expressions without a typed leaf, like
+    `birds[0]`, and of ids nobody declared. MIXED is the type of
+    expressions with int and float leaves, so combining the types of two
+    operands is a bitwise or.'''
+    UNTYPED = 0
+    INT = 1
+    FLOAT = 2
+    MIXED = 3
 
-        return error_report
+
+# plain ints for the inference loop, where looking up enum members is slow
+(untyped, int_type, float_type, mixed) = map(int, TypeCode)
+
+type_codes = {'int': TypeCode.INT, 'float': TypeCode.FLOAT}
+
+expression_type_names = {TypeCode.UNTYPED: 'int', TypeCode.INT: 'int', TypeCode.FLOAT: 'float', TypeCode.MIXED: None}
+
+
+class Scope:
+    '''The declarations of a block, chained to the scope of the enclosing block'''
+    __slots__ = ('parent', 'shadowed')
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.shadowed = []  # flattened (symbol id, type code before the block declared it) pairs
 
 
 class SymbolTable:
+    '''The type code of each visible declaration, indexed by symbol id.
+
+    Blocks are lexical scopes. `declarations` always holds the innermost
+    visible declaration of each id, and the scope of each block keeps the
+    entries its declarations replaced, which are put back when the block
+    is left. Entering a scope and looking an id up don't depend on the
+    number of visible ids or the nesting depth, and leaving a scope only on
+    the declarations made in it.'''
     def __init__(self):
-        self.declarations = {}  # str -> str, contains ids to types
+        self.declarations = array('B')  # symbol id -> type code
+        self.expression_types = {}  # id(node) -> (node, inferred type code)
+        self.scope = None  # declarations outside of any scope are never undone
+
+    def enter_scope(self):
+        self.scope = Scope(self.scope)
+
+    def leave_scope(self):
+        shadowed = self.scope.shadowed
+        for i in range(len(shadowed) - 2, -1, -2):
+            self.declarations[shadowed[i]] = shadowed[i + 1]
+
+        if shadowed:
+            self.expression_types.clear()
+        self.scope = self.scope.parent
 
     @staticmethod
-    def extract_id_name(ast_variable):
-        if type(ast_variable) is ast.ID:
-            return ast_variable.name
-        elif type(ast_variable) is ast.ArrayRef:
-            return ast_variable.id.name
+    def extract_id(ast_variable):
+        if ast_variable.node_class is ast.ID:
+            return ast_variable
+        elif ast_variable.node_class is ast.ArrayRef:
+            return ast_variable.id
+
+    def declare(self, symbol, type_code):
+        if symbol >= len(self.declarations):
+            self.declarations.frombytes(bytes(symbol + 1 - len(self.declarations)))
+
+        if self.scope is not None:
+            self.scope.shadowed += (symbol, self.declarations[symbol])
+        self.declarations[symbol] = type_code
+        # inferred types depend on the declarations
+        self.expression_types.clear()
+
+    def declared_names(self):
+        '''The `(name, type code)` pair of each visible declaration'''
+        return tuple((symbol_names[symbol], type_code)
+                     for (symbol, type_code) in enumerate(self.declarations) if type_code)
 
     def add_declaration(self, ast_declaration):
+        type_code = type_codes[ast_declaration.type]
+
         for ast_variable in ast_declaration.ids:
-            self.declarations[SymbolTable.extract_id_name(ast_variable)] = ast_declaration.type
+            self.declare(SymbolTable.extract_id(ast_variable).symbol, type_code)
 
     def get_id_type(self, ast_variable):
-        return self.declarations[SymbolTable.extract_id_name(ast_variable)]
+        '''Returns the type code of a declared id, raises a KeyError for others'''
+        ast_id = ast_variable if ast_variable.node_class is ast.ID else ast_variable.id
+
+        try:
+            type_code = self.declarations[ast_id.symbol]
+        except IndexError:
+            type_code = untyped
+
+        if type_code == untyped:
+            raise KeyError(ast_id.name)
+
+        return type_code
 
     def get_expression_type(self, ast_expr):
-        def get_expression_type_rec(node, types):
-            if type(node) is ast.Float:
-                return ['float'] + types[:]
-            elif type(node) is ast.Integer:
-                return ['int'] + types[:]
-            elif type(node) is ast.ID:
-                return [self.get_id_type(node)] + types[:]
-            elif type(node) is ast.BinOp:
-                return (get_expression_type_rec(node.left, types) +
-                        get_expression_type_rec(node.right, types))
-            elif type(node) is ast.UnaryOp:
-                return get_expression_type_rec(node.expr, types)
+        '''Returns 'int' or 'float' when all typed leaves of the expression
+        agree and None when they don't. Array elements are untyped, and an
+        expression without typed leaves is 'int'.'''
+        return expression_type_names[self.infer_type(ast_expr)]
+
+    def infer_type(self, root):
+        '''Infers the type code of every subexpression of `root` once, bottom-up.
+
+        Operators are expanded on an explicit stack, so long operator chains
+        don't hit the recursion limit, and their types are memoized until the
+        next declaration. A mixed subexpression makes the whole expression
+        mixed, so inference stops at the first one.'''
+        memo = self.expression_types
+        declarations = self.declarations
+        stack = [root]
+        types = []
+
+        while stack:
+            node = stack.pop()
+            cls = type(node) if type(node) is Operands else node.node_class
+
+            if cls is ast.BinOp or cls is ast.UnaryOp:
+                if id(node) in memo:
+                    node_type = memo[id(node)][1]
+                else:
+                    # revisited as an `Operands` entry once its operands' types are known
+                    stack.append(Operands(node))
+                    if cls is ast.BinOp:
+                        stack.append(node.right)
+                        stack.append(node.left)
+                    else:
+                        stack.append(node.expr)
+                    continue
+            elif cls is Operands:
+                node = node.node
+                node_type = types.pop()
+                if node.node_class is ast.BinOp:
+                    node_type |= types.pop()
+                # the node is kept with its type so its id is not reused
+                memo[id(node)] = (node, node_type)
+            elif cls is ast.Float:
+                node_type = float_type
+            elif cls is ast.Integer:
+                node_type = int_type
+            elif cls is ast.ID:
+                node_type = declarations[node.symbol] if node.symbol < len(declarations) else untyped
+                if node_type == untyped:
+                    raise KeyError(node.name)
             else:
-                return types
-
-        expr_types = get_expression_type_rec(ast_expr, [])
-        if all(t == 'int' for t in expr_types):
-            return 'int'
-        elif all(t == 'float' for t in expr_types):
-            return 'float'
-        else:
-            return None
+                node_type = untyped
+
+            if node_type == mixed:
+                return mixed
+            types.append(node_type)
+
+        return types.pop()
+
+
+class Operands:
+    '''Stack entry for an operator whose operands have been inferred'''
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
 
 
 class TypecheckerReport:
@@ -1,8 +1,11 @@
 import unittest
 from itertools import zip_longest
 
-from compiler.typechecker.typechecker import (Typechecker, TypecheckerError)
+from compiler.typechecker.typechecker import (SymbolTable, TypeCode, Typechecker, TypecheckerError)
 import compiler.parser.ast as ast
+from compiler.lexer.lexer import Lexer
+from compiler.parser.flat_ast import FlatAst
+from compiler.parser.parser import Parser
 
 
 typechecker = Typechecker()
@@ -457,3 +460,229 @@ class TestTypechecker(unittest.TestCase):
 
         for (r, e) in zip_longest(report.get_errors(), expected_errors):
             assert r == e
+
+
+class TestSymbolTableExpressionType(unittest.TestCase):
+    def symbol_table(self):
+        symbol_table = SymbolTable()
+        symbol_table.add_declaration(ast.Declaration('int', [ast.ID('ducks')]))
+        symbol_table.add_declaration(ast.Declaration('float', [ast.ID('duck')]))
+        return symbol_table
+
+    def test_id_types(self):
+        '''Declared ids have type codes, others raise a KeyError: `ducks`, `birds[1]`, `geese`'''
+        symbol_table = self.symbol_table()
+        symbol_table.add_declaration(ast.Declaration('float', [ast.ArrayRef(ast.ID('birds'), ast.Integer(2))]))
+
+        assert symbol_table.get_id_type(ast.ID('ducks')) == TypeCode.INT
+        assert symbol_table.get_id_type(ast.ArrayRef(ast.ID('birds'), ast.Integer(1))) == TypeCode.FLOAT
+        with self.assertRaises(KeyError):
+            symbol_table.get_id_type(ast.ID('geese'))
+
+    def test_leaf_types(self):
+        '''Typed leaves decide the type, array elements are untyped: `birds[0] + duck`'''
+        symbol_table = self.symbol_table()
+        array_element = ast.ArrayRef(ast.ID('birds'), ast.Integer(0))
+
+        assert symbol_table.get_expression_type(array_element) == 'int'
+        assert symbol_table.get_expression_type(ast.BinOp('+', array_element, ast.ID('duck'))) == 'float'
+        assert symbol_table.get_expression_type(ast.UnaryOp('-', ast.ID('ducks'))) == 'int'
+        assert symbol_table.get_expression_type(ast.BinOp('*', ast.ID('ducks'), ast.Float(1.0))) is None
+
+    def test_long_chain(self):
+        '''Infers the type of a 100k-term chain: `1 + 1 + ... + 1`'''
+        expr = ast.Integer(1)
+        for _ in range(100000):
+            expr = ast.BinOp('+', expr, ast.Integer(1))
+
+        assert self.symbol_table().get_expression_type(expr) == 'int'
+        assert self.symbol_table().get_expression_type(ast.BinOp('+', expr, ast.Float(1.0))) is None
+
+    def test_stops_at_first_mismatch(self):
+        '''Undeclared ids after a mismatch are never looked up: `(1 + 1.0) * unknown`'''
+        expr = ast.BinOp('*', ast.BinOp('+', ast.Integer(1), ast.Float(1.0)), ast.ID('unknown'))
+
+        assert self.symbol_table().get_expression_type(expr) is None
+        with self.assertRaises(KeyError):
+            self.symbol_table().get_expression_type(ast.BinOp('*', ast.ID('unknown'), expr))
+
+    def test_declarations_reset_inferred_types(self):
+        '''A new declaration changes the type of expressions inferred before'''
+        symbol_table = self.symbol_table()
+        expr = ast.BinOp('+', ast.ID('ducks'), ast.Integer(1))
+        assert symbol_table.get_expression_type(expr) == 'int'
+
+        symbol_table.add_declaration(ast.Declaration('float', [ast.ID('ducks')]))
+        assert symbol_table.get_expression_type(expr) is None
+
+
+class TestTypecheckerDeepNesting(unittest.TestCase):
+    depth = 100000
+
+    def test_nested_if_statements(self):
+        '''Typechecks if statements nested 100k deep:
+           `int x; if (x) { if (x) { ... x = 1.0; ... } }`'''
+
+        error = ast.Assignment(ast.ID('x'), ast.Float(1.0))
+        given = ast.Block([error])
+        for _ in range(self.depth):
+            given = ast.Block([ast.IfStatement(ast.ID('x'), given, ast.Block([]))])
+        given.statements.insert(0, ast.Declaration('int', [ast.ID('x')]))
+
+        report = typechecker.typecheck(given)
+
+        assert report.get_errors() == [TypecheckerError(error)]
+        assert repr(report).count('IfStatement') == 0
+
+    def test_long_expression(self):
+        '''Typechecks an assignment of a 100k-term chain:
+           `int x; x = x + x + ... + 1.0;`'''
+
+        expr = ast.ID('x')
+        for _ in range(self.depth):
+            expr = ast.BinOp('+', expr, ast.ID('x'))
+
+        given = ast.Block([
+            ast.Declaration('int', [ast.ID('x')]),
+            ast.Assignment(ast.ID('x'), expr),
+            ast.Assignment(ast.ID('x'), ast.BinOp('+', expr, ast.Float(1.0))),
+        ])
+
+        report = typechecker.typecheck(given)
+
+        assert report.get_errors() == [TypecheckerError(given.statements[2])]
+
+
+class TestTypecheckerScopes(unittest.TestCase):
+    def test_block_declarations_end_with_the_block(self):
+        '''Declarations in a branch shadow the outer ones until the branch ends:
+           `int x;
+            if (x) { float x; x = 1; } else { x = 1.0; }
+            x = 1.0;`'''
+
+        given = ast.Block([
+            ast.Declaration('int', [ast.ID('x')]),
+            ast.IfStatement(
+                ast.ID('x'),
+                ast.Block([
+                    ast.Declaration('float', [ast.ID('x')]),
+                    ast.Assignment(ast.ID('x'), ast.Integer(1)),
+                ]),
+                ast.Block([ast.Assignment(ast.ID('x'), ast.Float(1.0))])
+            ),
+            ast.Assignment(ast.ID('x'), ast.Float(1.0)),
+        ])
+
+        report = typechecker.typecheck(given)
+
+        assert report.get_errors() == [
+            TypecheckerError(ast.Assignment(ast.ID('x'), ast.Integer(1))),
+            TypecheckerError(ast.Assignment(ast.ID('x'), ast.Float(1.0))),
+            TypecheckerError(ast.Assignment(ast.ID('x'), ast.Float(1.0))),
+        ]
+
+    def test_undeclared_after_block(self):
+        '''Ids declared in a branch are undeclared after it: `if (1) { int y; } y = 1;`'''
+
+        given = ast.Block([
+            ast.IfStatement(ast.Integer(1), ast.Block([ast.Declaration('int', [ast.ID('y')])]), ast.Block([])),
+            ast.Assignment(ast.ID('y'), ast.Integer(1)),
+        ])
+
+        with self.assertRaises(KeyError):
+            typechecker.typecheck(given)
+
+    def test_undeclared_after_leading_block(self):
+        '''Ids declared in a block are undeclared after it, also at the start of a block: `{ int x; } x = 1;`'''
+        for backend in ('rply', 'pratt'):
+            parser = Parser(backend=backend)
+            for source in ('{ int x; } x = 1;', 'int y; { int x; } x = 1;', 'if (1) { { int x; } x = 1; }'):
+                with self.assertRaises(KeyError):
+                    typechecker.typecheck(parser.parse(Lexer(engine='regex').lex(source)))
+
+    def test_symbol_table_scopes(self):
+        '''Leaving a scope restores the declarations and inferred types from before it'''
+        symbol_table = SymbolTable()
+        (x, y) = (ast.ID('x'), ast.ID('y'))
+        expr = ast.BinOp('+', x, ast.Integer(1))
+        symbol_table.add_declaration(ast.Declaration('int', [x]))
+
+        symbol_table.enter_scope()
+        symbol_table.add_declaration(ast.Declaration('float', [x, y]))
+        symbol_table.add_declaration(ast.Declaration('int', [y]))
+        assert symbol_table.infer_type(expr) == TypeCode.MIXED
+        symbol_table.enter_scope()
+        assert symbol_table.get_id_type(y) == TypeCode.INT
+        symbol_table.leave_scope()
+        symbol_table.leave_scope()
+
+        assert symbol_table.get_id_type(x) == TypeCode.INT
+        assert symbol_table.infer_type(expr) == TypeCode.INT
+        with self.assertRaises(KeyError):
+            symbol_table.get_id_type(y)
+
+
+class TestTypecheckerParallel(unittest.TestCase):
+    def test_same_errors_as_one_process(self):
+        '''Checking chunks of statements in two workers gives the errors of a single check:
+           `int x; float y; x = 1.0; y = 1.0; ...
+            float x; x = 1.0; if (y) { int y; y = 1.0; } ...`'''
+
+        statements = [ast.Declaration('int', [ast.ID('x')]), ast.Declaration('float', [ast.ID('y')])]
+        for i in range(20):
+            if i == 10:
+                statements.append(ast.Declaration('float', [ast.ID('x')]))
+            statements += [
+                ast.Assignment(ast.ID('x'), ast.Float(i)),
+                ast.IfStatement(
+                    ast.ID('y'),
+                    ast.Block([ast.Declaration('int', [ast.ID('y')]), ast.Assignment(ast.ID('y'), ast.Float(i))]),
+                    ast.Block([ast.Assignment(ast.ID('y'), ast.Integer(i))])
+                ),
+            ]
+        given = ast.Block(statements)
+
+        report = typechecker.typecheck(given, workers=2)
+
+        assert report.get_errors() == typechecker.typecheck(given).get_errors()
+        assert len(report.get_errors()) == 10 + 20 + 20
+
+    def test_undeclared_id(self):
+        '''Undeclared ids raise a KeyError from the workers too: `x = 1;`'''
+        with self.assertRaises(KeyError):
+            typechecker.typecheck(ast.Block([ast.Assignment(ast.ID('x'), ast.Integer(1))]), workers=2)
+
+
+class TestTypecheckerFlatAst(unittest.TestCase):
+    def test_same_errors_as_object_tree(self):
+        '''Typechecks the flat form of given program:
+           `int wildcat;
+            float duck;
+            wildcat = 1.0;
+            if (duck) { duck = 1; } else { wildcat = 2 * wildcat; }`'''
+
+        given = ast.Block([
+            ast.Declaration('int', [ast.ID('wildcat')]),
+            ast.Declaration('float', [ast.ID('duck')]),
+            ast.Assignment(ast.ID('wildcat'), ast.Float(1.0)),
+            ast.IfStatement(
+                ast.ID('duck'),
+                ast.Block([ast.Assignment(ast.ID('duck'), ast.Integer(1))]),
+                ast.Block([
+                    ast.Assignment(
+                        ast.ID('wildcat'),
+                        ast.BinOp('*', ast.Integer(2), ast.ID('wildcat'))
+                    )
+                ])
+            )
+        ])
+
+        report = typechecker.typecheck(FlatAst.from_tree(given).node())
+        expected_errors = [
+            TypecheckerError(ast.Assignment(ast.ID('wildcat'), ast.Float(1.0))),
+            TypecheckerError(ast.Assignment(ast.ID('duck'), ast.Integer(1))),
+        ]
+
+        # the errors hold views, which only compare by position, so they are compared as trees
+        for (r, e) in zip_longest(report.get_errors(), expected_errors):
+            assert TypecheckerError(r.get_ast_node().to_node()) == e
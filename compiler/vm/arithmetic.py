@@ -0,0 +1,59 @@
+import math
+
+
+int_min = -2 ** 63
+int_max = 2 ** 63 - 1
+
+
+def wrap(value):
+    '''Wraps an int around to 64 bits, like C's two's complement arithmetic'''
+    return (value - int_min) % 2 ** 64 + int_min
+
+
+def divide_by_zero(dividend, divisor):
+    '''IEEE 754 float division by zero, which C follows and Python raises on'''
+    if dividend == 0 or dividend != dividend:
+        return math.nan
+
+    return math.copysign(math.inf, dividend) * math.copysign(1.0, divisor)
+
+
+def int_div(dividend, divisor):
+    '''C's int division, truncating towards zero'''
+    value = dividend // divisor
+    if value < 0 and value * divisor != dividend:
+        value += 1
+
+    return value if value <= int_max else wrap(value)
+
+
+def int_mod(dividend, divisor):
+    '''C's `%`, with the sign of the dividend'''
+    value = dividend % divisor
+    if value and (dividend < 0) != (divisor < 0):
+        value -= divisor
+
+    return value
+
+
+def float_div(dividend, divisor):
+    try:
+        return dividend / divisor
+    except ZeroDivisionError:
+        return divide_by_zero(dividend, divisor)
+
+
+def float_mod(dividend, divisor):
+    '''C's `fmod`, which is NaN where Python's raises'''
+    try:
+        return math.fmod(dividend, divisor)
+    except ValueError:
+        return math.nan
+
+
+def check_index(index):
+    '''Python counts negative indices from the end, C arrays have none'''
+    if index < 0:
+        raise IndexError('array index out of range')
+
+    return index
@@ -0,0 +1,264 @@
+from collections import Counter
+
+import compiler.parser.ast as ast
+from compiler.ir.builder import decided_values
+from compiler.parser.visitor import Leave
+from compiler.typechecker.typechecker import float_type, int_type
+from compiler.vm.arithmetic import wrap
+from compiler.vm.scopes import VariableScopes
+
+try:
+    import numpy as np
+except ImportError:  # batch evaluation is optional
+    np = None
+
+
+def compare_int_float(ints, floats):
+    '''Compares exactly, like Python, and not after converting the ints:
+       -1, 0 or 1 for each pair, 2 where the float is NaN'''
+    in_range = (floats >= -2.0 ** 63) & (floats < 2.0 ** 63)
+    truncated = np.trunc(np.where(in_range, floats, 0.0))
+    truncated_ints = truncated.astype(np.int64)
+
+    order = np.where(ints < truncated_ints, -1, np.where(ints > truncated_ints, 1, 0))
+    order = np.where(order == 0, np.where(truncated < floats, -1, np.where(truncated > floats, 1, 0)), order)
+    order = np.where(floats >= 2.0 ** 63, -1, np.where(floats < -2.0 ** 63, 1, order))
+    return np.where(np.isnan(floats), 2, order)
+
+
+compared = {
+    '==': lambda order: order == 0,
+    '!=': lambda order: order != 0,
+    '<': lambda order: order == -1,
+    '<=': lambda order: (order == -1) | (order == 0),
+    '>': lambda order: order == 1,
+    '>=': lambda order: (order == 1) | (order == 0),
+}
+
+# the names of the ufuncs of the ops that are the same on ints and floats
+comparison_ufuncs = {
+    '==': 'equal', '!=': 'not_equal', '<': 'less', '<=': 'less_equal', '>': 'greater', '>=': 'greater_equal',
+}
+ring_ufuncs = {'+': 'add', '-': 'subtract', '*': 'multiply'}
+
+
+class BatchEvaluator(VariableScopes):
+    '''Runs a program over a batch of inputs at once, with NumPy.
+
+    Each scalar is a column with a value per input, `int64` or `float64`,
+    and each array a matrix with a row per input. Operations are ufuncs
+    over whole columns, so a single walk over the AST runs every input.
+    If statements and the right operands of `&&` and `||` run under a mask
+    of the inputs that take them: they are computed for every input, but
+    only stored where the mask is set.
+
+    Results are the VM's, int arithmetic wrapping around at 64 bits.
+    Errors only count where the mask is set, and one input raising the
+    error the VM raises for it stops the whole batch.'''
+    def __init__(self):
+        if np is None:
+            raise ImportError('Batch evaluation needs numpy')
+
+    def run(self, tree, inputs=None, size=None):
+        '''Runs `tree` once per input and returns the columns its top-level variables end up with.
+
+        `inputs` are the initial values of some top-level scalars, a
+        sequence with a value per input by name, the others start at zero.
+        Like the VM, an input only starts the top-level declaration of its
+        name that is visible at the end. Without inputs, `size` is the
+        number of times to run.'''
+        inputs = inputs or {}
+        self.start()
+        self.size = len(next(iter(inputs.values()))) if inputs else size
+        self.rows = np.arange(self.size)
+        self.inputs = inputs
+        # the top-level declarations of each name still to come, the input goes to the last one
+        self.declarations = Counter(
+            (id.id if id.node_class is ast.ArrayRef else id).name
+            for statement in tree.statements if statement.node_class is ast.Declaration for id in statement.ids
+        )
+        self.columns = {}  # Variable -> its column, or its matrix for arrays
+        self.masks = [None]  # the inputs running the code being visited, None for all of them
+        self.values = []  # columns of the values of the expressions visited so far
+        self.conditions = []  # of the if statements being visited
+
+        with np.errstate(all='ignore'):
+            self.visit(tree)
+
+        unknown = set(inputs) - {name for (name, variable) in self.variables.items() if variable.size is None}
+        if unknown:
+            raise ValueError('Inputs are top-level scalars, %s' % ', '.join(sorted(unknown)))
+
+        return {name: self.columns[variable] for (name, variable) in self.variables.items()}
+
+    def dtype(self, type_code):
+        return np.int64 if type_code == int_type else np.float64
+
+    def check(self, failing, error):
+        '''Raises `error` if any input under the mask fails'''
+        mask = self.masks[-1]
+        if np.any(failing if mask is None else failing & mask):
+            raise error
+
+    def masked(self, condition):
+        mask = self.masks[-1]
+        return condition if mask is None else mask & condition
+
+    def convert(self, values, type_code):
+        if type_code == float_type:
+            return values.astype(np.float64) if values.dtype != np.float64 else values
+        elif values.dtype == np.int64:
+            return values
+
+        # truncates like C, and wraps values outside of int64 around like the VM
+        self.check(np.isnan(values), ValueError('cannot convert float NaN to integer'))
+        self.check(np.isinf(values), OverflowError('cannot convert float infinity to integer'))
+        truncated = np.trunc(np.where(np.isfinite(values), values, 0.0))
+        wrapped = np.fmod(truncated, 2.0 ** 64)
+        wrapped = np.where(wrapped < 0, wrapped + 2.0 ** 64, wrapped)
+        in_range = (truncated >= -2.0 ** 63) & (truncated < 2.0 ** 63)
+        return np.where(in_range, truncated.astype(np.int64), wrapped.astype(np.uint64).view(np.int64))
+
+    def assign(self, variable, values):
+        '''Stores `values` in the scalar `variable` where the mask is set'''
+        mask = self.masks[-1]
+        values = self.convert(np.broadcast_to(values, self.size), variable.type)
+        self.columns[variable] = values if mask is None else np.where(mask, values, self.columns[variable])
+
+    def index(self, variable, indices):
+        '''The rows and columns of a matrix holding the elements at `indices`'''
+        indices = self.convert(indices, int_type)
+        outside = (indices < 0) | (indices >= variable.size)
+        self.check(outside, IndexError('array index out of range'))
+        return (self.rows, np.where(outside, 0, indices))
+
+    def declare(self, ast_id, type_code, size):
+        super().declare(ast_id, type_code, size)
+        variable = self.bindings[ast_id.symbol]
+
+        seeded = False
+        if len(self.scopes) == 1:
+            self.declarations[variable.name] -= 1
+            seeded = size is None and variable.name in self.inputs and self.declarations[variable.name] == 0
+
+        if size is not None:
+            self.columns[variable] = np.zeros((self.size, size), self.dtype(type_code))
+        elif seeded:
+            self.columns[variable] = self.convert(np.asarray(self.inputs[variable.name]), type_code)
+        else:
+            self.columns[variable] = np.zeros(self.size, self.dtype(type_code))
+
+    def visit_Assignment(self, node):
+        return (node.id.idx, node.expr) if node.id.node_class is ast.ArrayRef else (node.expr,)
+
+    def leave_Assignment(self, node):
+        variable = self.variable(node.id)
+        values = self.values.pop()
+
+        if variable.size is None:
+            self.assign(variable, values)
+            return
+
+        (rows, columns) = self.index(variable, np.broadcast_to(self.values.pop(), self.size))
+        values = self.convert(np.broadcast_to(values, self.size), variable.type)
+        mask = self.masks[-1]
+        if mask is not None:
+            (rows, columns, values) = (rows[mask], columns[mask], values[mask])
+        self.columns[variable][rows, columns] = values
+
+    def visit_Statement(self, node):
+        return (node.expr,)
+
+    def leave_Statement(self, node):
+        self.values.pop()
+
+    def visit_IfStatement(self, node):
+        return (node.cond, Leave(BatchEvaluator.then_branch, node),
+                node.then, Leave(BatchEvaluator.else_branch, node),
+                node.otherwise)
+
+    def then_branch(self, node):
+        condition = np.broadcast_to(self.values.pop() != 0, self.size)
+        self.conditions.append(condition)
+        self.masks.append(self.masked(condition))
+
+    def else_branch(self, node):
+        self.masks.pop()
+        self.masks.append(self.masked(~self.conditions.pop()))
+
+    def leave_IfStatement(self, node):
+        self.masks.pop()
+
+    def visit_Integer(self, node):
+        self.values.append(np.array(wrap(node.value), np.int64))
+
+    def visit_Float(self, node):
+        self.values.append(np.array(node.value, np.float64))
+
+    def visit_ID(self, node):
+        self.values.append(self.columns[self.variable(node)])
+
+    def visit_ArrayRef(self, node):
+        return (node.idx,)
+
+    def leave_ArrayRef(self, node):
+        variable = self.variable(node)
+        (rows, columns) = self.index(variable, np.broadcast_to(self.values.pop(), self.size))
+        self.values.append(self.columns[variable][rows, columns])
+
+    def visit_UnaryOp(self, node):
+        return (node.expr,)
+
+    def leave_UnaryOp(self, node):
+        values = self.values.pop()
+        if node.op == '!':
+            self.values.append((values == 0).astype(np.int64))
+        else:
+            self.values.append(np.negative(values))
+
+    def visit_BinOp(self, node):
+        if node.op in decided_values:
+            return (node.left, Leave(BatchEvaluator.short_circuit, node), node.right)
+
+        return (node.left, node.right)
+
+    def short_circuit(self, node):
+        # the right operand only runs for the inputs the left one doesn't decide
+        left = np.broadcast_to(self.values[-1] != 0, self.size)
+        self.masks.append(self.masked(left if node.op == '&&' else ~left))
+
+    def leave_BinOp(self, node):
+        right = self.values.pop()
+        left = self.values.pop()
+        op = node.op
+
+        if op in decided_values:
+            self.masks.pop()
+            combine = np.logical_and if op == '&&' else np.logical_or
+            self.values.append(combine(left != 0, right != 0).astype(np.int64))
+            return
+
+        is_int = (left.dtype == np.int64, right.dtype == np.int64)
+        if op in comparison_ufuncs:
+            if is_int[0] == is_int[1]:
+                self.values.append(getattr(np, comparison_ufuncs[op])(left, right).astype(np.int64))
+            elif is_int[0]:
+                self.values.append(compared[op](compare_int_float(left, right)).astype(np.int64))
+            else:
+                order = compare_int_float(right, left)
+                self.values.append(compared[op](np.where(order == 2, 2, -order)).astype(np.int64))
+        elif is_int != (True, True):
+            (left, right) = (self.convert(left, float_type), self.convert(right, float_type))
+            if op in ring_ufuncs:
+                self.values.append(getattr(np, ring_ufuncs[op])(left, right))
+            else:
+                self.values.append(np.divide(left, right) if op == '/' else np.fmod(left, right))
+        elif op in ring_ufuncs:
+            self.values.append(getattr(np, ring_ufuncs[op])(left, right))
+        else:
+            # C's division truncates towards zero, and `%` has the sign of the dividend like fmod
+            zero = right == 0
+            self.check(zero, ZeroDivisionError('integer division or modulo by zero'))
+            right = np.where(zero, 1, right)
+            remainder = np.fmod(left, right)
+            self.values.append(remainder if op == '%' else (left - remainder) // right)
@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from compiler.ir.ir_test import outcome, random_source
+from compiler.vm.batch import BatchEvaluator, np
+from compiler.vm.bytecode_test import compile_source, lexer, parser
+from compiler.vm.vm import VM
+
+
+def run_batch(source, inputs, size=None):
+    return BatchEvaluator().run(parser.parse(lexer.lex(source)), inputs, size)
+
+
+def rows(result):
+    '''The results of each input, as the VM returns them'''
+    size = len(next(iter(result.values())))
+    return [{name: column[row].tolist() for (name, column) in result.items()} for row in range(size)]
+
+
+@unittest.skipUnless(np, 'needs numpy')
+class TestBatchEvaluator(unittest.TestCase):
+    def test_columns(self):
+        '''Runs the program once per input, each scalar a column: `x = x * 2 + 1;`'''
+        result = run_batch('int x; float f; x = x * 2 + 1; f = x / 2;', {'x': [0, 1, 2 ** 62]})
+
+        assert result['x'].tolist() == [1, 3, -2 ** 63 + 1]
+        assert result['f'].tolist() == [0.0, 1.0, float(-2 ** 62)]
+
+    def test_masks(self):
+        '''If statements, `&&` and `||` only change the inputs that take them'''
+        source = '''
+            int x, y, a[2];
+            if (x > 1) { a[0] = 1; y = 10 / (x - 1); } else { a[1] = 1; }
+            y = y + (x && 1 / x) + ((!x) || 1 / x);
+        '''
+        result = run_batch(source, {'x': [0, 1, 2, 3]})
+
+        assert result['y'].tolist() == [1, 2, 10, 5]
+        assert result['a'].tolist() == [[0, 1], [0, 1], [1, 0], [1, 0]]
+
+    def test_errors(self):
+        '''Raises the VM's error if any input does, ignoring the inputs the mask leaves out'''
+        with self.assertRaises(ZeroDivisionError):
+            run_batch('int x, y; y = 1 / x;', {'x': [1, 0]})
+        with self.assertRaises(IndexError):
+            run_batch('int x, a[2]; a[x] = 1;', {'x': [1, 2]})
+        with self.assertRaises(ValueError):
+            run_batch('int x; float f; x = f / f;', {'f': [1.0, 0.0]})
+        with self.assertRaises(ValueError):
+            run_batch('int x; x = 1;', {'y': [1]})
+
+        assert run_batch('int x, y; if (x) { y = 1 / x; }', {'x': [1, 0]})['y'].tolist() == [1, 0]
+
+    def test_size(self):
+        '''Without inputs, runs `size` times'''
+        assert run_batch('int x; x = 3;', {}, size=2)['x'].tolist() == [3, 3]
+        assert run_batch('int x; x = 3;', None, size=2)['x'].tolist() == [3, 3]
+
+    def test_redeclared_inputs(self):
+        '''Like the VM, only starts the declaration visible at the end at an input'''
+        source = 'int x; int y; y = x; int x; x = x + 1; int z, z;'
+        expected = VM().run(compile_source(source), {'x': 5, 'z': 2})
+        result = run_batch(source, {'x': [5], 'z': [2]})
+
+        assert rows(result) == [expected] == [{'x': 6, 'y': 0, 'z': 2}]
+
+    def test_matches_vm(self):
+        '''Gives each input the result the VM gives it, on random programs'''
+        rng = random.Random(0)
+        for _ in range(100):
+            # without the assignments the random programs start with, `i` and `f` are inputs
+            source = random_source(rng).replace('i = 3; ', '', 1).replace('f = 2.5; ', '', 1)
+            program = compile_source(source)
+            inputs = {'i': [rng.randint(-3, 3) for _ in range(8)], 'f': [rng.choice([0.0, 0.5, -2.5, 1e300]) for _ in range(8)]}
+
+            expected = [outcome(lambda values: VM().run(program, values), {'i': i, 'f': f})
+                        for (i, f) in zip(inputs['i'], inputs['f'])]
+
+            if any(type(result) is type for result in expected):
+                with self.assertRaises((ArithmeticError, IndexError, ValueError)):
+                    run_batch(source, inputs)
+            else:
+                assert [repr(row) for row in rows(run_batch(source, inputs))] == expected
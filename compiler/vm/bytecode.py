@@ -0,0 +1,268 @@
+from array import array
+from enum import IntEnum
+
+import compiler.parser.ast as ast
+from compiler.parser.visitor import Leave
+from compiler.typechecker.typechecker import float_type, int_type
+from compiler.vm.arithmetic import wrap
+from compiler.vm.scopes import VariableScopes
+
+
+class Opcode(IntEnum):
+    '''Instructions of the stack machine, each stored with one int argument.
+
+    Ops ending in _INT take ints and wrap around at 64 bits like C's
+    two's complement ints, the others take floats or a float and an int.
+    Comparisons and NOT push 1 or 0.'''
+    HALT = 0
+    CONST = 1  # push constants[arg]
+    LOAD = 2  # push slots[arg]
+    STORE = 3  # pop into slots[arg]
+    LOAD_ELEM = 4  # pop an index, push arrays[arg][index]
+    STORE_ELEM = 5  # pop a value and an index, store the value in arrays[arg][index]
+    POP = 6
+    ADD_INT = 7
+    ADD = 8
+    SUB_INT = 9
+    SUB = 10
+    MUL_INT = 11
+    MUL = 12
+    DIV_INT = 13  # truncates towards zero
+    DIV = 14
+    MOD_INT = 15  # has the sign of the dividend
+    MOD = 16
+    NEG_INT = 17
+    NEG = 18
+    NOT = 19
+    EQ = 20
+    NE = 21
+    LT = 22
+    LE = 23
+    GT = 24
+    GE = 25
+    TO_INT = 26
+    TO_FLOAT = 27
+    JUMP = 28  # continue at arg
+    JUMP_IF_ZERO = 29  # pop, continue at arg if the value is zero
+    JUMP_IF_NONZERO = 30  # pop, continue at arg if the value isn't zero
+
+
+arithmetic_ops = {
+    '+': (Opcode.ADD_INT, Opcode.ADD),
+    '-': (Opcode.SUB_INT, Opcode.SUB),
+    '*': (Opcode.MUL_INT, Opcode.MUL),
+    '/': (Opcode.DIV_INT, Opcode.DIV),
+    '%': (Opcode.MOD_INT, Opcode.MOD),
+}
+
+comparison_ops = {
+    '==': Opcode.EQ,
+    '!=': Opcode.NE,
+    '<': Opcode.LT,
+    '<=': Opcode.LE,
+    '>': Opcode.GT,
+    '>=': Opcode.GE,
+}
+
+# `a && b` and `a || b` skip `b` when `a` is zero and nonzero
+short_circuit_ops = {'&&': Opcode.JUMP_IF_ZERO, '||': Opcode.JUMP_IF_NONZERO}
+
+jump_ops = (Opcode.JUMP, Opcode.JUMP_IF_ZERO, Opcode.JUMP_IF_NONZERO)
+
+
+class Program:
+    '''Bytecode of a minic program.
+
+    `code` holds (opcode, argument) pairs and ends with HALT. Scalars live
+    in slots of the types in `slot_types` and arrays in typed arrays of
+    `array_types` and `array_sizes`, all starting out as zeros. `variables`
+    are the variables declared at the top level, by name.'''
+    __slots__ = ('code', 'constants', 'slot_types', 'array_types', 'array_sizes', 'variables')
+
+    def __init__(self):
+        self.code = array('i')
+        self.constants = []
+        self.slot_types = array('B')
+        self.array_types = array('B')
+        self.array_sizes = array('i')
+        self.variables = {}
+
+    def values(self, slots, arrays):
+        '''The values of the top-level variables, arrays as lists'''
+        return {
+            name: slots[variable.index] if variable.size is None else list(arrays[variable.index])
+            for (name, variable) in self.variables.items()
+        }
+
+    def __repr__(self):
+        lines = []
+        for pc in range(0, len(self.code), 2):
+            (opcode, arg) = (Opcode(self.code[pc]), self.code[pc + 1])
+            if opcode is Opcode.CONST:
+                lines.append('{:6d} {} {} ({!r})'.format(pc, opcode.name, arg, self.constants[arg]))
+            elif opcode in jump_ops or opcode in (Opcode.LOAD, Opcode.STORE, Opcode.LOAD_ELEM, Opcode.STORE_ELEM):
+                lines.append('{:6d} {} {}'.format(pc, opcode.name, arg))
+            else:
+                lines.append('{:6d} {}'.format(pc, opcode.name))
+
+        return '\n'.join(lines)
+
+
+class BytecodeCompiler(VariableScopes):
+    '''Lowers an AST to a `Program` for the stack machine.
+
+    Each declared scalar gets its own slot and each array its own typed
+    array. Types are known statically: an operation with a float operand
+    is a float operation, values are converted to the type of the variable
+    they are stored in, and float array indices to ints.'''
+    def compile(self, tree):
+        self.start()
+        self.program = Program()
+        self.code = self.program.code
+        self.constant_indices = {}
+        self.types = []  # static types of the values the code so far leaves on the stack
+        self.jumps = []  # positions of the arguments of jumps to the end of open constructs
+
+        self.visit(tree)
+        self.emit(Opcode.HALT)
+
+        self.program.slot_types.extend(variable.type for variable in self.scalars)
+        self.program.array_types.extend(variable.type for variable in self.arrays)
+        self.program.array_sizes.extend(variable.size for variable in self.arrays)
+        self.program.variables = self.variables
+        return self.program
+
+    def emit(self, opcode, arg=0):
+        '''Appends an instruction and returns the position of its argument'''
+        self.code.append(opcode)
+        self.code.append(arg)
+        return len(self.code) - 1
+
+    def patch(self, position):
+        '''Points the jump with its argument at `position` to the next instruction'''
+        self.code[position] = len(self.code)
+
+    def constant(self, value):
+        key = (type(value), value)
+        if key not in self.constant_indices:
+            self.constant_indices[key] = len(self.program.constants)
+            self.program.constants.append(value)
+
+        return self.constant_indices[key]
+
+    def convert(self, type_code):
+        '''Converts the value on top of the stack to `type_code`'''
+        if self.types.pop() != type_code:
+            self.emit(Opcode.TO_INT if type_code == int_type else Opcode.TO_FLOAT)
+
+    def index(self, node):
+        self.convert(int_type)
+
+    def visit_Assignment(self, node):
+        if node.id.node_class is ast.ArrayRef:
+            return (node.id.idx, Leave(BytecodeCompiler.index, node.id), node.expr)
+
+        return (node.expr,)
+
+    def leave_Assignment(self, node):
+        variable = self.variable(node.id)
+        self.convert(variable.type)
+
+        if variable.size is None:
+            self.emit(Opcode.STORE, variable.index)
+        else:
+            self.emit(Opcode.STORE_ELEM, variable.index)
+
+    def visit_Statement(self, node):
+        return (node.expr,)
+
+    def leave_Statement(self, node):
+        self.types.pop()
+        self.emit(Opcode.POP)
+
+    def visit_IfStatement(self, node):
+        return (node.cond, Leave(BytecodeCompiler.then_branch, node),
+                node.then, Leave(BytecodeCompiler.else_branch, node),
+                node.otherwise)
+
+    def then_branch(self, node):
+        self.types.pop()
+        self.jumps.append(self.emit(Opcode.JUMP_IF_ZERO))
+
+    def else_branch(self, node):
+        if node.otherwise.statements:
+            skip_else = self.emit(Opcode.JUMP)
+            self.patch(self.jumps.pop())
+            self.jumps.append(skip_else)
+
+    def leave_IfStatement(self, node):
+        self.patch(self.jumps.pop())
+
+    def visit_Integer(self, node):
+        self.emit(Opcode.CONST, self.constant(wrap(node.value)))
+        self.types.append(int_type)
+
+    def visit_Float(self, node):
+        self.emit(Opcode.CONST, self.constant(node.value))
+        self.types.append(float_type)
+
+    def visit_ID(self, node):
+        variable = self.variable(node)
+        self.emit(Opcode.LOAD, variable.index)
+        self.types.append(variable.type)
+
+    def visit_ArrayRef(self, node):
+        return (node.idx,)
+
+    def leave_ArrayRef(self, node):
+        variable = self.variable(node)
+        self.convert(int_type)
+        self.emit(Opcode.LOAD_ELEM, variable.index)
+        self.types.append(variable.type)
+
+    def visit_UnaryOp(self, node):
+        return (node.expr,)
+
+    def leave_UnaryOp(self, node):
+        if node.op == '!':
+            self.types.pop()
+            self.emit(Opcode.NOT)
+            self.types.append(int_type)
+        else:
+            self.emit(Opcode.NEG_INT if self.types[-1] == int_type else Opcode.NEG)
+
+    def visit_BinOp(self, node):
+        if node.op in short_circuit_ops:
+            return (node.left, Leave(BytecodeCompiler.short_circuit, node), node.right)
+
+        return (node.left, node.right)
+
+    def short_circuit(self, node):
+        self.types.pop()
+        self.jumps.append(self.emit(short_circuit_ops[node.op]))
+
+    def leave_BinOp(self, node):
+        if node.op in short_circuit_ops:
+            # both operands jump to the same place when they decide the result
+            self.types.pop()
+            self.jumps.append(self.emit(short_circuit_ops[node.op]))
+            decided = 1 if node.op == '||' else 0
+            self.emit(Opcode.CONST, self.constant(1 - decided))
+            end = self.emit(Opcode.JUMP)
+            self.patch(self.jumps.pop())
+            self.patch(self.jumps.pop())
+            self.emit(Opcode.CONST, self.constant(decided))
+            self.patch(end)
+            self.types.append(int_type)
+            return
+
+        right = self.types.pop()
+        left = self.types.pop()
+
+        if node.op in comparison_ops:
+            self.emit(comparison_ops[node.op])
+            self.types.append(int_type)
+        else:
+            is_int = left == int_type and right == int_type
+            self.emit(arithmetic_ops[node.op][0 if is_int else 1])
+            self.types.append(int_type if is_int else float_type)
@@ -0,0 +1,102 @@
+import unittest
+
+import compiler.parser.ast as ast
+from compiler.lexer.lexer import Lexer
+from compiler.parser.parser import Parser
+from compiler.vm.bytecode import BytecodeCompiler, Opcode
+
+
+lexer = Lexer(engine='regex')
+parser = Parser(backend='pratt')
+
+
+def compile_source(source):
+    return BytecodeCompiler().compile(parser.parse(lexer.lex(source)))
+
+
+def instructions(program):
+    return [(Opcode(program.code[pc]), program.code[pc + 1]) for pc in range(0, len(program.code), 2)]
+
+
+class TestBytecodeCompiler(unittest.TestCase):
+    def test_assignment(self):
+        '''Lowers expressions to stack code: `int x; x = x * 2 + 2;`'''
+        program = compile_source('int x; x = x * 2 + 2;')
+
+        assert instructions(program) == [
+            (Opcode.LOAD, 0), (Opcode.CONST, 0), (Opcode.MUL_INT, 0), (Opcode.CONST, 0), (Opcode.ADD_INT, 0),
+            (Opcode.STORE, 0), (Opcode.HALT, 0),
+        ]
+        assert program.constants == [2]
+
+    def test_types(self):
+        '''Picks float ops for float operands and converts stored values: `int x; float y; x = y / 2;`'''
+        program = compile_source('int x; float y; x = y / 2;')
+
+        assert [opcode for (opcode, _) in instructions(program)] == [
+            Opcode.LOAD, Opcode.CONST, Opcode.DIV, Opcode.TO_INT, Opcode.STORE, Opcode.HALT,
+        ]
+        assert list(program.slot_types) == [1, 2]
+
+    def test_arrays(self):
+        '''Arrays get typed storage and their indices are converted to ints: `float a[3]; a[1.5] = a[0];`'''
+        program = compile_source('float a[3]; a[1.5] = a[0];')
+
+        assert [opcode for (opcode, _) in instructions(program)] == [
+            Opcode.CONST, Opcode.TO_INT, Opcode.CONST, Opcode.LOAD_ELEM, Opcode.STORE_ELEM, Opcode.HALT,
+        ]
+        assert (list(program.array_types), list(program.array_sizes)) == ([2], [3])
+        assert program.slot_types == program.slot_types[:0]
+
+    def test_if_statement(self):
+        '''Branches jump past the code they skip: `int x; if (x) { x = 1; } else { x = 2; }`'''
+        program = compile_source('int x; if (x) { x = 1; } else { x = 2; }')
+
+        assert instructions(program) == [
+            (Opcode.LOAD, 0), (Opcode.JUMP_IF_ZERO, 10),
+            (Opcode.CONST, 0), (Opcode.STORE, 0), (Opcode.JUMP, 14),
+            (Opcode.CONST, 1), (Opcode.STORE, 0),
+            (Opcode.HALT, 0),
+        ]
+
+    def test_block_scopes(self):
+        '''Declarations in a block get their own slots: `int x; if (1) { float x; x = 1.0; } x = 2;`'''
+        program = compile_source('int x; if (1) { float x; x = 1.0; } x = 2;')
+
+        stores = [arg for (opcode, arg) in instructions(program) if opcode is Opcode.STORE]
+        assert stores == [1, 0]
+        assert list(program.variables) == ['x']
+        assert program.variables['x'].index == 0
+
+    def test_errors(self):
+        '''Raises a KeyError for undeclared ids and a ValueError for misused arrays'''
+        with self.assertRaises(KeyError):
+            compile_source('int x; y = x;')
+        with self.assertRaises(KeyError):
+            compile_source('if (1) { int y; } y = 1;')
+        with self.assertRaises(ValueError):
+            compile_source('int a[2]; a = 1;')
+        with self.assertRaises(ValueError):
+            compile_source('int x; x[0] = 1;')
+        with self.assertRaises(ValueError):
+            compile_source('int n; int a[n];')
+
+    def test_disassembly(self):
+        '''Reprs a program as one instruction per line'''
+        assert repr(compile_source('float x; x = -1.5;')) == (
+            '     0 CONST 0 (1.5)\n'
+            '     2 NEG\n'
+            '     4 STORE 0\n'
+            '     6 HALT'
+        )
+
+    def test_deep_tree(self):
+        '''Compiles if statements nested deeper than the recursion limit'''
+        tree = ast.Block([ast.Assignment(ast.ID('x'), ast.Integer(1))])
+        for _ in range(10000):
+            tree = ast.Block([ast.IfStatement(ast.ID('x'), tree, ast.Block([]))])
+        tree.statements.insert(0, ast.Declaration('int', [ast.ID('x')]))
+
+        program = BytecodeCompiler().compile(tree)
+
+        assert len(program.code) == 2 * (2 * 10000 + 3)
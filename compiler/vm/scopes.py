@@ -0,0 +1,84 @@
+import compiler.parser.ast as ast
+from compiler.parser.visitor import Visitor
+from compiler.typechecker.typechecker import type_codes
+
+
+class Variable:
+    '''A declared variable: a scalar, or an array of `size` elements.
+       `index` numbers the scalars and the arrays of a program separately.'''
+    __slots__ = ('name', 'type', 'index', 'size')
+
+    def __init__(self, name, type, index, size=None):
+        self.name = name
+        self.type = type
+        self.index = index
+        self.size = size
+
+
+class VariableScopes(Visitor):
+    '''Base class for passes lowering declarations to storage.
+
+    Each declaration makes a new `Variable`, and blocks are scopes, so a
+    declaration in a block hides an outer one with the same name until the
+    block ends. `scalars` and `arrays` are all the variables declared,
+    `variables` the ones declared at the top level, by name. Undeclared ids
+    raise a KeyError, misused arrays and array sizes other than integer
+    literals a ValueError.'''
+    def start(self):
+        self.scalars = []
+        self.arrays = []
+        self.variables = {}
+        self.bindings = {}  # symbol id -> the innermost visible Variable
+        self.scopes = []  # flattened (symbol id, hidden Variable or None) pairs of each open block
+
+    def declare(self, ast_id, type_code, size):
+        if size is None:
+            variable = Variable(ast_id.name, type_code, len(self.scalars))
+            self.scalars.append(variable)
+        else:
+            variable = Variable(ast_id.name, type_code, len(self.arrays), size)
+            self.arrays.append(variable)
+
+        self.scopes[-1] += (ast_id.symbol, self.bindings.get(ast_id.symbol))
+        self.bindings[ast_id.symbol] = variable
+
+    def variable(self, ast_variable):
+        '''The variable an ID or an element of an ArrayRef refers to'''
+        is_element = ast_variable.node_class is ast.ArrayRef
+        ast_id = ast_variable.id if is_element else ast_variable
+        if ast_id.node_class is not ast.ID:
+            raise ValueError('Arrays have one dimension, %s' % ast_variable)
+
+        variable = self.bindings.get(ast_id.symbol)
+        if variable is None:
+            raise KeyError(ast_id.name)
+        if is_element != (variable.size is not None):
+            raise ValueError('%s is %san array' % (ast_id.name, '' if variable.size is not None else 'not '))
+
+        return variable
+
+    def visit_Block(self, node):
+        self.scopes.append([])
+        return node.statements
+
+    def leave_Block(self, node):
+        if len(self.scopes) == 1:
+            self.variables = {variable.name: variable for variable in self.bindings.values()}
+
+        hidden = self.scopes.pop()
+        for i in range(len(hidden) - 2, -1, -2):
+            if hidden[i + 1] is None:
+                del self.bindings[hidden[i]]
+            else:
+                self.bindings[hidden[i]] = hidden[i + 1]
+
+    def visit_Declaration(self, node):
+        type_code = type_codes[node.type]
+
+        for ast_variable in node.ids:
+            if ast_variable.node_class is ast.ID:
+                self.declare(ast_variable, type_code, None)
+            elif ast_variable.id.node_class is ast.ID and ast_variable.idx.node_class is ast.Integer:
+                self.declare(ast_variable.id, type_code, ast_variable.idx.value)
+            else:
+                raise ValueError('Array sizes are integer literals, %s' % ast_variable)
@@ -0,0 +1,192 @@
+import math
+from array import array
+
+from compiler.typechecker.typechecker import float_type
+from compiler.vm.arithmetic import divide_by_zero, int_max, int_min, wrap
+from compiler.vm.bytecode import Opcode
+
+
+in_range = 'value if {} <= value <= {} else wrap(value)'.format(int_min, int_max)
+
+# what each opcode does, run with `arg` set, `push` and `pop` bound to the stack
+handlers = {
+    Opcode.HALT: 'return count',
+    Opcode.CONST: 'push(constants[arg])',
+    Opcode.LOAD: 'push(slots[arg])',
+    Opcode.STORE: 'slots[arg] = pop()',
+    Opcode.LOAD_ELEM: '''
+index = pop()
+if index < 0:
+    raise IndexError('array index out of range')
+push(arrays[arg][index])''',
+    Opcode.STORE_ELEM: '''
+value = pop()
+index = pop()
+if index < 0:
+    raise IndexError('array index out of range')
+arrays[arg][index] = value''',
+    Opcode.POP: 'pop()',
+    Opcode.ADD_INT: '''
+value = pop()
+value += stack[-1]
+stack[-1] = ''' + in_range,
+    Opcode.ADD: '''
+value = pop()
+stack[-1] += value''',
+    Opcode.SUB_INT: '''
+value = pop()
+value = stack[-1] - value
+stack[-1] = ''' + in_range,
+    Opcode.SUB: '''
+value = pop()
+stack[-1] -= value''',
+    Opcode.MUL_INT: '''
+value = pop()
+value *= stack[-1]
+stack[-1] = ''' + in_range,
+    Opcode.MUL: '''
+value = pop()
+stack[-1] *= value''',
+    Opcode.DIV_INT: '''
+divisor = pop()
+dividend = stack[-1]
+value = dividend // divisor
+if value < 0 and value * divisor != dividend:
+    value += 1
+stack[-1] = ''' + in_range,
+    Opcode.DIV: '''
+divisor = pop()
+try:
+    stack[-1] /= divisor
+except ZeroDivisionError:
+    stack[-1] = divide_by_zero(stack[-1], divisor)''',
+    Opcode.MOD_INT: '''
+divisor = pop()
+dividend = stack[-1]
+value = dividend % divisor
+if value and (dividend < 0) != (divisor < 0):
+    value -= divisor
+stack[-1] = value''',
+    Opcode.MOD: '''
+divisor = pop()
+try:
+    stack[-1] = fmod(stack[-1], divisor)
+except ValueError:
+    stack[-1] = nan''',
+    Opcode.NEG_INT: '''
+value = -stack[-1]
+stack[-1] = ''' + in_range,
+    Opcode.NEG: 'stack[-1] = -stack[-1]',
+    Opcode.NOT: 'stack[-1] = 0 if stack[-1] else 1',
+    Opcode.EQ: '''
+value = pop()
+stack[-1] = 1 if stack[-1] == value else 0''',
+    Opcode.NE: '''
+value = pop()
+stack[-1] = 1 if stack[-1] != value else 0''',
+    Opcode.LT: '''
+value = pop()
+stack[-1] = 1 if stack[-1] < value else 0''',
+    Opcode.LE: '''
+value = pop()
+stack[-1] = 1 if stack[-1] <= value else 0''',
+    Opcode.GT: '''
+value = pop()
+stack[-1] = 1 if stack[-1] > value else 0''',
+    Opcode.GE: '''
+value = pop()
+stack[-1] = 1 if stack[-1] >= value else 0''',
+    Opcode.TO_INT: '''
+value = int(stack[-1])
+stack[-1] = ''' + in_range,
+    Opcode.TO_FLOAT: 'stack[-1] = float(stack[-1])',
+    Opcode.JUMP: 'pc = arg',
+    Opcode.JUMP_IF_ZERO: '''
+if not pop():
+    pc = arg''',
+    Opcode.JUMP_IF_NONZERO: '''
+if pop():
+    pc = arg''',
+}
+
+# the dispatch loop tests opcodes in this order, the most frequent first
+dispatch_order = [
+    Opcode.LOAD, Opcode.CONST, Opcode.STORE, Opcode.ADD_INT, Opcode.ADD, Opcode.MUL, Opcode.MUL_INT,
+    Opcode.SUB_INT, Opcode.SUB, Opcode.LOAD_ELEM, Opcode.STORE_ELEM, Opcode.JUMP_IF_ZERO, Opcode.JUMP,
+    Opcode.DIV, Opcode.DIV_INT, Opcode.MOD_INT, Opcode.MOD, Opcode.LT, Opcode.GT, Opcode.EQ, Opcode.NE,
+    Opcode.LE, Opcode.GE, Opcode.JUMP_IF_NONZERO, Opcode.NOT, Opcode.NEG_INT, Opcode.NEG, Opcode.TO_INT,
+    Opcode.TO_FLOAT, Opcode.POP, Opcode.HALT,
+]
+
+
+def execute_source(counting):
+    '''Source of the dispatch loop, with opcodes inlined as int literals.
+
+    The counting loop also counts the instructions it executes and returns
+    the count when it halts.'''
+    lines = [
+        'def execute(code, constants, slots, arrays):',
+        '    stack = []',
+        '    push = stack.append',
+        '    pop = stack.pop',
+        '    count = None',
+        '    pc = 0',
+        '    while True:',
+        '        arg = code[pc + 1]',
+        '        op = code[pc]',
+        '        pc += 2',
+    ]
+    if counting:
+        lines[4] = '    count = 0'
+        lines.append('        count += 1')
+
+    for (i, opcode) in enumerate(dispatch_order):
+        lines.append('        {} op == {}:'.format('if' if i == 0 else 'elif', int(opcode)))
+        lines += ['            ' + line for line in handlers[opcode].strip().split('\n')]
+
+    lines += ['        else:', "            raise ValueError('Invalid opcode, %d' % op)"]
+    return '\n'.join(lines)
+
+
+def make_execute(counting):
+    scope = {'wrap': wrap, 'divide_by_zero': divide_by_zero, 'fmod': math.fmod, 'nan': math.nan}
+    exec(execute_source(counting), scope)
+    return scope['execute']
+
+
+execute = make_execute(counting=False)
+execute_counting = make_execute(counting=True)
+
+
+class VM:
+    '''Runs `Program`s on a stack machine.
+
+    The dispatch loop is one function with the state in locals and the
+    handlers inlined, generated from `handlers`. Ints are 64-bit and wrap
+    around, int division and `%` truncate towards zero like C, and float
+    operations follow IEEE 754. Integer division by zero raises a
+    ZeroDivisionError and indexing outside an array an IndexError.
+
+    With `counting`, `executed` is the number of instructions the last
+    program ran.
+
+    A run can start some top-level scalars at `inputs`, their initial
+    values by name, instead of zero.'''
+    def __init__(self, counting=False):
+        self.execute = execute_counting if counting else execute
+        self.executed = None
+
+    def run(self, program, inputs=None):
+        '''Runs `program` and returns the values its top-level variables end up with'''
+        slots = [0.0 if type_code == float_type else 0 for type_code in program.slot_types]
+        for (name, value) in (inputs or {}).items():
+            variable = program.variables[name]
+            if variable.size is not None:
+                raise ValueError('Inputs are scalars, %s is an array' % name)
+            slots[variable.index] = float(value) if variable.type == float_type else wrap(int(value))
+        arrays = [array('d' if type_code == float_type else 'q', bytes(8 * size))
+                  for (type_code, size) in zip(program.array_types, program.array_sizes)]
+
+        # indexing a list is faster than an array, which boxes each value it returns
+        self.executed = self.execute(program.code.tolist(), program.constants, slots, arrays)
+        return program.values(slots, arrays)
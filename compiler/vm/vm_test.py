@@ -0,0 +1,98 @@
+import math
+import unittest
+
+from compiler.vm.bytecode_test import compile_source
+from compiler.vm.vm import VM
+
+
+def run(source):
+    return VM().run(compile_source(source))
+
+
+class TestVM(unittest.TestCase):
+    def test_int_arithmetic(self):
+        '''Int division and `%` truncate towards zero like C: `7 / -2`, `(0 - 7) % 2`'''
+        result = run('int a, b, c, d; a = 7 / (0 - 2); b = (0 - 7) / 2; c = (0 - 7) % 2; d = 7 % (0 - 2);')
+
+        assert result == {'a': -3, 'b': -3, 'c': -1, 'd': 1}
+
+    def test_int_overflow(self):
+        '''Ints wrap around at 64 bits: `9223372036854775807 + 1`'''
+        result = run('int a, b, c; a = 9223372036854775807 + 1; b = a - 1; c = a * 2;')
+
+        assert result == {'a': -2 ** 63, 'b': 2 ** 63 - 1, 'c': 0}
+
+    def test_float_arithmetic(self):
+        '''Floats follow IEEE 754, also when dividing by zero: `1.0 / 0.0`, `0.0 / 0.0`'''
+        result = run('float a, b, c, d, e; a = 1.0 / 0.0; b = -1.0 / 0.0; c = 0.0 / 0.0; d = 7.5 % 2.0; e = 1 + 0.5;')
+
+        assert (result['a'], result['b'], result['d'], result['e']) == (math.inf, -math.inf, 1.5, 1.5)
+        assert math.isnan(result['c'])
+
+    def test_conversions(self):
+        '''Stored values are converted to the variable's type, truncating floats: `x = 2.9;`'''
+        result = run('int x, y; float f; x = 2.9; y = 0.0 - 2.9; f = 3;')
+
+        assert result == {'x': 2, 'y': -2, 'f': 3.0}
+        assert type(result['f']) is float
+
+    def test_comparisons_and_logic(self):
+        '''Comparisons and logical ops give 1 or 0, and `&&` and `||` skip their right operand'''
+        result = run('''
+            int a, b, c, d, e, zero;
+            a = (2 < 3) + (2 == 2.0) + (3 != 3);
+            b = !0 + !5;
+            c = zero && 1 / zero;
+            d = 1 || 1 / zero;
+            e = (2 && 3) + (0 || 0.5);
+        ''')
+
+        assert result == {'a': 2, 'b': 1, 'c': 0, 'd': 1, 'e': 2, 'zero': 0}
+
+    def test_if_statement(self):
+        '''Runs the branch the condition selects'''
+        source = '''
+            int x, a[2];
+            x = {};
+            if (x > 1) {{ a[0] = 1; }} else {{ a[1] = 1; }}
+            if (x) {{ a[0] = a[0] + 10; }}
+        '''
+
+        assert run(source.format(2)) == {'x': 2, 'a': [11, 0]}
+        assert run(source.format(0)) == {'x': 0, 'a': [0, 1]}
+
+    def test_block_scopes(self):
+        '''Variables declared in a block hide outer ones until the block ends'''
+        result = run('int x; x = 1; if (x) { float x; x = 2.5; } x = x + 1;')
+
+        assert result == {'x': 2}
+
+    def test_arrays(self):
+        '''Arrays start out as zeros, and indexing outside them raises an IndexError'''
+        assert run('float a[3]; int i; i = 2; a[i] = a[1] + 0.5;') == {'a': [0.0, 0.0, 0.5], 'i': 2}
+
+        with self.assertRaises(IndexError):
+            run('int a[3]; a[3] = 1;')
+        with self.assertRaises(IndexError):
+            run('int a[3], x; x = a[0 - 1];')
+
+    def test_division_by_zero(self):
+        '''Int division by zero raises a ZeroDivisionError'''
+        with self.assertRaises(ZeroDivisionError):
+            run('int x; x = 1 / x;')
+
+    def test_counting(self):
+        '''A counting VM counts the instructions it executes'''
+        vm = VM(counting=True)
+        vm.run(compile_source('int x; if (x) { x = 1; } x = 2;'))
+
+        # LOAD JUMP_IF_ZERO CONST STORE HALT
+        assert vm.executed == 5
+
+    def test_inputs(self):
+        '''Inputs start top-level scalars at their values instead of zero, converted to their type'''
+        program = compile_source('int x, a[2]; float f; x = x + 1; f = f * 2;')
+
+        assert VM().run(program, {'x': 2 ** 63 - 1, 'f': 3}) == {'x': -2 ** 63, 'a': [0, 0], 'f': 6.0}
+        with self.assertRaises(ValueError):
+            VM().run(program, {'a': 1})
@@ -1,4 +1,6 @@
 import argparse
+import json
+import sys
 
 from compiler.compiler import create_compiler
 from compiler.utils import Logger
@@ -8,8 +10,22 @@ def get_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('input')
     parser.add_argument('--output', help="specify output file")
+    parser.add_argument('--lexer', choices=['rply', 'regex'], default='rply',
+                        help="lexer engine, regex memory-maps the input file")
+    parser.add_argument('--parser', choices=['rply', 'pratt'], default='rply',
+                        help="parser backend")
+    parser.add_argument('--stats', metavar='FILE',
+                        help="write the time and counts of each stage as JSON, - for stdout with --output")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="add the peak memory of each stage to --stats, several times slower")
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.stats == '-' and not args.output:
+        parser.error('--stats - needs --output, the log goes to stdout')
+    if args.trace_memory and not args.stats:
+        parser.error('--trace-memory needs --stats')
+
+    return args
 
 
 if __name__ == '__main__':
@@ -22,9 +38,20 @@ if __name__ == '__main__':
 
     logger.log('START')
 
-    compiler = create_compiler(with_logger=logger)
-    with open(args.input, 'r') as f:
-        source = f.read()
-        compiler.typecheck(source)
+    compiler = create_compiler(with_logger=logger, lexer_engine=args.lexer, parser_backend=args.parser,
+                               collect_stats=bool(args.stats), trace_memory=args.trace_memory)
+    try:
+        with open(args.input, 'rb') as f:
+            compiler.typecheck(f)
+    finally:
+        # failed files are the ones whose stats matter most
+        if args.stats:
+            stats = dict(input=args.input, **compiler.stats.as_dict())
+            if args.stats == '-':
+                json.dump(stats, sys.stdout, indent=2)
+                print()
+            else:
+                with open(args.stats, 'w') as stats_file:
+                    json.dump(stats, stats_file, indent=2)
 
     logger.log('DONE')